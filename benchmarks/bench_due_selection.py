@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark of selecting due reminders and grouping them by channel.
+
+Compares, at 10k, 100k and 1M pending reminders with 10% of them due:
+
+- list of dicts: filter the Firestore-shaped dicts in Python and group them
+  with a defaultdict, as send_reminders does with query results
+- array store: ArrayPendingStore.due_rows(), a vectorized mask, sort and
+  segment boundaries (pending_store.py)
+- array store + records: ArrayPendingStore.due_groups(), which also builds
+  the ReminderRecord groups that send_reminders consumes
+
+Needs numpy.
+
+Usage:
+    python benchmarks/bench_due_selection.py [runs]
+"""
+
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+
+from pending_store import ArrayPendingStore  # noqa: E402
+
+SIZES = (10_000, 100_000, 1_000_000)
+NOW = 1_000_000_000
+
+
+def make_reminders(count):
+    """Return stored reminders spread over count / 50 channels, 10% of them due at NOW."""
+    rng = random.Random(0)
+    channels = [rng.getrandbits(60) for _ in range(max(1, count // 50))]
+    return [
+        {
+            "message_id": rng.getrandbits(60),
+            "channel_id": rng.choice(channels),
+            "mentioned_user_id": rng.getrandbits(60),
+            "due_at": NOW + rng.randrange(-NOW // 10, NOW * 9 // 10),
+        }
+        for _ in range(count)
+    ]
+
+
+def select_dicts(reminders):
+    groups = defaultdict(list)
+    for reminder in reminders:
+        if reminder["due_at"] <= NOW:
+            groups[reminder["channel_id"]].append(reminder)
+    return list(groups.values())
+
+
+def best_of(runs, func, *args):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    print(f"{'reminders':>10} {'list of dicts':>15} {'array store':>13} {'+ records':>11}")
+    for count in SIZES:
+        reminders = make_reminders(count)
+        store = ArrayPendingStore()
+        store.load(reminders)
+
+        dicts = best_of(runs, select_dicts, reminders)
+        rows = best_of(runs, store.due_rows, NOW)
+        groups = best_of(runs, store.due_groups, NOW)
+        print(f"{count:>10,} {dicts * 1000:>12.1f} ms {rows * 1000:>10.1f} ms {groups * 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the event loop implementations under fake gateway traffic.
+
+For each loop implementation that is installed (event_loop.py), a burst of
+fake message events is submitted to an EventPipeline, ordered per channel as
+in main.py. Each handler does a little CPU work and one round trip to a local
+TCP server standing in for the Discord and Firestore HTTP APIs, and one event
+in ten is a sheddable statistics write. A LoopLagMonitor runs alongside.
+
+Reports handler throughput and the event loop lag percentiles. uvloop needs
+`pip install uvloop` and is skipped when it is not installed.
+
+Usage:
+    python benchmarks/bench_event_loop.py [events] [runs]
+"""
+
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+
+from event_loop import LOOP_IMPLEMENTATIONS, loop_policy, uvloop  # noqa: E402
+from loop_monitor import LoopLagMonitor  # noqa: E402
+from pipeline import EventPipeline  # noqa: E402
+
+CHANNELS = 200
+CONNECTIONS = 32
+
+
+def make_events(count):
+    """Return (channel_id, payload) message events spread over CHANNELS channels."""
+    rng = random.Random(0)
+    channels = [rng.getrandbits(60) for _ in range(CHANNELS)]
+    return [
+        (
+            rng.choice(channels),
+            {
+                "id": rng.getrandbits(60),
+                "content": "ping " * rng.randrange(1, 40),
+                "mentions": [rng.getrandbits(60) for _ in range(rng.randrange(0, 4))],
+            },
+        )
+        for _ in range(count)
+    ]
+
+
+async def echo(reader, writer):
+    # The stand-in backend: one line in, one line out
+    while line := await reader.readline():
+        writer.write(line)
+        await writer.drain()
+    writer.close()
+
+
+async def run_traffic(events):
+    server = await asyncio.start_server(echo, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    connections = asyncio.Queue()
+    for _ in range(CONNECTIONS):
+        connections.put_nowait(await asyncio.open_connection("127.0.0.1", port))
+
+    async def round_trip(body):
+        reader, writer = await connections.get()
+        try:
+            writer.write(json.dumps(body).encode() + b"\n")
+            return await reader.readline()
+        finally:
+            connections.put_nowait((reader, writer))
+
+    async def handle_message(payload):
+        # Stand-in for mention parsing and registration
+        mentions = sorted(set(payload["mentions"]))
+        words = payload["content"].split()
+        await round_trip({"message_id": payload["id"], "mentions": mentions, "words": len(words)})
+
+    async def count_message(payload):
+        await round_trip({"stats": payload["id"]})
+
+    monitor = LoopLagMonitor(interval=0.005, slow_threshold=0.05)
+    monitor_task = asyncio.create_task(monitor.run())
+    pipeline = EventPipeline(max_pending=1000, max_concurrency=CONNECTIONS)
+    pipeline.start()
+
+    start = time.perf_counter()
+    for number, (channel_id, payload) in enumerate(events):
+        await pipeline.submit(channel_id, handle_message, payload)
+        if number % 10 == 0:
+            await pipeline.submit("stats", count_message, payload, sheddable=True)
+    await pipeline.stop(timeout=60)
+    elapsed = time.perf_counter() - start
+
+    monitor_task.cancel()
+    for _ in range(CONNECTIONS):
+        _, writer = connections.get_nowait()
+        writer.close()
+    server.close()
+    await server.wait_closed()
+    return elapsed, monitor.percentiles()
+
+
+def run_with(name, events):
+    asyncio.set_event_loop_policy(loop_policy(name))
+    try:
+        return asyncio.run(run_traffic(events))
+    finally:
+        asyncio.set_event_loop_policy(None)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    logging.basicConfig(level=logging.ERROR)  # The monitor warns about every stall
+    events = make_events(count)
+
+    print(f"{'loop':>8} {'events/s':>10} {'lag p50':>9} {'lag p99':>9} {'lag max':>9}")
+    for name in LOOP_IMPLEMENTATIONS:
+        if name == "uvloop" and uvloop is None:
+            print(f"{name:>8} (not installed, pip install uvloop)")
+            continue
+        elapsed, lag = min((run_with(name, events) for _ in range(runs)), key=lambda result: result[0])
+        print(f"{name:>8} {count / elapsed:>10,.0f} {lag['p50']:>6.1f} ms {lag['p99']:>6.1f} ms {lag['max']:>6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
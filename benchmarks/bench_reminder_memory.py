@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for in-process reminder representations.
+
+Builds N pending reminders (1,000,000 by default) with realistic snowflake IDs
+in each representation and reports the memory traced per reminder:
+
+- dict: the shape returned by Firestore (string keys, five fields)
+- ReminderRecord: the __slots__ record used in process (records.py)
+- array columns: parallel int64 arrays, the floor for bulk sets
+
+ID ints are created once up front and shared by every representation, so only
+what a representation adds on top of them is counted.
+
+Usage:
+    python benchmarks/bench_reminder_memory.py [count]
+"""
+
+import gc
+import random
+import sys
+import tracemalloc
+from array import array
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+
+from records import ReminderRecord  # noqa: E402
+from snowflake import DISCORD_EPOCH_MS, due_key, snowflake_time_ms  # noqa: E402
+
+# Snowflakes of roughly mid-2025
+FIRST_MESSAGE_ID = (1_750_000_000_000 - DISCORD_EPOCH_MS) << 22
+
+
+def make_ids(count):
+    """Return (message_id, channel_id, mentioned_user_id) triples, like a busy bot would hold."""
+    rng = random.Random(0)
+    channels = [FIRST_MESSAGE_ID - rng.randrange(1 << 40) for _ in range(max(1, count // 100))]
+    users = [FIRST_MESSAGE_ID - rng.randrange(1 << 42) for _ in range(max(1, count // 10))]
+    return [
+        (FIRST_MESSAGE_ID + (i << 12), rng.choice(channels), rng.choice(users))
+        for i in range(count)
+    ]
+
+
+def build_dicts(ids):
+    return [
+        {
+            "message_id": message_id,
+            "channel_id": channel_id,
+            "mentioned_user_id": user_id,
+            "created_at": snowflake_time_ms(message_id),
+            "due_at": due_key(message_id, 86400),
+        }
+        for message_id, channel_id, user_id in ids
+    ]
+
+
+def build_records(ids):
+    return [
+        ReminderRecord(message_id, channel_id, user_id, due_key(message_id, 86400))
+        for message_id, channel_id, user_id in ids
+    ]
+
+
+def build_columns(ids):
+    message_ids, channel_ids, user_ids, due_ats = array("q"), array("q"), array("q"), array("q")
+    for message_id, channel_id, user_id in ids:
+        message_ids.append(message_id)
+        channel_ids.append(channel_id)
+        user_ids.append(user_id)
+        due_ats.append(due_key(message_id, 86400))
+    return message_ids, channel_ids, user_ids, due_ats
+
+
+def traced_bytes(build, ids):
+    """Return the bytes still allocated by what build(ids) returns."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build(ids)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    ids = make_ids(count)
+
+    print(f"{count:,} pending reminders")
+    for name, build in (
+        ("dict", build_dicts),
+        ("ReminderRecord", build_records),
+        ("array columns", build_columns),
+    ):
+        total = traced_bytes(build, ids)
+        print(f"{name:<16} {total / count:8.1f} bytes/reminder   {total / 2 ** 20:9.1f} MiB total")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the Discord bot.
+
+Measures, in fresh interpreter processes:
+
+- how long `import main` takes (everything that runs before the gateway connection starts)
+- how long creating the Firestore client takes (skipped if the credentials file is missing)
+
+Usage:
+    python benchmarks/bench_startup.py [runs]
+"""
+
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+SRC = PROJECT_ROOT / "src"
+
+IMPORT_SNIPPET = """
+import sys, time
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+import main
+print(time.perf_counter() - start)
+"""
+
+INIT_SNIPPET = """
+import sys, time
+sys.path.insert(0, {src!r})
+import db
+start = time.perf_counter()
+db.init_firestore()
+print(time.perf_counter() - start)
+"""
+
+
+def time_snippet(snippet, runs):
+    """Run a snippet in fresh processes and return the measured seconds of each run."""
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", snippet.format(src=str(SRC))],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def report(name, timings):
+    print(
+        f"{name:<24} median {statistics.median(timings) * 1000:8.1f} ms"
+        f"   min {min(timings) * 1000:8.1f} ms   max {max(timings) * 1000:8.1f} ms"
+    )
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    report("import main", time_snippet(IMPORT_SNIPPET, runs))
+
+    credentials = PROJECT_ROOT / "secrets" / "firestore-credentials.json"
+    if credentials.exists():
+        report("init_firestore()", time_snippet(INIT_SNIPPET, runs))
+    else:
+        print(f"init_firestore()         skipped ({credentials.relative_to(PROJECT_ROOT)} not found)")
+
+
+if __name__ == "__main__":
+    main()
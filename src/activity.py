@@ -0,0 +1,87 @@
+import time
+from collections import OrderedDict
+from typing import Dict, List
+
+import discord
+
+from config import config
+
+
+class RecentActivity:
+    """
+    Last time each member was active (sent a message or reacted) in a guild.
+
+    Used instead of presences to resolve @here when the presences intent is
+    disabled: a member counts as online if they were active within ``window``
+    seconds. Each guild keeps at most ``max_per_guild`` members, dropping the
+    least recently active first.
+    """
+
+    def __init__(self, window: int, max_per_guild: int = 1000):
+        self.window = window
+        self.max_per_guild = max_per_guild
+        self._last_seen: Dict[int, "OrderedDict[int, float]"] = {}
+
+    def record(self, guild_id: int, user_id: int) -> None:
+        """
+        Record that a member was active just now.
+
+        Args:
+            guild_id (int): The ID of the guild
+            user_id (int): The ID of the member
+        """
+        last_seen = self._last_seen.setdefault(guild_id, OrderedDict())
+        last_seen[user_id] = time.monotonic()
+        last_seen.move_to_end(user_id)
+        if len(last_seen) > self.max_per_guild:
+            last_seen.popitem(last=False)
+
+    def active_user_ids(self, guild_id: int) -> List[int]:
+        """
+        Return the members of a guild that were active within the window.
+
+        Args:
+            guild_id (int): The ID of the guild
+
+        Returns:
+            List[int]: The IDs of the active members, most recently active last
+        """
+        last_seen = self._last_seen.get(guild_id)
+        if not last_seen:
+            return []
+
+        # Entries are ordered by activity, so expired ones are at the front
+        cutoff = time.monotonic() - self.window
+        while last_seen and next(iter(last_seen.values())) < cutoff:
+            last_seen.popitem(last=False)
+        return list(last_seen)
+
+    def active_members(self, channel: discord.abc.GuildChannel) -> List[discord.Member]:
+        """
+        Resolve the members that count as online for an @here in a channel.
+
+        Args:
+            channel (discord.abc.GuildChannel): The channel where @here was used
+
+        Returns:
+            List[discord.Member]: Recently active members who can read the channel
+        """
+        guild = channel.guild
+        members = []
+        for user_id in self.active_user_ids(guild.id):
+            member = guild.get_member(user_id)
+            if member is not None and channel.permissions_for(member).read_messages:
+                members.append(member)
+        return members
+
+    def forget_guild(self, guild_id: int) -> None:
+        """
+        Drop the activity of a guild the bot is no longer in.
+
+        Args:
+            guild_id (int): The ID of the guild
+        """
+        self._last_seen.pop(guild_id, None)
+
+
+recent_activity = RecentActivity(config.HERE_ACTIVITY_WINDOW)
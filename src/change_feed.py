@@ -0,0 +1,158 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import config
+from metrics import metrics
+from pending import PendingReminderIndex
+from pending_store import ArrayPendingStore
+from records import ReminderRecord
+from snowflake import due_key, now_ms
+
+logger = logging.getLogger(__name__)
+
+# (change, doc_id, data), change being "ADDED", "MODIFIED" or "REMOVED"
+Change = Tuple[str, str, Dict[str, Any]]
+
+
+def parse_doc_id(doc_id: str) -> Optional[Tuple[int, int]]:
+    """
+    Return the (message_id, mentioned_user_id) of a reminder document ID.
+
+    Args:
+        doc_id (str): The document ID, as made by reminder_doc_id()
+
+    Returns:
+        Optional[Tuple[int, int]]: The reminder key, or None if the ID is not a reminder's
+    """
+    message_id, _, user_id = doc_id.rpartition("/")[2].partition("_")
+    if not message_id.isdigit() or not user_id.isdigit():
+        return None
+    return int(message_id), int(user_id)
+
+
+class ReminderChangeFeed:
+    """
+    Keeps the in-memory pending reminders in step with the backend.
+
+    Several bot processes can share one reminders collection, and each only
+    sees the replies, reactions and sweeps of its own gateway events. The feed
+    subscribes to the backend's changes and applies the reminders that other
+    processes add and delete to the local index and store, one change at a time.
+
+    The backend calls back from a background thread; the changes are handed over
+    to the event loop, where every other update of the index and store happens.
+    The first delivery lists every stored reminder and replaces the startup read.
+    """
+
+    def __init__(self, backend: Any, index: PendingReminderIndex, store: ArrayPendingStore):
+        self.backend = backend
+        self.index = index
+        self.store = store
+        self._watch = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._guild_of: Callable[[int], Optional[int]] = lambda channel_id: None
+        self._load_store = False
+        self._initial: Optional[asyncio.Future] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._watch is not None
+
+    def start(self, guild_of: Callable[[int], Optional[int]], load_store: bool = False) -> asyncio.Future:
+        """
+        Subscribe to the backend's changes. Must be called from the event loop.
+
+        Args:
+            guild_of (Callable[[int], Optional[int]]): Resolves a channel ID to its guild ID,
+                for reminders saved before guild IDs were stored
+            load_store (bool): Also load the first delivery into the store (call its track() first)
+
+        Returns:
+            asyncio.Future: Resolves to the number of stored reminders once the first delivery was applied
+        """
+        self._loop = asyncio.get_running_loop()
+        self._guild_of = guild_of
+        self._load_store = load_store
+        self._initial = self._loop.create_future()
+        self._watch = self.backend.watch(self._on_changes)
+        return self._initial
+
+    def stop(self) -> None:
+        """
+        Unsubscribe from the backend's changes.
+        """
+        if self._watch is None:
+            return
+        try:
+            self._watch.unsubscribe()
+        except Exception as e:
+            logger.error(f"Failed to stop the change feed: {e}")
+        self._watch = None
+
+    def _on_changes(self, changes: List[Change], read_time_ms: int) -> None:
+        # Runs in the backend's thread
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.apply, changes, read_time_ms)
+
+    def _record(self, data: Dict[str, Any]) -> ReminderRecord:
+        reminder = ReminderRecord.from_dict(data)
+        if reminder.due_at is None:
+            reminder.due_at = due_key(reminder.message_id, config.REMINDER_THRESHOLD)
+        if reminder.guild_id is None:
+            reminder.guild_id = self._guild_of(reminder.channel_id)
+        return reminder
+
+    def _add(self, data: Dict[str, Any]) -> None:
+        reminder = self._record(data)
+        if reminder.guild_id is not None:
+            self.index.add(reminder)
+        self.store.add(reminder)
+
+    def _remove(self, doc_id: str, data: Dict[str, Any]) -> None:
+        # Reminders saved before deterministic IDs have auto IDs, so their key is in the data
+        if data.get("message_id") is not None and data.get("mentioned_user_id") is not None:
+            key = (int(data["message_id"]), int(data["mentioned_user_id"]))
+        else:
+            key = parse_doc_id(doc_id)
+        if key is None:
+            return
+        self.index.remove(*key)
+        self.store.remove(*key)
+
+    def apply(self, changes: List[Change], read_time_ms: int) -> None:
+        """
+        Apply a delivery of changes to the index and store.
+
+        Args:
+            changes (List[Change]): The changed reminders, as (change, doc_id, data)
+            read_time_ms (int): When the backend read the changes, in ms since the Unix epoch
+        """
+        if self._initial is not None and not self._initial.done():
+            reminders = [data for change, _, data in changes if change != "REMOVED"]
+            try:
+                self.index.load(reminders, self._guild_of)
+                if self._load_store:
+                    self.store.load(reminders)
+            except Exception as e:
+                self._initial.set_exception(e)
+                return
+            self._initial.set_result(len(reminders))
+        else:
+            added = removed = 0
+            for change, doc_id, data in changes:
+                try:
+                    if change == "REMOVED":
+                        self._remove(doc_id, data)
+                        removed += 1
+                    elif change == "MODIFIED":
+                        self._remove(doc_id, data)
+                        self._add(data)
+                    else:
+                        self._add(data)
+                        added += 1
+                except Exception as e:
+                    logger.error(f"Failed to apply change {change} of reminder {doc_id}: {e}")
+            metrics.increment("change_feed.added", added)
+            metrics.increment("change_feed.removed", removed)
+        metrics.set_gauge("change_feed.lag_ms", max(0, now_ms() - read_time_ms))
@@ -18,13 +18,95 @@ class Config:
         True  # Whether to align the start of the reminder interval to the next hour. This only works if REMINDER_INTERVAL is a multiple of 3600 seconds.
     )
     USER_COUNT_UPDATE_INTERVAL: int = 60 * 60 * 24  # seconds (1 day)
+    REMINDER_GRACE_PERIOD: int = 30  # seconds - new reminders are kept in memory this long, and dropped without a write if answered (0 to disable)
+    REMINDER_SWEEP_SOURCE: str = "firestore"  # "firestore" (query due reminders every sweep) or "memory" (select them from an in-memory array store filled at startup, needs numpy)
+    REMINDER_DIGEST_MODE: str = "off"  # "off" (one message per channel), "dm" (one DM per user) or "channel" (one message per user in the guild's digest channel setting)
+    REMINDER_DIGEST_PER_GUILD: bool = True  # In "dm" mode, send a separate digest for each guild instead of one across all guilds
+
+    # Per-guild settings (overrides of REMINDER_THRESHOLD, MAX_ROLE_MEMBERS and the message templates, stored in FIRESTORE_COLLECTION_GUILD_SETTINGS)
+    GUILD_SETTINGS_CACHE_TTL: int = 60 * 10  # seconds - how long cached guild settings are served before a background refresh
+
+    # /still-waiting command (served from the in-memory pending reminder index)
+    STILL_WAITING_PAGE_SIZE: int = 10  # reminders per page
+    STILL_WAITING_LOAD_ON_START: bool = True  # Fill the index from storage when the bot is ready (from the snapshot and the changes since, or one read of every stored reminder)
+
+    # Snapshot of the pending reminders, so restarts read only what changed since instead of every stored reminder
+    SNAPSHOT_PATH: str = "data/pending.snapshot"
+    SNAPSHOT_INTERVAL: int = 60 * 5  # seconds - how often the snapshot is written (0 to disable)
+    SNAPSHOT_RECONCILE_MARGIN: int = 60 * 10  # seconds - reminders for messages this long before the snapshot are read again, to cover the grace period and outbox delays
+    TOMBSTONE_RETENTION: int = 60 * 60 * 24 * 7  # seconds (7 days) - how long records of deleted reminders are kept; older snapshots are not used
+
+    # Change feed, for several bot processes sharing one reminders collection
+    CHANGE_FEED_ENABLED: bool = False  # Follow reminders added and deleted by other processes (Firestore on_snapshot). The feed's first delivery replaces the startup read
+    CHANGE_FEED_START_TIMEOUT: int = 60  # seconds - how long to wait for the feed's first delivery before reading the reminders without it
+
+    # Unreachable channels, users, messages and permissions found by sweeps (skipped without REST calls, and not registered)
+    UNREACHABLE_CACHE_TTL: int = 60 * 60 * 6  # seconds - how long a failed check is trusted, unless a gateway event makes it reachable again sooner
+
+    # Member cache
+    LOW_MEMORY_MODE: bool = False  # Skip chunking guilds at startup and only fetch a guild's members when a mention needs them
+    MAX_CHUNKED_GUILDS: int = 10  # In low memory mode, the number of fully chunked guilds to keep (least recently used are evicted)
+
+    # Memory budget
+    MEMORY_BUDGET_MB: int = 0  # Target RSS in MiB (e.g. 700 on a 1 GB VM). Warns when the process goes over it (0 to disable)
+    MEMORY_BUDGET_EVICT: bool = False  # Over the budget, also trim the message cache, the permission cache and (in low memory mode) the chunked guilds, until RSS is back under 80% of it
+    MEMORY_CHECK_INTERVAL: int = 60 * 5  # seconds - how often the memory of each cache is reported and the budget checked (0 to disable)
+    MESSAGE_CACHE_SIZE: int = 1000  # Messages cached by discord.py (its default), lower it on small VMs (0 to disable the cache)
+
+    # Presences
+    PRESENCE_INTENT: bool = True  # If False, the presences intent is not requested and @here is resolved from recent activity
+    HERE_ACTIVITY_WINDOW: int = 60 * 10  # seconds - without presences, members active within this window count as online for @here
+
+    # Event pipeline (gateway events are handled in order per channel, concurrently across channels)
+    EVENT_QUEUE_SIZE: int = 1000  # Maximum events queued or in flight, further events wait for room (0 to handle events inline)
+    EVENT_CONCURRENCY: int = 32  # Maximum events handled at the same time
+    EVENT_SHED_POLICY: str = "drop"  # Under overload, "drop" skips message statistics writes, "wait" queues them like any other event
+
+    # Shutdown
+    SHUTDOWN_TIMEOUT: int = 20  # seconds - on SIGTERM or SIGINT, a running sweep, queued events and buffered writes get this long to finish
+
+    # Logging (written to the console by a background thread)
+    LOG_LEVEL: str = "INFO"
+    LOG_HOT_PATH_RATE: float = 5  # INFO lines per second allowed from each line of code in handle_input.py and reminder.py
+    LOG_HOT_PATH_BURST: int = 50  # INFO lines allowed at once from each of those lines of code
+    LOG_HOT_PATH_SAMPLE: int = 100  # Over the limit, one line in this many is still logged
+
+    # Metrics
+    GATEWAY_EVENT_METRICS: bool = False  # Count gateway events by type (e.g. to compare traffic with and without presences). Opt-in diagnostic: it adds a dispatch to every gateway event
+    METRICS_LOG_INTERVAL: int = 60 * 60  # seconds (1 hour) - how often to log metrics
+    PROFILE_DIR: str = "data/profiles"  # Where /profile and SIGUSR1 write CPU, wall-clock and allocation profiles
+    PROFILE_DEFAULT_SECONDS: int = 30  # seconds - how long a profile runs unless the command says otherwise
+    PROFILE_MAX_SECONDS: int = 60 * 5
+    PROFILE_SAMPLE_INTERVAL: float = 0.01  # seconds - between wall-clock stack samples
+    EVENT_LOOP: str = "asyncio"  # "asyncio" or "uvloop" (faster I/O, needs uvloop, falls back to asyncio if it is not installed)
+    LOOP_MONITOR_INTERVAL: float = 0.5  # seconds - how often the event loop lag is measured (0 to disable)
+    LOOP_SLOW_THRESHOLD: float = 0.25  # seconds - lag above this is reported as a stall, with the stack of the code blocking the loop
 
     # Firestore
+    FIRESTORE_CREDENTIALS_PATH: str = "secrets/firestore-credentials.json"
     FIRESTORE_COLLECTION_REMINDERS: str = "discord_reminders"
     FIRESTORE_COLLECTION_STATISTICS: str = "statistics"
+    FIRESTORE_COLLECTION_GUILD_SETTINGS: str = "discord_guild_settings"
     FIRESTORE_DOCUMENT_DISCORD_GUILDS: str = "discord_guilds"
     FIRESTORE_DOCUMENT_DISCORD_USERS: str = "discord_users"
     FIRESTORE_DOCUMENT_DISCORD_MESSAGES: str = "discord_messages"
+    FIRESTORE_COLLECTION_REMINDER_BUCKETS: str = "discord_reminder_buckets"
+    FIRESTORE_SUBCOLLECTION_REMINDERS: str = "reminders"
+    FIRESTORE_COLLECTION_REMINDER_TOMBSTONES: str = "discord_reminder_tombstones"
+    REMINDER_LAYOUT: str = "flat"  # "flat" (one collection) or "bucketed" (reminders filed by due time, see migrate_to_buckets.py)
+    REMINDER_BUCKET_SECONDS: int = 60 * 60  # seconds (1 hour) - time span of one bucket in the bucketed layout
+    LEGACY_CREATED_AT_SWEEP: bool = True  # Also sweep reminders saved before due_at keys existed (disable once none are left)
+
+    # Outbox (local write-ahead log that decouples reminder writes from the backend)
+    OUTBOX_ENABLED: bool = True
+    OUTBOX_PATH: str = "data/outbox.log"
+    OUTBOX_BATCH_SIZE: int = 100  # writes per backend batch (Firestore allows at most 500)
+    OUTBOX_FLUSH_INTERVAL: float = 1.0  # seconds - how often pending writes are drained
+    OUTBOX_MAX_RETRY_DELAY: int = 60  # seconds - upper bound of the backoff while the backend is unavailable
+    OUTBOX_FSYNC: bool = False  # fsync every write (survives power loss, not just process crashes)
+    OUTBOX_MAX_ATTEMPTS: int = 5  # a write rejected this many times (not counting outages and rate limits) is moved to OUTBOX_DEAD_LETTER_PATH
+    OUTBOX_DEAD_LETTER_PATH: str = "data/outbox.dead.log"
+    OUTBOX_COMPACT_AFTER: int = 1000  # drained writes kept in the log before it is rewritten with only the pending ones
 
     # Message templates
     REMINDER_MESSAGE_START: str = "## Still Waiting Reminders\n"
@@ -34,6 +116,12 @@ class Config:
     REMINDER_MESSAGE_END: str = (
         "To avoid being reminded next time, please send a message in the channel/thread or leave a stamp directly on the mentioned message."
     )
+    REMINDER_DIGEST_START: str = "## Still Waiting Reminders\n{user_mention} You haven't responded to these mentions:\n"
+    REMINDER_DIGEST_MAIN: str = "- {message_link}\n"
+    STILL_WAITING_START: str = "## Still Waiting\n"
+    STILL_WAITING_INCOMING: str = "- {user_mention} is waiting for you in {message_link}, reminder {due}\n"
+    STILL_WAITING_OUTGOING: str = "- You are waiting for {user_mention} in {message_link}, reminder {due}\n"
+    STILL_WAITING_EMPTY: str = "Nobody is waiting for you, and you are not waiting for anyone in this server."
     ROLE_SIZE_ERROR: str = (
         "The reminders will not be sent to these members even if they don't reply, since the number of the role members exceeds the limit of {limit}."
     )
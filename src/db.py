@@ -1,78 +1,557 @@
 import logging
+import threading
 from datetime import datetime, timedelta, timezone
 
-import firebase_admin
-from firebase_admin import credentials, firestore
-from google.cloud.firestore_v1.base_query import FieldFilter
-
 from config import Config
+from snowflake import due_key, now_ms, snowflake_time_ms
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
-# Firebase Admin SDK initialization
-cred = credentials.Certificate("secrets/firestore-credentials.json")
-firebase_admin.initialize_app(cred)
-db = firestore.client()
+# Firestore rejects batched writes with more writes than this
+MAX_BATCH_WRITES = 500
+
+# The Firestore SDK pulls in gRPC, so it is imported and the client is created
+# lazily (see init_firestore) instead of as a side effect of importing this module
+_client = None
+_client_lock = threading.Lock()
+
+
+def init_firestore():
+    """
+    Initialize the Firebase Admin SDK and create the Firestore client.
+
+    Only the first call does the work; it is safe to call again and from several
+    threads. Call it ahead of time (e.g. in a thread while the gateway connects)
+    to warm up the backend, otherwise the first database call does it.
+
+    Returns:
+        google.cloud.firestore.Client: The Firestore client
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            import firebase_admin
+            from firebase_admin import credentials, firestore
+
+            cred = credentials.Certificate(Config.FIRESTORE_CREDENTIALS_PATH)
+            app = firebase_admin.initialize_app(cred)
+            _client = firestore.client(app)
+    return _client
+
+
+def get_client():
+    """
+    Return the Firestore client, creating it on first use.
+
+    Returns:
+        google.cloud.firestore.Client: The Firestore client
+    """
+    if _client is None:
+        return init_firestore()
+    return _client
+
+
+def reminder_doc_id(message_id, mentioned_user_id):
+    """
+    Return the document ID of the reminder for a message and a mentioned user.
+
+    Deterministic IDs make saving a reminder idempotent, so a write that is
+    retried or replayed does not create a duplicate reminder.
+    """
+    return f"{message_id}_{mentioned_user_id}"
 
 
 class FirestoreReminderCollection:
     """
     Firestore collection for reminders.
+
+    With the "flat" layout every reminder is a document of one collection. With
+    the "bucketed" layout reminders are filed by due time into
+    ``<buckets collection>/<bucket>/<reminders subcollection>/<id>``, where each
+    bucket covers REMINDER_BUCKET_SECONDS. The sweep then reads only the buckets
+    that are due, and a bucket whose reminders have all been handled is dropped.
     """
 
-    def __init__(self):
-        self.db = db
-        self.collection_reminders = db.collection(Config.FIRESTORE_COLLECTION_REMINDERS)
+    def __init__(self, client=None, layout=None):
+        self._db = client
+        self._collection_reminders = None
+        self._collection_buckets = None
+        self._collection_tombstones = None
+        self.layout = layout or Config.REMINDER_LAYOUT
+        self.bucket_ms = Config.REMINDER_BUCKET_SECONDS * 1000
+        self._known_buckets = set()
+        # Past buckets read by the sweep: bucket -> (update time of the bucket document, keys of its reminders)
+        self._swept_buckets = {}
 
-    def _make_data(self, message_id, channel_id, mentioned_user_id):
-        return {
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = get_client()
+        return self._db
+
+    @property
+    def collection_reminders(self):
+        if self._collection_reminders is None:
+            self._collection_reminders = self.db.collection(Config.FIRESTORE_COLLECTION_REMINDERS)
+        return self._collection_reminders
+
+    @property
+    def collection_buckets(self):
+        if self._collection_buckets is None:
+            self._collection_buckets = self.db.collection(Config.FIRESTORE_COLLECTION_REMINDER_BUCKETS)
+        return self._collection_buckets
+
+    @property
+    def collection_tombstones(self):
+        if self._collection_tombstones is None:
+            self._collection_tombstones = self.db.collection(Config.FIRESTORE_COLLECTION_REMINDER_TOMBSTONES)
+        return self._collection_tombstones
+
+    @property
+    def bucketed(self):
+        return self.layout == "bucketed"
+
+    def bucket_of(self, due_at):
+        """Return the bucket number that a due key falls into."""
+        return due_at // self.bucket_ms
+
+    def _bucket_ref(self, bucket):
+        return self.collection_buckets.document(str(bucket))
+
+    def _query_root(self):
+        # Queries that are not about due times search every bucket at once
+        if self.bucketed:
+            return self.db.collection_group(Config.FIRESTORE_SUBCOLLECTION_REMINDERS)
+        return self.collection_reminders
+
+    def _reminder_ref(self, data):
+        doc_id = reminder_doc_id(data["message_id"], data["mentioned_user_id"])
+        if self.bucketed:
+            bucket = self.bucket_of(data["due_at"])
+            return self._bucket_ref(bucket).collection(Config.FIRESTORE_SUBCOLLECTION_REMINDERS).document(doc_id)
+        return self.collection_reminders.document(doc_id)
+
+    def _tombstone(self, batch, mentioned_user_id, message_id=None, channel_id=None):
+        # Records a delete in the same batch, so a restart from a snapshot sees it (see get_reminders_deleted_since)
+        if message_id is not None:
+            doc_id = reminder_doc_id(message_id, mentioned_user_id)
+            data = {"message_id": message_id, "mentioned_user_id": mentioned_user_id}
+        else:
+            doc_id = f"replied_{channel_id}_{mentioned_user_id}"
+            data = {"channel_id": channel_id, "mentioned_user_id": mentioned_user_id}
+        batch.set(self.collection_tombstones.document(doc_id), {**data, "deleted_at": now_ms()})
+
+    def _doc_ref(self, doc_id):
+        # Bucketed searches return full document paths rather than IDs
+        if "/" in doc_id:
+            return self.db.document(doc_id)
+        return self.collection_reminders.document(doc_id)
+
+    def _batch_save(self, batch, data):
+        """Add a reminder to a write batch, and return the number of writes added."""
+        batch.set(self._reminder_ref(data), data)
+        if not self.bucketed:
+            return 1
+        from firebase_admin import firestore
+
+        bucket = self.bucket_of(data["due_at"])
+        current = self.bucket_of(now_ms())
+        if bucket in self._known_buckets and bucket > current:
+            return 1
+        # The bucket document is what the sweep looks up. Buckets that are already
+        # due may be dropped by a sweep at any time, so they are never cached.
+        # written_at changes the document on every write, which makes a sweep's
+        # drop of a bucket it has read fail its precondition (see drop_bucket)
+        batch.set(self._bucket_ref(bucket), {"bucket": bucket, "written_at": firestore.SERVER_TIMESTAMP}, merge=True)
+        if bucket > current:
+            self._known_buckets.add(bucket)
+        return 2
+
+    def _make_data(self, message_id, channel_id, mentioned_user_id, threshold=None, guild_id=None, author_id=None):
+        # Times come from the message ID snowflake, so no server timestamp is needed
+        if threshold is None:
+            threshold = Config.REMINDER_THRESHOLD
+        data = {
             "message_id": message_id,
             "channel_id": channel_id,
             "mentioned_user_id": mentioned_user_id,
-            "created_at": firestore.SERVER_TIMESTAMP,
+            "created_at": snowflake_time_ms(message_id),
+            "due_at": due_key(message_id, threshold),
         }
+        # Lets the pending reminder index be rebuilt from storage
+        if guild_id is not None:
+            data["guild_id"] = guild_id
+        if author_id is not None:
+            data["author_id"] = author_id
+        return data
+
+    def save_message(self, message_id, channel_id, mentioned_user_id, threshold=None, guild_id=None, author_id=None):
+        data = self._make_data(message_id, channel_id, mentioned_user_id, threshold, guild_id, author_id)
+        if self.bucketed:
+            batch = self.db.batch()
+            self._batch_save(batch, data)
+            batch.commit()
+        else:
+            self._reminder_ref(data).set(data)
+
+    def get_pending_reminders(self):
+        """
+        Return every stored reminder, to rebuild the pending reminder index.
+
+        Returns:
+            list: The reminders as dicts
+        """
+        return [doc.to_dict() for doc in self._query_root().stream()]
+
+    def get_reminders_created_since(self, since_ms):
+        """
+        Return the reminders for messages sent at or after a time, to catch up from a snapshot.
+
+        Args:
+            since_ms (int): Milliseconds since the Unix epoch
+
+        Returns:
+            list: The reminders as dicts
+        """
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        query = self._query_root().where(filter=FieldFilter("created_at", ">=", since_ms))
+        return [doc.to_dict() for doc in query.stream()]
+
+    def get_reminders_deleted_since(self, since_ms):
+        """
+        Return the records of reminders deleted at or after a time, to catch up from a snapshot.
+
+        Args:
+            since_ms (int): Milliseconds since the Unix epoch
+
+        Returns:
+            list: Dicts with ``deleted_at`` and either ``message_id`` and ``mentioned_user_id``
+            (one reminder), or ``channel_id`` and ``mentioned_user_id`` (every reminder of
+            the user in the channel for a message sent before ``deleted_at``, after a reply)
+        """
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        query = self.collection_tombstones.where(filter=FieldFilter("deleted_at", ">=", since_ms))
+        return [doc.to_dict() for doc in query.stream()]
+
+    def prune_tombstones(self, before_ms, batch_size=400):
+        """
+        Delete the records of reminders deleted before a time.
+
+        Args:
+            before_ms (int): Milliseconds since the Unix epoch
+            batch_size (int): Deletes per batched write (Firestore allows at most 500)
+
+        Returns:
+            int: The number of records deleted
+        """
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        query = self.collection_tombstones.where(filter=FieldFilter("deleted_at", "<", before_ms))
+        pruned = 0
+        while True:
+            docs = list(query.limit(batch_size).stream())
+            if not docs:
+                return pruned
+            batch = self.db.batch()
+            for doc in docs:
+                batch.delete(doc.reference)
+            batch.commit()
+            pruned += len(docs)
+
+    def watch(self, callback):
+        """
+        Listen to reminders being added and deleted, in a background thread.
+
+        The first call of the callback lists every stored reminder as added,
+        later calls list only what changed.
+
+        Args:
+            callback (Callable): Called with a list of (change, doc_id, data) tuples, where
+                change is "ADDED", "MODIFIED" or "REMOVED", and the read time in ms.
+                Removed documents may come without data, their ID identifies them
+
+        Returns:
+            google.cloud.firestore_v1.watch.Watch: Call unsubscribe() to stop listening
+        """
+        def on_snapshot(doc_snapshots, changes, read_time):
+            callback(
+                [(change.type.name, change.document.id, change.document.to_dict() or {}) for change in changes],
+                int(read_time.timestamp() * 1000),
+            )
 
-    def save_message(self, message_id, channel_id, mentioned_user_id):
-        data = self._make_data(message_id, channel_id, mentioned_user_id)
-        self.collection_reminders.add(data)
+        return self._query_root().on_snapshot(on_snapshot)
 
     def search_reminders(self, channel_id, user_id):
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
         query = (
-            self.collection_reminders
+            self._query_root()
             .where(filter=FieldFilter("channel_id", "==", channel_id))
             .where(filter=FieldFilter("mentioned_user_id", "==", user_id))
         )
+        if self.bucketed:
+            return list(doc.reference.path for doc in query.stream())
         matched_message_ids = list(doc.id for doc in query.stream())
         return matched_message_ids
 
     def delete_messages_by_doc_ids(self, doc_ids):
         for doc_id in doc_ids:
-            doc_ref = (
-                self.collection_reminders
-                .document(doc_id)
-            )
+            doc_ref = self._doc_ref(doc_id)
             doc_ref.delete()
 
-    def delete_message_by_message_and_user_id(self, message_id, user_id):
-        docs = self.collection_reminders \
+    def delete_replied(self, channel_id, user_id):
+        """
+        Delete the reminders of a user in a channel, after the user replied there.
+
+        Args:
+            channel_id (int): The channel
+            user_id (int): The user who replied
+
+        Returns:
+            int: The number of reminders deleted
+        """
+        doc_ids = self.search_reminders(channel_id, user_id)
+        if not doc_ids:
+            return 0
+        batch = self.db.batch()
+        for doc_id in doc_ids:
+            batch.delete(self._doc_ref(doc_id))
+        self._tombstone(batch, channel_id=channel_id, mentioned_user_id=user_id)
+        batch.commit()
+        return len(doc_ids)
+
+    def _find(self, message_id, user_id):
+        # Finds the reminder whatever its document ID
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        docs = self._query_root() \
             .where(filter=FieldFilter("message_id", "==", message_id)) \
             .where(filter=FieldFilter("mentioned_user_id", "==", user_id)) \
             .limit(1).stream()
+        return next(iter(docs), None)
 
-        doc = next(iter(docs), None)
+    def delete_message_by_message_and_user_id(self, message_id, user_id):
+        doc = self._find(message_id, user_id)
         if doc:
-            doc.reference.delete()
+            batch = self.db.batch()
+            batch.delete(doc.reference)
+            self._tombstone(batch, message_id=message_id, mentioned_user_id=user_id)
+            batch.commit()
+            return True
         else:
             logger.error(f"Attempted to delete non-existing message: {message_id} for user: {user_id}")
             return False
 
+    def apply_writes(self, writes):
+        """
+        Apply writes drained from the outbox, in order.
+
+        Saves are grouped into batched writes. A batch is committed before any
+        delete, since deletes query the collection and must see earlier saves.
+
+        Args:
+            writes (list): (operation, arguments) pairs, see outbox.OPERATIONS
+        """
+        batch = self.db.batch()
+        batched = 0
+        for op, args in writes:
+            if op == "save":
+                batched += self._batch_save(batch, self._make_data(**args))
+                continue
+
+            if batched:
+                batch.commit()
+                batch = self.db.batch()
+                batched = 0
+
+            if op == "delete_replied":
+                self.delete_replied(args["channel_id"], args["user_id"])
+            elif op == "delete_reacted":
+                self.delete_message_by_message_and_user_id(args["message_id"], args["user_id"])
+            else:
+                raise ValueError(f"Unknown outbox operation: {op}")
+
+        if batched:
+            batch.commit()
+
     def get_expired_messages(self, threshold):
-        expire_time = datetime.now(timezone.utc) - timedelta(seconds=threshold)
-        docs = self.collection_reminders.where(
-            filter=FieldFilter("created_at", "<=", expire_time)
-        ).stream()
-        return [doc.to_dict() for doc in docs]
+        """
+        Return the reminders that are due.
+
+        Reminders are due once their integer ``due_at`` key has passed. Reminders
+        saved before due keys existed only have a server timestamp in
+        ``created_at``; they are found by comparing it with the threshold while
+        LEGACY_CREATED_AT_SWEEP is enabled.
+
+        Args:
+            threshold (int): Seconds to wait for a response, for reminders without a due key
+
+        Returns:
+            list: The due reminders as dicts
+        """
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        if self.bucketed:
+            return self._get_expired_bucketed()
+
+        queries = [
+            self.collection_reminders.where(filter=FieldFilter("due_at", "<=", now_ms()))
+        ]
+        if Config.LEGACY_CREATED_AT_SWEEP:
+            # Timestamp comparisons never match the integer created_at of newer reminders
+            expire_time = datetime.now(timezone.utc) - timedelta(seconds=threshold)
+            queries.append(
+                self.collection_reminders.where(filter=FieldFilter("created_at", "<=", expire_time))
+            )
+
+        reminders = {}
+        for query in queries:
+            for doc in query.stream():
+                reminders.setdefault(doc.id, doc.to_dict())
+        return list(reminders.values())
+
+    def _get_expired_bucketed(self):
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        now = now_ms()
+        current = self.bucket_of(now)
+        buckets = self.collection_buckets.where(filter=FieldFilter("bucket", "<=", current)).stream()
+
+        reminders = []
+        for bucket_doc in buckets:
+            bucket = bucket_doc.to_dict()["bucket"]
+            collection = self._bucket_ref(bucket).collection(Config.FIRESTORE_SUBCOLLECTION_REMINDERS)
+            if bucket < current:
+                # Every reminder of a past bucket is due
+                docs = [doc.to_dict() for doc in collection.stream()]
+                if not docs:
+                    self.drop_bucket(bucket, bucket_doc.update_time)
+                else:
+                    keys = {(doc.get("message_id"), doc.get("mentioned_user_id")) for doc in docs}
+                    self._swept_buckets[bucket] = (bucket_doc.update_time, keys)
+            else:
+                docs = [
+                    doc.to_dict()
+                    for doc in collection.where(filter=FieldFilter("due_at", "<=", now)).stream()
+                ]
+            reminders.extend(docs)
+        return reminders
+
+    def delete_reminders(self, reminders, batch_size=200):
+        """
+        Delete reminders that were sent or found invalid by the sweep.
+
+        In the flat layout each reminder is looked up by its message and user,
+        which also finds reminders saved with random document IDs. In the
+        bucketed layout the reminders are deleted in batched writes, and every
+        past bucket whose reminders read by get_expired_messages() have all been
+        handled is dropped.
+
+        Args:
+            reminders (list): ReminderRecord objects, with due_at set in the bucketed layout
+            batch_size (int): Reminders per batched write, each is a delete and a tombstone (Firestore allows at most 500 writes)
+        """
+        if not self.bucketed:
+            for reminder in reminders:
+                self.delete_message_by_message_and_user_id(reminder.message_id, reminder.mentioned_user_id)
+            return
+
+        for start in range(0, len(reminders), batch_size):
+            batch = self.db.batch()
+            for reminder in reminders[start:start + batch_size]:
+                batch.delete(self._reminder_ref(reminder.to_dict()))
+                self._tombstone(batch, message_id=reminder.message_id, mentioned_user_id=reminder.mentioned_user_id)
+            batch.commit()
+
+        handled = {reminder.key for reminder in reminders}
+        for bucket, (update_time, keys) in list(self._swept_buckets.items()):
+            if keys <= handled:
+                self.drop_bucket(bucket, update_time)
+                del self._swept_buckets[bucket]
+
+    def drop_bucket(self, bucket, last_update_time=None):
+        """
+        Delete the document of a bucket whose reminders have all been handled, so sweeps stop reading it.
+
+        Reminders are never deleted here. A reminder written to the bucket after
+        the sweep read it also rewrites the bucket document, so the delete fails
+        its precondition and the bucket is read again by the next sweep.
+
+        Args:
+            bucket (int): The bucket number
+            last_update_time (datetime.datetime): Update time of the bucket document when it was read
+
+        Returns:
+            bool: True if the bucket was dropped
+        """
+        from google.api_core import exceptions
+
+        option = self.db.write_option(last_update_time=last_update_time) if last_update_time is not None else None
+        try:
+            self._bucket_ref(bucket).delete(option=option)
+        except (exceptions.FailedPrecondition, exceptions.NotFound):
+            logger.info(f"Kept reminder bucket {bucket}, it was written to after the sweep read it")
+            return False
+        self._known_buckets.discard(bucket)
+        logger.info(f"Dropped reminder bucket {bucket}")
+        return True
+
+    def migrate_to_buckets(self, threshold=None, batch_size=200):
+        """
+        Move reminders from the flat collection into due-time buckets.
+
+        Each reminder is written to its bucket and deleted from the flat
+        collection in the same batched write, so the migration can be stopped
+        and resumed. Reminders without a due key get one from their message ID,
+        every other stored field is kept.
+
+        Args:
+            threshold (int): Seconds to wait for a response, for reminders without a due key
+            batch_size (int): Reminders read at a time; batched writes are committed before they exceed MAX_BATCH_WRITES
+
+        Returns:
+            int: The number of reminders migrated
+        """
+        if threshold is None:
+            threshold = Config.REMINDER_THRESHOLD
+
+        migrated = 0
+        while True:
+            docs = list(self.collection_reminders.limit(batch_size).stream())
+            if not docs:
+                break
+            batch = self.db.batch()
+            writes = 0
+            for doc in docs:
+                # A reminder takes up to 3 writes: the reminder, its bucket and the delete
+                if writes + 3 > MAX_BATCH_WRITES:
+                    batch.commit()
+                    batch = self.db.batch()
+                    writes = 0
+                old_data = doc.to_dict()
+                data = self._make_data(
+                    old_data["message_id"],
+                    old_data["channel_id"],
+                    old_data["mentioned_user_id"],
+                    threshold,
+                    old_data.get("guild_id"),
+                    old_data.get("author_id"),
+                )
+                if "due_at" in old_data:
+                    data["due_at"] = old_data["due_at"]
+                # Reminders saved before due keys existed have a server timestamp, replaced by the message time
+                if isinstance(old_data.get("created_at"), int):
+                    data["created_at"] = old_data["created_at"]
+                writes += self._batch_save(batch, data)
+                batch.delete(doc.reference)
+                writes += 1
+            batch.commit()
+            migrated += len(docs)
+            logger.info(f"Migrated {migrated} reminders to buckets")
+        return migrated
 
 
 class FirestoreStatsCollection:
@@ -80,11 +559,25 @@ class FirestoreStatsCollection:
     Firestore collection for statistics.
     """
 
-    def __init__(self):
-        self.db = db
-        self.collection_stats = db.collection(Config.FIRESTORE_COLLECTION_STATISTICS)
+    def __init__(self, client=None):
+        self._db = client
+        self._collection_stats = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = get_client()
+        return self._db
+
+    @property
+    def collection_stats(self):
+        if self._collection_stats is None:
+            self._collection_stats = self.db.collection(Config.FIRESTORE_COLLECTION_STATISTICS)
+        return self._collection_stats
 
     def _make_data(self, metric, count):
+        from firebase_admin import firestore
+
         return {
             "platform": "discord",
             "metric": metric,
@@ -101,5 +594,36 @@ class FirestoreStatsCollection:
         self.collection_stats.document("discord_users").set(data, merge=True)
 
     def increment_message_count(self):
+        from firebase_admin import firestore
+
         data = self._make_data("message_count", firestore.Increment(1))
         self.collection_stats.document("discord_messages").set(data, merge=True)
+
+
+class FirestoreGuildSettingsCollection:
+    """
+    Firestore collection for per-guild settings, one document per guild.
+    """
+
+    def __init__(self, client=None):
+        self._db = client
+        self._collection_settings = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = get_client()
+        return self._db
+
+    @property
+    def collection_settings(self):
+        if self._collection_settings is None:
+            self._collection_settings = self.db.collection(Config.FIRESTORE_COLLECTION_GUILD_SETTINGS)
+        return self._collection_settings
+
+    def get_settings(self, guild_ids):
+        refs = [self.collection_settings.document(str(guild_id)) for guild_id in guild_ids]
+        return {int(doc.id): doc.to_dict() for doc in self.db.get_all(refs) if doc.exists}
+
+    def set_settings(self, guild_id, data):
+        self.collection_settings.document(str(guild_id)).set(data)
@@ -0,0 +1,48 @@
+import asyncio
+import logging
+
+try:
+    import uvloop
+except ImportError:  # uvloop is optional, the default asyncio loop is used then
+    uvloop = None
+
+logger = logging.getLogger(__name__)
+
+LOOP_IMPLEMENTATIONS = ("asyncio", "uvloop")
+
+
+def loop_policy(name: str) -> asyncio.AbstractEventLoopPolicy:
+    """
+    Return the event loop policy of a loop implementation.
+
+    Args:
+        name (str): "asyncio" or "uvloop"
+
+    Returns:
+        asyncio.AbstractEventLoopPolicy: The policy, the default one if uvloop is asked for but not installed
+
+    Raises:
+        ValueError: If the implementation is unknown
+    """
+    if name not in LOOP_IMPLEMENTATIONS:
+        raise ValueError(f"Unknown event loop: {name}")
+    if name == "uvloop" and uvloop is not None:
+        return uvloop.EventLoopPolicy()
+    return asyncio.DefaultEventLoopPolicy()
+
+
+def use_event_loop(name: str) -> str:
+    """
+    Make asyncio.run() create loops of the given implementation.
+
+    Args:
+        name (str): "asyncio" or "uvloop"
+
+    Returns:
+        str: The implementation in use, "asyncio" if uvloop is asked for but not installed
+    """
+    if name == "uvloop" and uvloop is None:
+        logger.warning("uvloop is not installed (pip install uvloop), using the default asyncio event loop")
+        name = "asyncio"
+    asyncio.set_event_loop_policy(loop_policy(name))
+    return name
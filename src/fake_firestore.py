@@ -0,0 +1,437 @@
+import copy
+import enum
+import operator
+import random
+import string
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from google.api_core import exceptions
+from google.cloud.firestore_v1.transforms import DELETE_FIELD, SERVER_TIMESTAMP, Increment
+
+# Firestore allows at most this many writes in one batch
+MAX_BATCH_WRITES = 500
+
+OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda value, values: value in values,
+    "not-in": lambda value, values: value not in values,
+    "array-contains": lambda value, item: isinstance(value, list) and item in value,
+}
+
+_MISSING = object()
+
+# (kind, reference, data, merge, option), kind is "set", "update" or "delete"
+Write = Tuple[str, "FakeDocumentReference", Optional[Dict[str, Any]], bool, Any]
+
+
+class ChangeType(enum.Enum):
+    ADDED = 1
+    REMOVED = 2
+    MODIFIED = 3
+
+
+def _split(path: str) -> Tuple[str, str]:
+    # "a/b/c/d" -> ("a/b/c", "d")
+    parent, _, doc_id = path.rpartition("/")
+    return parent, doc_id
+
+
+def _field(data: Dict[str, Any], field_path: str) -> Any:
+    value: Any = data
+    for part in field_path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _apply(current: Optional[Dict[str, Any]], data: Dict[str, Any], merge: bool) -> Dict[str, Any]:
+    # Resolves transforms (Increment, SERVER_TIMESTAMP, DELETE_FIELD) against the stored document
+    result = copy.deepcopy(current) if merge and current is not None else {}
+    for key, value in data.items():
+        if value is DELETE_FIELD:
+            result.pop(key, None)
+        elif value is SERVER_TIMESTAMP:
+            result[key] = datetime.now(timezone.utc)
+        elif isinstance(value, Increment):
+            previous = result.get(key)
+            result[key] = (previous if isinstance(previous, (int, float)) else 0) + value.value
+        else:
+            result[key] = copy.deepcopy(value)
+    return result
+
+
+class FakeDocumentSnapshot:
+    """
+    A document as read from FakeFirestore.
+    """
+
+    def __init__(self, reference: "FakeDocumentReference", data: Optional[Dict[str, Any]], update_time: Optional[datetime] = None):
+        self.reference = reference
+        self._data = data
+        self.update_time = update_time
+
+    @property
+    def id(self) -> str:
+        return self.reference.id
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data)
+
+    def get(self, field_path: str) -> Any:
+        value = _field(self._data or {}, field_path)
+        if value is _MISSING:
+            raise KeyError(field_path)
+        return copy.deepcopy(value)
+
+
+class FakeWatch:
+    """
+    A listener registered with on_snapshot(). Changes are delivered in the thread that wrote them.
+    """
+
+    def __init__(self, client: "FakeFirestore", query: "FakeQuery", callback: Callable):
+        self._client = client
+        self._query = query
+        self._callback = callback
+        # path -> data, as last delivered
+        self._delivered: Dict[str, Dict[str, Any]] = {}
+
+    def _changes(self) -> Tuple[List[FakeDocumentSnapshot], List[SimpleNamespace]]:
+        current = {snapshot.reference.path: snapshot for snapshot in self._query._matching()}
+        changes = []
+        for path, snapshot in current.items():
+            if path not in self._delivered:
+                changes.append(SimpleNamespace(type=ChangeType.ADDED, document=snapshot))
+            elif self._delivered[path] != snapshot._data:
+                changes.append(SimpleNamespace(type=ChangeType.MODIFIED, document=snapshot))
+        for path, data in self._delivered.items():
+            if path not in current:
+                changes.append(SimpleNamespace(type=ChangeType.REMOVED, document=FakeDocumentSnapshot(self._client.document(path), data)))
+        self._delivered = {path: copy.deepcopy(snapshot._data) for path, snapshot in current.items()}
+        return list(current.values()), changes
+
+    def _deliver(self, initial: bool = False) -> None:
+        snapshots, changes = self._changes()
+        if changes or initial:
+            self._client._count(None, documents=("read", len(changes)))
+            self._callback(snapshots, changes, datetime.now(timezone.utc))
+
+    def unsubscribe(self) -> None:
+        self._client._watches.discard(self)
+
+
+class FakeQuery:
+    """
+    A query over one collection, or over every collection with an ID (collection_group()).
+    """
+
+    def __init__(self, client: "FakeFirestore", path: str, group: bool = False, filters: Tuple = (), limit: Optional[int] = None):
+        self._client = client
+        self._path = path
+        self._group = group
+        self._filters = filters
+        self._limit = limit
+
+    def where(self, field_path: Optional[str] = None, op_string: Optional[str] = None, value: Any = None, *, filter: Any = None) -> "FakeQuery":
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        if op_string not in OPERATORS:
+            raise exceptions.InvalidArgument(f"Unsupported operator: {op_string}")
+        return FakeQuery(self._client, self._path, self._group, self._filters + ((field_path, op_string, value),), self._limit)
+
+    def limit(self, count: int) -> "FakeQuery":
+        return FakeQuery(self._client, self._path, self._group, self._filters, count)
+
+    def _collections(self) -> List[str]:
+        if self._group:
+            return sorted(path for path in self._client._collections if _split(path)[1] == self._path)
+        return [self._path]
+
+    def _matches(self, data: Dict[str, Any]) -> bool:
+        for field_path, op_string, expected in self._filters:
+            value = _field(data, field_path)
+            if value is _MISSING:
+                return False
+            try:
+                if not OPERATORS[op_string](value, expected):
+                    return False
+            except TypeError:
+                # Values of different types never match a range filter
+                return False
+        return True
+
+    def _matching(self) -> List[FakeDocumentSnapshot]:
+        matching = []
+        with self._client._lock:
+            for path in self._collections():
+                documents = self._client._collections.get(path, {})
+                for document_id in sorted(documents):
+                    if self._limit is not None and len(matching) >= self._limit:
+                        return matching
+                    if self._matches(documents[document_id]):
+                        reference = FakeDocumentReference(self._client, f"{path}/{document_id}")
+                        data = copy.deepcopy(documents[document_id])
+                        matching.append(FakeDocumentSnapshot(reference, data, self._client._update_times.get(reference.path)))
+        return matching
+
+    def stream(self) -> Iterator[FakeDocumentSnapshot]:
+        self._client._round_trip("query")
+        snapshots = self._matching()
+        self._client._count(None, documents=("read", max(len(snapshots), 1)))
+        yield from snapshots
+
+    def get(self) -> List[FakeDocumentSnapshot]:
+        return list(self.stream())
+
+    def on_snapshot(self, callback: Callable) -> FakeWatch:
+        self._client._round_trip("listen")
+        watch = FakeWatch(self._client, self, callback)
+        self._client._watches.add(watch)
+        watch._deliver(initial=True)
+        return watch
+
+
+class FakeCollectionReference(FakeQuery):
+    """
+    A collection of FakeFirestore.
+    """
+
+    def __init__(self, client: "FakeFirestore", path: str):
+        super().__init__(client, path)
+
+    @property
+    def id(self) -> str:
+        return _split(self._path)[1]
+
+    def document(self, document_id: Optional[str] = None) -> "FakeDocumentReference":
+        if document_id is None:
+            document_id = "".join(self._client._random.choices(string.ascii_letters + string.digits, k=20))
+        return FakeDocumentReference(self._client, f"{self._path}/{document_id}")
+
+    def add(self, data: Dict[str, Any], document_id: Optional[str] = None) -> Tuple[datetime, "FakeDocumentReference"]:
+        reference = self.document(document_id)
+        reference.set(data)
+        return datetime.now(timezone.utc), reference
+
+
+class FakeDocumentReference:
+    """
+    A document of FakeFirestore, which may not exist yet.
+    """
+
+    def __init__(self, client: "FakeFirestore", path: str):
+        self._client = client
+        self.path = path
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, FakeDocumentReference) and other.path == self.path
+
+    def __hash__(self) -> int:
+        return hash(self.path)
+
+    @property
+    def id(self) -> str:
+        return _split(self.path)[1]
+
+    @property
+    def parent(self) -> FakeCollectionReference:
+        return FakeCollectionReference(self._client, _split(self.path)[0])
+
+    def collection(self, collection_id: str) -> FakeCollectionReference:
+        return FakeCollectionReference(self._client, f"{self.path}/{collection_id}")
+
+    def get(self) -> FakeDocumentSnapshot:
+        self._client._round_trip("get")
+        self._client._count(None, documents=("read", 1))
+        with self._client._lock:
+            return FakeDocumentSnapshot(self, copy.deepcopy(self._client._read(self.path)), self._client._update_times.get(self.path))
+
+    def set(self, data: Dict[str, Any], merge: bool = False) -> None:
+        self._client._commit("set", [("set", self, data, merge, None)])
+
+    def update(self, data: Dict[str, Any], option: Any = None) -> None:
+        self._client._commit("update", [("update", self, data, True, option)])
+
+    def delete(self, option: Any = None) -> None:
+        self._client._commit("delete", [("delete", self, None, False, option)])
+
+
+class FakeWriteBatch:
+    """
+    Writes that FakeFirestore applies all at once, or not at all, on commit().
+    """
+
+    def __init__(self, client: "FakeFirestore"):
+        self._client = client
+        self._writes: List[Write] = []
+
+    def __len__(self) -> int:
+        return len(self._writes)
+
+    def set(self, reference: FakeDocumentReference, data: Dict[str, Any], merge: bool = False) -> "FakeWriteBatch":
+        self._writes.append(("set", reference, copy.deepcopy(data), merge, None))
+        return self
+
+    def update(self, reference: FakeDocumentReference, data: Dict[str, Any], option: Any = None) -> "FakeWriteBatch":
+        self._writes.append(("update", reference, copy.deepcopy(data), True, option))
+        return self
+
+    def delete(self, reference: FakeDocumentReference, option: Any = None) -> "FakeWriteBatch":
+        self._writes.append(("delete", reference, None, False, option))
+        return self
+
+    def commit(self) -> List[None]:
+        if len(self._writes) > MAX_BATCH_WRITES:
+            raise exceptions.InvalidArgument(f"A batch may contain at most {MAX_BATCH_WRITES} writes, not {len(self._writes)}")
+        self._client._commit("commit", self._writes)
+        return [None] * len(self._writes)
+
+
+class FakeFirestore:
+    """
+    In-process stand-in for the Firestore client, with latency and fault injection.
+
+    Implements the part of the client API that db.py uses: collections and
+    collection groups, document get/set (with merge)/update/delete, add(),
+    equality, range, ``in`` and ``array-contains`` filters, limit(), stream(),
+    get_all(), batched writes, the Increment, SERVER_TIMESTAMP and DELETE_FIELD
+    transforms, ``last_update_time`` preconditions (write_option()) and
+    on_snapshot() listeners. Documents are kept in memory;
+    results are ordered by document path.
+
+    Every round trip sleeps for ``latency`` plus up to ``jitter`` seconds (in
+    the calling thread, like the blocking client) and fails with a
+    ServiceUnavailable error at ``error_rate``, or at the rate given for its
+    operation in ``error_rates``. A failed write changes nothing.
+
+    ``calls`` counts round trips by operation ("get", "get_all", "query",
+    "set", "update", "delete", "commit", "listen") and ``documents`` counts
+    billed document "read", "write" and "delete" operations, so tests and
+    benchmarks can assert how many backend operations a code path costs.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_rates: Optional[Dict[str, float]] = None,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_rates = error_rates or {}
+        self.calls: Counter = Counter()
+        self.documents: Counter = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        # collection path -> document ID -> data
+        self._collections: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # path -> time of the last write
+        self._update_times: Dict[str, datetime] = {}
+        self._clock = datetime.now(timezone.utc)
+        self._watches = set()
+
+    def reset_counts(self) -> None:
+        """
+        Zero the call and document counts, e.g. after the test data was written.
+        """
+        self.calls.clear()
+        self.documents.clear()
+
+    def _count(self, operation: Optional[str], documents: Optional[Tuple[str, int]] = None) -> None:
+        with self._lock:
+            if operation is not None:
+                self.calls[operation] += 1
+            if documents is not None:
+                self.documents[documents[0]] += documents[1]
+
+    def _round_trip(self, operation: str) -> None:
+        self._count(operation)
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        if self._random.random() < self.error_rates.get(operation, self.error_rate):
+            raise exceptions.ServiceUnavailable(f"Injected failure of {operation}")
+
+    def _commit(self, operation: str, writes: List[Write]) -> None:
+        self._round_trip(operation)
+        with self._lock:
+            # Staged first, so a failing write leaves every document as it was
+            staged: Dict[str, Optional[Dict[str, Any]]] = {}
+            billed: Counter = Counter()
+            for kind, reference, data, merge, option in writes:
+                current = staged[reference.path] if reference.path in staged else self._read(reference.path)
+                last_update_time = getattr(option, "last_update_time", None)
+                if last_update_time is not None and (current is None or self._update_times.get(reference.path) != last_update_time):
+                    raise exceptions.FailedPrecondition(f"{reference.path} was changed since {last_update_time}")
+                if kind == "delete":
+                    staged[reference.path] = None
+                    billed["delete"] += 1
+                    continue
+                if kind == "update" and current is None:
+                    raise exceptions.NotFound(f"No document to update: {reference.path}")
+                staged[reference.path] = _apply(current, data, merge)
+                billed["write"] += 1
+            # Every commit gets a later update time, like the server's commit time
+            self._clock = max(datetime.now(timezone.utc), self._clock + timedelta(microseconds=1))
+            for path, data in staged.items():
+                parent, document_id = _split(path)
+                if data is not None:
+                    self._collections.setdefault(parent, {})[document_id] = data
+                    self._update_times[path] = self._clock
+                elif document_id in self._collections.get(parent, {}):
+                    self._update_times.pop(path, None)
+                    del self._collections[parent][document_id]
+                    if not self._collections[parent]:
+                        del self._collections[parent]
+            self.documents.update(billed)
+            watches = list(self._watches)
+        for watch in watches:
+            watch._deliver()
+
+    def _read(self, path: str) -> Optional[Dict[str, Any]]:
+        parent, document_id = _split(path)
+        return self._collections.get(parent, {}).get(document_id)
+
+    def collection(self, path: str) -> FakeCollectionReference:
+        return FakeCollectionReference(self, path)
+
+    def collection_group(self, collection_id: str) -> FakeQuery:
+        return FakeQuery(self, collection_id, group=True)
+
+    def document(self, path: str) -> FakeDocumentReference:
+        return FakeDocumentReference(self, path)
+
+    def batch(self) -> FakeWriteBatch:
+        return FakeWriteBatch(self)
+
+    def write_option(self, last_update_time: Optional[datetime] = None) -> SimpleNamespace:
+        return SimpleNamespace(last_update_time=last_update_time)
+
+    def get_all(self, references: List[FakeDocumentReference]) -> Iterator[FakeDocumentSnapshot]:
+        references = list(references)
+        self._round_trip("get_all")
+        self._count(None, documents=("read", len(references)))
+        with self._lock:
+            snapshots = [
+                FakeDocumentSnapshot(reference, copy.deepcopy(self._read(reference.path)), self._update_times.get(reference.path))
+                for reference in references
+            ]
+        yield from snapshots
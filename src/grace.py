@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# (message_id, channel_id, mentioned_user_id, fields), where fields are extra save_message arguments
+Reminder = Tuple[int, int, int, Dict[str, Any]]
+
+
+class ReminderGraceWindow:
+    """
+    Holds newly registered reminders in memory for a short grace period.
+
+    Most mentions get a reply or a reaction within seconds. If that happens
+    inside the window, the reminder is cancelled locally and never written to
+    storage. Reminders that survive the window are handed to the persist
+    callback of run().
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        # (message_id, mentioned_user_id) -> (channel_id, deadline, fields), in deadline order
+        self._pending: "OrderedDict[Tuple[int, int], Tuple[int, float, Dict[str, Any]]]" = OrderedDict()
+        # (channel_id, mentioned_user_id) -> message_ids, for replies in the channel
+        self._by_channel_user: Dict[Tuple[int, int], Set[int]] = defaultdict(set)
+        self._running = False
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    @property
+    def is_running(self) -> bool:
+        """bool: Whether new reminders should be held in the window."""
+        return self._running
+
+    def add(self, message_id: int, channel_id: int, mentioned_user_id: int, **fields: Any) -> None:
+        """
+        Hold a new reminder for the grace period.
+
+        Args:
+            message_id (int): The ID of the message with the mention
+            channel_id (int): The ID of the channel of the message
+            mentioned_user_id (int): The ID of the mentioned user
+            **fields: Extra arguments for save_message (e.g. threshold)
+        """
+        key = (message_id, mentioned_user_id)
+        if key in self._pending:
+            return
+        self._pending[key] = (channel_id, time.monotonic() + self.window, fields)
+        self._by_channel_user[(channel_id, mentioned_user_id)].add(message_id)
+
+    def _remove(self, message_id: int, mentioned_user_id: int) -> int:
+        channel_id, _, _ = self._pending.pop((message_id, mentioned_user_id))
+        key = (channel_id, mentioned_user_id)
+        self._by_channel_user[key].discard(message_id)
+        if not self._by_channel_user[key]:
+            del self._by_channel_user[key]
+        return channel_id
+
+    def cancel_replied(self, channel_id: int, user_id: int) -> int:
+        """
+        Cancel the held reminders of a user who sent a message in the channel.
+
+        Args:
+            channel_id (int): The ID of the channel of the message
+            user_id (int): The ID of the author
+
+        Returns:
+            int: The number of reminders cancelled
+        """
+        message_ids = list(self._by_channel_user.get((channel_id, user_id), ()))
+        for message_id in message_ids:
+            self._remove(message_id, user_id)
+        metrics.increment("grace.cancelled", len(message_ids))
+        return len(message_ids)
+
+    def cancel_reacted(self, message_id: int, user_id: int) -> bool:
+        """
+        Cancel the held reminder of a user who reacted to the message.
+
+        Args:
+            message_id (int): The ID of the message that was reacted to
+            user_id (int): The ID of the user who reacted
+
+        Returns:
+            bool: True if a held reminder was cancelled
+        """
+        if (message_id, user_id) not in self._pending:
+            return False
+        self._remove(message_id, user_id)
+        metrics.increment("grace.cancelled")
+        return True
+
+    def pop_expired(self) -> List[Reminder]:
+        """
+        Remove and return the reminders whose grace period is over.
+
+        Returns:
+            List[Reminder]: (message_id, channel_id, mentioned_user_id, fields) tuples
+        """
+        now = time.monotonic()
+        expired = []
+        while self._pending:
+            (message_id, mentioned_user_id), (channel_id, deadline, fields) = next(iter(self._pending.items()))
+            if deadline > now:
+                break
+            self._remove(message_id, mentioned_user_id)
+            expired.append((message_id, channel_id, mentioned_user_id, fields))
+        return expired
+
+    def pop_all(self) -> List[Reminder]:
+        """
+        Remove and return every held reminder, e.g. to persist them at shutdown.
+
+        Returns:
+            List[Reminder]: (message_id, channel_id, mentioned_user_id, fields) tuples
+        """
+        reminders = [
+            (message_id, channel_id, mentioned_user_id, fields)
+            for (message_id, mentioned_user_id), (channel_id, _, fields) in self._pending.items()
+        ]
+        self._pending.clear()
+        self._by_channel_user.clear()
+        return reminders
+
+    async def run(self, persist: Callable[[List[Reminder]], None]) -> None:
+        """
+        Hold new reminders and persist the survivors until cancelled.
+
+        Args:
+            persist (Callable[[List[Reminder]], None]): Writes surviving reminders to storage
+        """
+        self._running = True
+        try:
+            while True:
+                await asyncio.sleep(min(self.window, 1.0))
+                expired = self.pop_expired()
+                if expired:
+                    metrics.increment("grace.persisted", len(expired))
+                    try:
+                        persist(expired)
+                    except Exception as e:
+                        logger.error(f"Failed to persist {len(expired)} reminders after the grace period: {e}", exc_info=True)
+        finally:
+            self._running = False
@@ -1,16 +1,96 @@
 import logging
-from typing import Any
+from typing import Any, List
 
 import discord
 
+from activity import recent_activity
 from config import config
 from db import FirestoreReminderCollection
+from grace import Reminder, ReminderGraceWindow
+from member_cache import member_cache
+from outbox import Outbox
+from pending import pending_index
+from permission_cache import permission_cache
+from pending_store import pending_store
+from records import ReminderRecord
+from settings import DEFAULT_SETTINGS, guild_settings, pick
+from snowflake import due_key
+from unreachable import PERMISSION, USER, unreachable
 
 reminder_db = FirestoreReminderCollection()
 
+# Opened by main.py when OUTBOX_ENABLED, otherwise writes go straight to the backend
+reminder_outbox = Outbox(
+    config.OUTBOX_PATH,
+    reminder_db,
+    batch_size=config.OUTBOX_BATCH_SIZE,
+    flush_interval=config.OUTBOX_FLUSH_INTERVAL,
+    max_retry_delay=config.OUTBOX_MAX_RETRY_DELAY,
+    fsync=config.OUTBOX_FSYNC,
+    max_attempts=config.OUTBOX_MAX_ATTEMPTS,
+    dead_letter_path=config.OUTBOX_DEAD_LETTER_PATH,
+    compact_after=config.OUTBOX_COMPACT_AFTER,
+)
+
+# Started by main.py when REMINDER_GRACE_PERIOD > 0, otherwise reminders are saved at once
+reminder_grace = ReminderGraceWindow(config.REMINDER_GRACE_PERIOD)
+
 logger = logging.getLogger(__name__)
 
 
+def save_reminder(message_id: int, channel_id: int, mentioned_user_id: int, **fields: Any) -> None:
+    """
+    Write a reminder to storage, through the outbox when it is open.
+
+    Args:
+        message_id (int): The ID of the message with the mention
+        channel_id (int): The ID of the channel of the message
+        mentioned_user_id (int): The ID of the mentioned user
+        **fields: Extra arguments for save_message (threshold, guild_id, author_id)
+    """
+    args = {
+        "message_id": message_id,
+        "channel_id": channel_id,
+        "mentioned_user_id": mentioned_user_id,
+        **fields,
+    }
+
+    if reminder_outbox.is_open:
+        reminder_outbox.append("save", **args)
+    else:
+        reminder_db.save_message(**args)
+
+
+def persist_reminders(reminders: List[Reminder]) -> None:
+    """
+    Write reminders that survived the grace period to storage.
+
+    Args:
+        reminders (List[Reminder]): (message_id, channel_id, mentioned_user_id, fields) tuples
+    """
+    for message_id, channel_id, mentioned_user_id, fields in reminders:
+        save_reminder(message_id, channel_id, mentioned_user_id, **fields)
+    logger.info("Saved %d waiting messages after the grace period", len(reminders))
+
+
+def can_read(message: discord.Message, user: discord.abc.User) -> bool:
+    """
+    Check whether a mentioned user can read the channel of a message.
+
+    Args:
+        message (discord.Message): The message with the mention, sent in a guild
+        user (discord.abc.User): The mentioned user
+
+    Returns:
+        bool: False only if the user is a known member without read access
+    """
+    member = user if isinstance(user, discord.Member) else message.guild.get_member(user.id)
+    if member is None:
+        # Not cached (e.g. in low memory mode), the sweep checks again
+        return True
+    return permission_cache.can_read(message.channel, member)
+
+
 async def register_db(message: discord.Message) -> None:
     """
     Register mentioned users in a Discord message to the reminder database.
@@ -22,39 +102,56 @@ async def register_db(message: discord.Message) -> None:
     Args:
         message (discord.Message): The Discord message containing mentions
     """
+    # Per-guild settings come from the in-process cache, without a backend read
+    settings = guild_settings.get(message.guild.id) if message.guild is not None else DEFAULT_SETTINGS
+    max_role_members = pick(settings.max_role_members, config.MAX_ROLE_MEMBERS)
+    role_size_error = pick(settings.role_size_error, config.ROLE_SIZE_ERROR)
+
     # Collect all mentioned members
     all_members = []
     instant_role_size_error = False
 
+    # In low memory mode, the member list of the guild is only fetched when needed
+    # (@here without presences only needs recently active members, which are cached)
+    needs_member_list = message.role_mentions or (
+        message.mention_everyone
+        and ("@everyone" in message.content or config.PRESENCE_INTENT)
+    )
+    if config.LOW_MEMORY_MODE and needs_member_list:
+        await member_cache.ensure_chunked(message.guild)
+
     # Handle @everyone and @here mentions
     if message.mention_everyone:
         if "@everyone" in message.content:
             # Add all channel members for @everyone
             all_members.extend(message.channel.members)
-            if len(all_members) > config.MAX_ROLE_MEMBERS:
+            if len(all_members) > max_role_members:
                 logger.warning(
                     f"Message {message.id} has too many members for @everyone mention ({len(all_members)}). Skipping."
                 )
                 if not instant_role_size_error:
                     instant_role_size_error = True
                     await message.reply(
-                        config.ROLE_SIZE_ERROR.format(limit=config.MAX_ROLE_MEMBERS)
+                        role_size_error.format(limit=max_role_members)
                     )
                 all_members = []  # Reset to avoid saving too many members
 
         elif "@here" in message.content:
             # Add only online members for @here
-            for member in message.channel.members:
-                if member.status == discord.Status.online:
-                    all_members.append(member)
-            if len(all_members) > config.MAX_ROLE_MEMBERS:
+            if config.PRESENCE_INTENT:
+                for member in message.channel.members:
+                    if member.status == discord.Status.online:
+                        all_members.append(member)
+            else:
+                all_members.extend(recent_activity.active_members(message.channel))
+            if len(all_members) > max_role_members:
                 logger.warning(
                     f"Message {message.id} has too many members for @here mention ({len(all_members)}). Skipping."
                 )
                 if not instant_role_size_error:
                     instant_role_size_error = True
                     await message.reply(
-                        config.ROLE_SIZE_ERROR.format(limit=config.MAX_ROLE_MEMBERS)
+                        role_size_error.format(limit=max_role_members)
                     )
                 all_members = []  # Reset to avoid saving too many members
         else:
@@ -63,14 +160,14 @@ async def register_db(message: discord.Message) -> None:
     # Handle role mentions
     for role in message.role_mentions:
         all_members.extend(role.members)
-        if len(all_members) > config.MAX_ROLE_MEMBERS:
+        if len(all_members) > max_role_members:
             logger.warning(
                 f"Message {message.id} has too many members for role mention ({len(all_members)}). Skipping."
             )
             if not instant_role_size_error:
                 instant_role_size_error = True
                 await message.reply(
-                    config.ROLE_SIZE_ERROR.format(limit=config.MAX_ROLE_MEMBERS)
+                    role_size_error.format(limit=max_role_members)
                 )
             all_members = []  # Reset to avoid saving too many members
 
@@ -86,21 +183,53 @@ async def register_db(message: discord.Message) -> None:
             all_mentioned_ids.add(user.id)
             human_mentions.append(user)
 
+    # Users that a sweep found unreachable from this channel would never get their reminder
+    human_mentions = [
+        user for user in human_mentions
+        if not unreachable.is_unreachable(USER, user.id)
+        and not unreachable.is_unreachable(PERMISSION, (message.channel.id, user.id))
+    ]
+
+    # Reminders the bot could not send, or that the member could not open, are not stored
+    if message.guild is not None and human_mentions:
+        if not permission_cache.can_send(message.channel, message.guild.me):
+            logger.info("Cannot send messages in channel %s, mentions in message %s are not registered", message.channel.id, message.id)
+            return
+        human_mentions = [user for user in human_mentions if can_read(message, user)]
+
     # If no human mentions found, exit early
     if not human_mentions:
-        logging.info(f"No human mentions found in message {message.id}. Skipping.")
+        logger.info("No human mentions found in message %s. Skipping.", message.id)
         return
 
+    # Only what differs from the defaults is stored with the reminder
+    fields = {"author_id": message.author.id}
+    if message.guild is not None:
+        fields["guild_id"] = message.guild.id
+    if settings.reminder_threshold is not None:
+        fields["threshold"] = settings.reminder_threshold
+    threshold = pick(settings.reminder_threshold, config.REMINDER_THRESHOLD)
+
     try:
 
         # Save the message for each mentioned user
         for mentioned_user in human_mentions:
-            reminder_db.save_message(
-                message_id=message.id,
-                channel_id=message.channel.id,
-                mentioned_user_id=mentioned_user.id,
-            )
-            logger.info(f"Saved waiting message for {mentioned_user.name}")
+            if reminder_grace.is_running:
+                reminder_grace.add(message.id, message.channel.id, mentioned_user.id, **fields)
+            else:
+                save_reminder(message.id, message.channel.id, mentioned_user.id, **fields)
+                logger.info("Saved waiting message for %s", mentioned_user.name)
+            if message.guild is not None:
+                record = ReminderRecord(
+                    message_id=message.id,
+                    channel_id=message.channel.id,
+                    guild_id=message.guild.id,
+                    author_id=message.author.id,
+                    mentioned_user_id=mentioned_user.id,
+                    due_at=due_key(message.id, threshold),
+                )
+                pending_index.add(record)
+                pending_store.add(record)
     except Exception as e:
         logger.error(f"Failed to save message: {e}", exc_info=True)
 
@@ -121,13 +250,23 @@ def observe_message(message: discord.Message) -> None:
         channel_id = message.channel.id
         user_id = message.author.id
 
-        matched_message_ids = reminder_db.search_reminders(
-            channel_id, user_id
-        )  # list of reminders
-        if matched_message_ids:
-            reminder_db.delete_messages_by_doc_ids(matched_message_ids)
+        pending_index.remove_replied(channel_id, user_id)
+        pending_store.remove_replied(channel_id, user_id)
+
+        # Reminders still in the grace period are cancelled before they are written,
+        # older ones may already be stored
+        if reminder_grace.is_running:
+            reminder_grace.cancel_replied(channel_id, user_id)
+
+        if reminder_outbox.is_open:
+            reminder_outbox.append("delete_replied", channel_id=channel_id, user_id=user_id)
+            return
+
+        deleted = reminder_db.delete_replied(channel_id, user_id)
+        if deleted:
             logger.info(
-                f"{len(matched_message_ids)} reminders in {channel_id} for user {user_id} deleted from database after message in channel/thread"
+                "%d reminders in %s for user %s deleted from database after message in channel/thread",
+                deleted, channel_id, user_id,
             )
         else:
             return  # The coming messages is not in a channel we are tracking
@@ -149,9 +288,20 @@ def observe_reaction(payload: Any) -> None:
         target_message_id = payload.message_id
         user_id = payload.user_id
 
+        pending_index.remove(target_message_id, user_id)
+        pending_store.remove(target_message_id, user_id)
+
+        # A reminder still in the grace period was never written, so there is nothing to delete
+        if reminder_grace.is_running and reminder_grace.cancel_reacted(target_message_id, user_id):
+            return
+
+        if reminder_outbox.is_open:
+            reminder_outbox.append("delete_reacted", message_id=target_message_id, user_id=user_id)
+            return
+
         if reminder_db.delete_message_by_message_and_user_id(target_message_id, user_id):
             logger.info(
-                f"Message {target_message_id} for user {user_id} deleted from database after reaction"
+                "Message %s for user %s deleted from database after reaction", target_message_id, user_id
             )
         else:
             return  # This means it was a reaction but not to a message we are tracking
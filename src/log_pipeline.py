@@ -0,0 +1,101 @@
+import logging
+import logging.handlers
+import queue
+import time
+from typing import Dict, Tuple
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+
+class InProcessQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that leaves formatting to the listener thread.
+
+    The stock QueueHandler formats every record on the calling thread so that
+    it can be pickled. The queue never leaves the process here, so the record
+    is passed as is and the event loop only pays for the enqueue.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class CallSiteRateLimit(logging.Filter):
+    """
+    Rate limit for high-frequency log lines, per call site.
+
+    Each call site (file and line) may log ``burst`` records at once and
+    ``rate`` records per second after that. Beyond the limit, one record in
+    ``sample_every`` still passes, and the next record to pass reports how many
+    were suppressed. Warnings and errors always pass.
+    """
+
+    def __init__(self, rate: float, burst: int, sample_every: int = 100):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.sample_every = sample_every
+        # (pathname, lineno) -> (tokens, last refill, suppressed)
+        self._sites: Dict[Tuple[str, int], Tuple[float, float, int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        tokens, last, suppressed = self._sites.get(key, (self.burst, now, 0))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+
+        if tokens < 1:
+            suppressed += 1
+            if suppressed < self.sample_every:
+                self._sites[key] = (tokens, now, suppressed)
+                return False
+            suppressed -= 1  # This record is the sample
+        else:
+            tokens -= 1
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar messages suppressed)"
+            record.args = None
+        self._sites[key] = (tokens, now, 0)
+        return True
+
+
+def setup_logging(level: str = "INFO") -> logging.handlers.QueueListener:
+    """
+    Log through a queue, so the console is written by a background thread.
+
+    Args:
+        level (str): The level of the root logger
+
+    Returns:
+        logging.handlers.QueueListener: The running listener, stop() it at exit to flush the queue
+    """
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(LOG_FORMAT))
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, console, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(InProcessQueueHandler(log_queue))
+    root.setLevel(level)
+    listener.start()
+    return listener
+
+
+def limit_hot_path(logger_names: Tuple[str, ...], rate: float, burst: int, sample_every: int) -> None:
+    """
+    Rate limit the INFO and DEBUG lines of the given loggers, per call site.
+
+    Args:
+        logger_names (Tuple[str, ...]): The loggers of the hot-path modules
+        rate (float): Records per second allowed per call site
+        burst (int): Records allowed at once per call site
+        sample_every (int): Over the limit, one record in this many still passes
+    """
+    for name in logger_names:
+        logging.getLogger(name).addFilter(CallSiteRateLimit(rate, burst, sample_every))
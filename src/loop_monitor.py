@@ -0,0 +1,144 @@
+import asyncio
+import heapq
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Return a percentile of the values by the nearest-rank method.
+
+    Args:
+        values (List[float]): The values, in any order
+        fraction (float): The percentile as a fraction, e.g. 0.99
+
+    Returns:
+        float: The percentile, or 0 without values
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop runs scheduled work.
+
+    A coroutine sleeps for ``interval`` seconds at a time and records how much
+    later than asked it woke up. That lag is what every other handler and the
+    gateway heartbeat wait on top of their own work.
+
+    A watchdog thread notices when the coroutine is ``slow_threshold`` seconds
+    past its wake-up time and captures the stack of the event loop thread,
+    which shows the code that is blocking it (e.g. a synchronous Firestore call).
+    The ``keep_slowest`` longest stalls are kept for report().
+    """
+
+    def __init__(self, interval: float = 0.5, slow_threshold: float = 0.25, window: int = 1200, keep_slowest: int = 10):
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.keep_slowest = keep_slowest
+        self._lags: Deque[float] = deque(maxlen=window)
+        # (lag seconds, when, stack) min-heap of the slowest stalls
+        self._slowest: List[Tuple[float, float, str]] = []
+        # When the sleeping coroutine is due to wake up
+        self._wake_at = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._stall_stack: Optional[str] = None
+        self._stopped = threading.Event()
+
+    def _watch(self) -> None:
+        # Runs in the watchdog thread
+        while not self._stopped.wait(self.slow_threshold / 2):
+            if self._stall_stack is not None or time.monotonic() - self._wake_at < self.slow_threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                self._stall_stack = "".join(traceback.format_stack(frame, limit=8))
+
+    def record(self, lag: float) -> None:
+        """
+        Record one lag measurement, and the stall behind it if it was slow.
+
+        Args:
+            lag (float): Seconds the loop was late
+        """
+        self._lags.append(lag)
+        metrics.set_gauge("loop.lag_ms", round(lag * 1000, 1))
+        if lag < self.slow_threshold:
+            self._stall_stack = None
+            return
+
+        stack = self._stall_stack or "(stack not captured)\n"
+        self._stall_stack = None
+        metrics.increment("loop.stalls")
+        entry = (lag, time.time(), stack)
+        if len(self._slowest) < self.keep_slowest:
+            heapq.heappush(self._slowest, entry)
+        elif lag > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+        last_frame = stack.rstrip().splitlines()[-2].strip() if stack.count("\n") > 1 else stack.strip()
+        logger.warning(f"Event loop blocked for {lag * 1000:.0f} ms at {last_frame}")
+
+    def percentiles(self) -> dict:
+        """
+        Return the lag percentiles over the recent window, in milliseconds.
+
+        Returns:
+            dict: p50, p95, p99 and max
+        """
+        lags = list(self._lags)
+        return {
+            "p50": round(percentile(lags, 0.50) * 1000, 1),
+            "p95": round(percentile(lags, 0.95) * 1000, 1),
+            "p99": round(percentile(lags, 0.99) * 1000, 1),
+            "max": round(max(lags, default=0.0) * 1000, 1),
+        }
+
+    def slowest(self) -> List[Tuple[float, float, str]]:
+        """
+        Return the slowest stalls seen, slowest first.
+
+        Returns:
+            List[Tuple[float, float, str]]: (lag seconds, Unix time, stack of the loop thread)
+        """
+        return sorted(self._slowest, reverse=True)
+
+    def report(self) -> None:
+        """
+        Publish the lag percentiles as gauges and log them with the slowest stalls.
+        """
+        values = self.percentiles()
+        for name, value in values.items():
+            metrics.set_gauge(f"loop.lag_ms.{name}", value)
+        summary = ", ".join(f"{name}={value}" for name, value in values.items())
+        logger.info(f"Event loop lag (ms): {summary}")
+        for lag, when, stack in self.slowest():
+            logger.info(f"Stall of {lag * 1000:.0f} ms at {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(when))}:\n{stack}")
+
+    async def run(self) -> None:
+        """
+        Measure the loop lag until cancelled.
+        """
+        self._loop_thread_id = threading.get_ident()
+        self._wake_at = time.monotonic() + self.interval
+        self._stopped.clear()
+        watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        watchdog.start()
+        try:
+            while True:
+                self._wake_at = time.monotonic() + self.interval
+                await asyncio.sleep(self.interval)
+                self.record(max(0.0, time.monotonic() - self._wake_at))
+        finally:
+            self._stopped.set()
@@ -1,17 +1,47 @@
 import asyncio
 import logging
 import os
+import signal
+import time
 from datetime import datetime, timedelta
 from typing import Any
 
 import discord
+from discord import app_commands
 from discord.ext import commands, tasks
 from dotenv import load_dotenv
 
+from activity import recent_activity
+from change_feed import ReminderChangeFeed
 from config import config
-from db import FirestoreStatsCollection
-from handle_input import observe_reaction, observe_message, register_db
+from db import FirestoreStatsCollection, init_firestore
+from event_loop import use_event_loop
+from handle_input import (
+    observe_message,
+    observe_reaction,
+    persist_reminders,
+    register_db,
+    reminder_db,
+    reminder_grace,
+    reminder_outbox,
+)
+from log_pipeline import limit_hot_path, setup_logging
+from loop_monitor import LoopLagMonitor
+from member_cache import member_cache
+from memory import MemoryBudget
+from member_count import HumanMemberCounter
+from metrics import metrics
+from pending import pending_index
+from pending_store import pending_store
+from permission_cache import permission_cache
+from pipeline import EventPipeline
+from profiler import profile, start_profile_task
 from reminder import send_reminders
+from settings import guild_settings
+from snapshot import read_snapshot, write_snapshot
+from snowflake import now_ms, snowflake_time_ms
+from still_waiting import still_waiting
+from unreachable import CHANNEL, unreachable
 
 load_dotenv(dotenv_path="secrets/.env")
 token = os.getenv("DISCORD_TOKEN")
@@ -19,9 +49,29 @@ token = os.getenv("DISCORD_TOKEN")
 # Firestore DB instance
 stats_db = FirestoreStatsCollection()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+# Reminders added and deleted by other bot processes, applied to the index and store
+change_feed = ReminderChangeFeed(reminder_db, pending_index, pending_store)
+
+# Gateway events, in order per channel and concurrently across channels (started by main())
+event_pipeline = EventPipeline(max(config.EVENT_QUEUE_SIZE, 1), config.EVENT_CONCURRENCY, config.EVENT_SHED_POLICY)
+
+# Message statistics writes are ordered among themselves, apart from the channels
+STATS_EVENT_KEY = "stats"
+
+# Event loop lag, and the code behind stalls (started by main())
+loop_monitor = LoopLagMonitor(config.LOOP_MONITOR_INTERVAL or 1, config.LOOP_SLOW_THRESHOLD)
+memory_budget = MemoryBudget(config.MEMORY_BUDGET_MB, config.MEMORY_BUDGET_EVICT)
+
+# Running human member counts, kept current from gateway events
+member_counter = HumanMemberCounter()
+
+# Configure logging, the console is written by a background thread
+log_listener = setup_logging(config.LOG_LEVEL)
+limit_hot_path(
+    ("handle_input", "reminder"),
+    config.LOG_HOT_PATH_RATE,
+    config.LOG_HOT_PATH_BURST,
+    config.LOG_HOT_PATH_SAMPLE,
 )
 logger = logging.getLogger(__name__)
 
@@ -29,10 +79,39 @@ logger = logging.getLogger(__name__)
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
-intents.presences = True
+intents.presences = config.PRESENCE_INTENT
 
 # Bot initialization
-bot = commands.Bot(command_prefix=config.COMMAND_PREFIX, intents=intents)
+bot = commands.Bot(
+    command_prefix=config.COMMAND_PREFIX,
+    intents=intents,
+    chunk_guilds_at_startup=not config.LOW_MEMORY_MODE,
+    max_messages=config.MESSAGE_CACHE_SIZE or None,
+    enable_debug_events=config.GATEWAY_EVENT_METRICS,
+)
+
+bot.tree.command(
+    name="still-waiting",
+    description="List who you are still waiting for, and who is still waiting for you, in this server",
+)(still_waiting)
+
+bot.tree.command(
+    name="profile",
+    description="Profile the bot for a while and post the top functions and allocation sites (owner only)",
+)(app_commands.default_permissions(administrator=True)(profile))
+
+# Set once the application commands were synced and the pending reminders were loaded
+startup_done = False
+
+# Set once a shutdown was requested, new gateway events are then ignored
+shutting_down = False
+# Monotonic time by which the shutdown must be done
+shutdown_deadline = None
+# Shutdowns started by signals, the event loop only keeps weak references to tasks
+shutdown_tasks = set()
+
+# Held while a sweep runs, so a shutdown lets it finish
+sweep_lock = asyncio.Lock()
 
 
 @bot.event
@@ -40,20 +119,50 @@ async def on_message(message: discord.Message) -> None:
     """
     Handle incoming Discord messages.
 
-    Processes messages to register mentioned users, 
-    observe if the channel of the message is the one monitored for reminders (any message in the channel/thread counts as a response),
-    process bot commands, and increment message statistics.
+    Messages are handled in order per channel through the event pipeline when
+    it is running, otherwise inline. Message statistics may be shed under load.
 
     Args:
         message (discord.Message): The incoming Discord message
     """
-    if message.author.bot:
-        return  # Ignore messages from bots
+    if message.author.bot or shutting_down:
+        return  # Ignore messages from bots, and new work once shutting down
+
+    if event_pipeline.is_running:
+        await event_pipeline.submit(message.channel.id, handle_message, message)
+        await event_pipeline.submit(STATS_EVENT_KEY, count_message, sheddable=True)
+        return
+
+    await handle_message(message)
+    stats_db.increment_message_count()
+
+
+async def handle_message(message: discord.Message) -> None:
+    """
+    Process a message from a human user.
+
+    Registers mentioned users, 
+    observes if the channel of the message is the one monitored for reminders (any message in the channel/thread counts as a response),
+    and processes bot commands.
+
+    Args:
+        message (discord.Message): The incoming Discord message
+    """
+    if config.LOW_MEMORY_MODE:
+        member_cache.remember_member(message.author)
+    if not config.PRESENCE_INTENT and message.guild is not None:
+        recent_activity.record(message.guild.id, message.author.id)
 
     await register_db(message)
     observe_message(message)
     await bot.process_commands(message)
-    stats_db.increment_message_count()
+
+
+async def count_message() -> None:
+    """
+    Increment the message statistics, off the event loop.
+    """
+    await asyncio.to_thread(stats_db.increment_message_count)
 
 
 @bot.event
@@ -62,10 +171,29 @@ async def on_raw_reaction_add(payload: discord.RawReactionActionEvent) -> None:
     Handles the addition of a reaction to a message.
     """
 
+    if shutting_down:
+        return
+
     user = bot.get_user(payload.user_id)
     if user and user.bot:
         return  # Ignore reactions from bots
 
+    if event_pipeline.is_running:
+        await event_pipeline.submit(payload.channel_id, handle_reaction, payload)
+        return
+
+    await handle_reaction(payload)
+
+
+async def handle_reaction(payload: discord.RawReactionActionEvent) -> None:
+    """
+    Process a reaction from a human user.
+    """
+    if config.LOW_MEMORY_MODE and payload.member is not None:
+        member_cache.remember_member(payload.member)
+    if not config.PRESENCE_INTENT and payload.guild_id is not None:
+        recent_activity.record(payload.guild_id, payload.user_id)
+
     # Get message to check if user is the author
     try:
         channel = bot.get_channel(payload.channel_id)
@@ -90,8 +218,15 @@ async def send_reminders_task() -> None:
 
     This task runs at intervals defined by REMINDER_INTERVAL and sends
     reminders to users who have been mentioned but haven't replied or reacted.
+    Pending outbox writes are drained first so replies are not missed.
     """
-    await send_reminders(bot)
+    if reminder_outbox.is_open:
+        try:
+            await reminder_outbox.flush()
+        except Exception as e:
+            logger.error(f"Failed to drain outbox before sending reminders: {e}")
+    async with sweep_lock:
+        await send_reminders(bot)
 
 
 @send_reminders_task.before_loop
@@ -122,15 +257,13 @@ async def user_count_update_task() -> None:
     """
     Periodic task to update the user count statistics in the database.
 
-    Counts human members (excluding bots) across all guilds and updates
-    the statistics in Firestore. Runs at intervals defined by USER_COUNT_UPDATE_INTERVAL.
+    Reports the running count of human members (excluding bots) across all guilds,
+    after a cheap resync that only recounts guilds whose size drifted.
+    Runs at intervals defined by USER_COUNT_UPDATE_INTERVAL.
     """
     try:
-        total_members = 0
-
-        for guild in bot.guilds:
-            human_members = sum(1 for member in guild.members if not member.bot)
-            total_members += human_members
+        member_counter.resync(bot.guilds)
+        total_members = member_counter.total
 
         stats_db.update_user_count(total_members)
         logger.info(f"Updated user count (humans only): {total_members}")
@@ -148,15 +281,96 @@ async def before_user_count_update() -> None:
     logger.info("User count update task initialized")
 
 
+@tasks.loop(seconds=config.METRICS_LOG_INTERVAL)
+async def metrics_report_task() -> None:
+    """
+    Periodic task to log the in-process metrics.
+
+    Runs at intervals defined by METRICS_LOG_INTERVAL.
+    """
+    if config.LOOP_MONITOR_INTERVAL > 0:
+        loop_monitor.report()
+    metrics.log_summary()
+
+
+@tasks.loop(seconds=max(config.MEMORY_CHECK_INTERVAL, 1))
+async def memory_report_task() -> None:
+    """
+    Periodic task to report the memory of each cache and check the memory budget.
+
+    Runs at intervals defined by MEMORY_CHECK_INTERVAL.
+    """
+    memory_budget.check(bot)
+
+
+@tasks.loop(seconds=max(config.SNAPSHOT_INTERVAL, 1))
+async def snapshot_task() -> None:
+    """
+    Periodic task to write a snapshot of the pending reminders.
+
+    Runs at intervals defined by SNAPSHOT_INTERVAL.
+    """
+    await save_snapshot()
+
+
+async def save_snapshot() -> int:
+    """
+    Write the pending reminder index to the snapshot file, if it was loaded.
+
+    Returns:
+        int: The number of reminders written
+    """
+    if not pending_index.is_loaded:
+        return 0
+    try:
+        # Taken before the copy, so nothing created after it is assumed to be in the snapshot
+        high_water_mark = now_ms()
+        count = await asyncio.to_thread(
+            write_snapshot, config.SNAPSHOT_PATH, pending_index.records(), high_water_mark
+        )
+        metrics.set_gauge("snapshot.reminders", count)
+        return count
+    except Exception as e:
+        logger.error(f"Failed to write snapshot: {e}", exc_info=True)
+        return 0
+
+
+@bot.event
+async def on_socket_event_type(event_type: str) -> None:
+    """
+    Count gateway events by type.
+
+    Only dispatched when GATEWAY_EVENT_METRICS is enabled.
+
+    Args:
+        event_type (str): The type of the gateway event (e.g. MESSAGE_CREATE)
+    """
+    metrics.increment(f"gateway_events.{event_type}")
+
+
 @bot.event
 async def on_ready() -> None:
     """
     Called when the bot is ready and connected to Discord.
     """
+    global startup_done
 
     try:
+        # on_ready fires again on every reconnect, so only guilds whose size drifted are recounted
+        member_counter.resync(bot.guilds)
+        if not guild_settings.is_loaded:
+            await guild_settings.load(guild.id for guild in bot.guilds)
+        if not startup_done:
+            await load_pending_reminders()
+            await bot.tree.sync()
+            if config.SNAPSHOT_INTERVAL > 0:
+                snapshot_task.start()
+            if config.MEMORY_CHECK_INTERVAL > 0:
+                memory_report_task.start()
+            startup_done = True
         send_reminders_task.start()
         user_count_update_task.start()
+        metrics_report_task.start()
 
         current_guilds = len(bot.guilds)
         stats_db.update_guild_count(current_guilds)
@@ -228,6 +442,10 @@ async def on_guild_join(guild: discord.Guild) -> None:
     """
     Called when the bot joins a new guild.
     """
+    member_counter.add_guild(guild)
+    await guild_settings.refresh([guild.id])
+    # Channels and users of the guild may have been found unreachable before the bot joined
+    unreachable.clear()
     current_guilds = len(bot.guilds)
     try:
         stats_db.update_guild_count(current_guilds)
@@ -241,6 +459,12 @@ async def on_guild_remove(guild: discord.Guild) -> None:
     """
     Called when the bot is removed from a guild.
     """
+    member_counter.remove_guild(guild)
+    member_cache.forget_guild(guild.id)
+    recent_activity.forget_guild(guild.id)
+    guild_settings.invalidate(guild.id)
+    pending_index.forget_guild(guild.id)
+    permission_cache.invalidate_guild(guild.id)
     current_guilds = len(bot.guilds)
     try:
         stats_db.update_guild_count(current_guilds)
@@ -249,10 +473,373 @@ async def on_guild_remove(guild: discord.Guild) -> None:
     logger.info(f"Total guilds: {current_guilds}")
 
 
+@bot.event
+async def on_member_join(member: discord.Member) -> None:
+    """
+    Called when a member joins a guild.
+    """
+    member_counter.member_join(member)
+    permission_cache.invalidate_member(member.id)
+    unreachable.invalidate_user(member.id)
+
+
+@bot.event
+async def on_member_update(before: discord.Member, after: discord.Member) -> None:
+    """
+    Called when a member's roles or other profile details change.
+    """
+    if before.roles != after.roles:
+        permission_cache.invalidate_member(after.id)
+        unreachable.invalidate_user(after.id)
+
+
+@bot.event
+async def on_member_remove(member: discord.Member) -> None:
+    """
+    Called when a member leaves or is removed from a guild.
+    """
+    member_counter.member_remove(member)
+    permission_cache.invalidate_member(member.id)
+
+
+@bot.event
+async def on_guild_channel_update(before: discord.abc.GuildChannel, after: discord.abc.GuildChannel) -> None:
+    """
+    Called when a channel's name, permissions or other settings change.
+    """
+    permission_cache.invalidate_channel(after.id)
+    unreachable.invalidate_channel(after.id)
+
+
+@bot.event
+async def on_guild_channel_delete(channel: discord.abc.GuildChannel) -> None:
+    """
+    Called when a channel is deleted, so its reminders are dropped without a lookup.
+    """
+    permission_cache.invalidate_channel(channel.id)
+    unreachable.mark(CHANNEL, channel.id)
+
+
+@bot.event
+async def on_guild_role_update(before: discord.Role, after: discord.Role) -> None:
+    """
+    Called when a role's permissions or other settings change.
+    """
+    permission_cache.invalidate_guild(after.guild.id)
+    unreachable.invalidate_permissions()
+
+
+@bot.event
+async def on_guild_role_delete(role: discord.Role) -> None:
+    """
+    Called when a role is deleted.
+    """
+    permission_cache.invalidate_guild(role.guild.id)
+    unreachable.invalidate_permissions()
+
+
+@bot.event
+async def on_thread_update(before: discord.Thread, after: discord.Thread) -> None:
+    """
+    Called when a thread is archived, unarchived or otherwise changed.
+    """
+    permission_cache.invalidate_channel(after.id)
+    unreachable.invalidate_channel(after.id)
+
+
+async def read_pending_reminders() -> list:
+    """
+    Read the stored pending reminders.
+
+    With a snapshot, only reminders created and deleted since its high-water
+    mark (less SNAPSHOT_RECONCILE_MARGIN) are read from the backend, so the
+    cost does not grow with the backlog. Deletes are found through the
+    tombstones written with them. A snapshot older than TOMBSTONE_RETENTION is
+    not used, since the tombstones of its deletes may be gone. Otherwise every
+    stored reminder is read.
+
+    Returns:
+        list: The reminders as dicts
+    """
+    snapshot = None
+    if config.SNAPSHOT_INTERVAL > 0:
+        snapshot = await asyncio.to_thread(read_snapshot, config.SNAPSHOT_PATH)
+    retained_since = now_ms() - config.TOMBSTONE_RETENTION * 1000
+    if snapshot is not None and snapshot[0] - config.SNAPSHOT_RECONCILE_MARGIN * 1000 < retained_since:
+        logger.info("The snapshot is older than the tombstones of deleted reminders, reading every stored reminder")
+        snapshot = None
+    if snapshot is None:
+        return await asyncio.to_thread(reminder_db.get_pending_reminders)
+
+    high_water_mark, reminders = snapshot
+    since = high_water_mark - config.SNAPSHOT_RECONCILE_MARGIN * 1000
+    changes = await asyncio.to_thread(reminder_db.get_reminders_created_since, since)
+    tombstones = await asyncio.to_thread(reminder_db.get_reminders_deleted_since, since)
+    changed = {(data["message_id"], data["mentioned_user_id"]) for data in changes}
+    deleted = {(data["message_id"], data["mentioned_user_id"]) for data in tombstones if "message_id" in data}
+    replied = {}
+    for data in tombstones:
+        if "channel_id" in data:
+            key = (data["channel_id"], data["mentioned_user_id"])
+            replied[key] = max(replied.get(key, 0), data["deleted_at"])
+
+    restored = []
+    for data in reminders:
+        key = (data["message_id"], data["mentioned_user_id"])
+        if key in changed or key in deleted:
+            continue
+        if snowflake_time_ms(data["message_id"]) <= replied.get((data["channel_id"], data["mentioned_user_id"]), -1):
+            continue
+        restored.append(data)
+    logger.info(
+        f"Read {len(restored)} reminders from the snapshot ({len(reminders) - len(restored)} changed or deleted since) "
+        f"and {len(changes)} from the backend"
+    )
+    try:
+        pruned = await asyncio.to_thread(reminder_db.prune_tombstones, retained_since)
+        if pruned:
+            logger.info(f"Pruned {pruned} tombstones of reminders deleted over {config.TOMBSTONE_RETENTION} seconds ago")
+    except Exception as e:
+        # Only costs reads at the next start
+        logger.error(f"Failed to prune the tombstones of deleted reminders: {e}")
+    return restored + changes
+
+
+def guild_of(channel_id: int):
+    """
+    Return the ID of the guild of a channel, or None if the channel is unknown.
+    """
+    channel = bot.get_channel(channel_id)
+    return channel.guild.id if channel is not None and channel.guild is not None else None
+
+
+async def start_change_feed(load_store: bool) -> bool:
+    """
+    Subscribe to the backend's reminder changes and load the first delivery.
+
+    Args:
+        load_store (bool): Also fill the in-memory store, for memory sweeps
+
+    Returns:
+        bool: True if the feed started, False if it failed or its first delivery did not come within CHANGE_FEED_START_TIMEOUT
+    """
+    try:
+        if load_store:
+            pending_store.track()
+        if reminder_outbox.is_open:
+            await reminder_outbox.flush()
+        loaded = await asyncio.wait_for(change_feed.start(guild_of, load_store), timeout=config.CHANGE_FEED_START_TIMEOUT)
+        logger.info(f"Change feed started with {loaded} pending reminders")
+        return True
+    except asyncio.TimeoutError:
+        logger.error(f"The change feed did not deliver the stored reminders within {config.CHANGE_FEED_START_TIMEOUT} s")
+    except Exception as e:
+        logger.error(f"Failed to start the change feed: {e}", exc_info=True)
+    change_feed.stop()
+    return False
+
+
+async def load_pending_reminders() -> None:
+    """
+    Fill the in-memory pending reminder index and store from storage.
+    """
+    load_store = config.REMINDER_SWEEP_SOURCE == "memory"
+    if config.CHANGE_FEED_ENABLED:
+        if await start_change_feed(load_store):
+            return
+        logger.warning("Reading the pending reminders without the change feed")
+    if not config.STILL_WAITING_LOAD_ON_START and not load_store:
+        return
+
+    try:
+        if load_store:
+            pending_store.track()
+        # Writes still in the outbox would otherwise be missing from what is read
+        if reminder_outbox.is_open:
+            await reminder_outbox.flush()
+        reminders = await read_pending_reminders()
+        if config.STILL_WAITING_LOAD_ON_START:
+            loaded = pending_index.load(reminders, guild_of)
+            logger.info(f"Loaded {loaded} pending reminders into the index")
+        if load_store:
+            loaded = pending_store.load(reminders)
+            logger.info(f"Loaded {loaded} pending reminders into the in-memory store, sweeps no longer query the backend")
+    except Exception as e:
+        logger.error(f"Failed to load pending reminders: {e}", exc_info=True)
+
+
+async def warm_up_backend() -> None:
+    """
+    Create the Firestore client in a thread so it is ready by the time events arrive.
+
+    Runs alongside the gateway connection instead of before it. Database calls
+    made before the warm-up finishes wait for it.
+    """
+    start = time.perf_counter()
+    try:
+        await asyncio.to_thread(init_firestore)
+        logger.info(f"Firestore client ready in {time.perf_counter() - start:.2f} seconds")
+    except Exception as e:
+        logger.error(f"Failed to initialize Firestore: {e}", exc_info=True)
+
+
+async def shutdown(reason: str) -> None:
+    """
+    Stop taking new work, let in-flight work finish and close the gateway connection.
+
+    A running sweep and the queued events get until SHUTDOWN_TIMEOUT, then
+    main() flushes buffered state with the time that is left.
+
+    Args:
+        reason (str): Why the bot is shutting down, for the log
+    """
+    global shutting_down, shutdown_deadline
+
+    if shutting_down:
+        return
+    shutting_down = True
+    shutdown_deadline = time.monotonic() + config.SHUTDOWN_TIMEOUT
+    logger.info(f"Shutting down ({reason}), flushing within {config.SHUTDOWN_TIMEOUT} seconds")
+
+    for task in (user_count_update_task, metrics_report_task, snapshot_task, memory_report_task):
+        task.cancel()
+    try:
+        await asyncio.wait_for(sweep_lock.acquire(), timeout=remaining())
+        sweep_lock.release()
+    except asyncio.TimeoutError:
+        logger.warning("Sweep still running at the shutdown deadline, cancelling it")
+    send_reminders_task.cancel()
+
+    drained = await event_pipeline.stop(timeout=remaining())
+    logger.info(f"Handled {drained} queued events before closing the gateway connection")
+    await bot.close()
+
+
+def start_shutdown_task(reason: str) -> None:
+    """
+    Start a shutdown from a signal handler, keeping a reference to its task so it is not garbage collected.
+
+    Args:
+        reason (str): Why the bot shuts down, for the log
+    """
+    task = asyncio.create_task(shutdown(reason))
+    shutdown_tasks.add(task)
+    task.add_done_callback(shutdown_tasks.discard)
+
+
+def remaining() -> float:
+    """
+    Return the seconds left until the shutdown deadline.
+    """
+    if shutdown_deadline is None:
+        return float(config.SHUTDOWN_TIMEOUT)
+    return max(shutdown_deadline - time.monotonic(), 0.0)
+
+
+async def flush_state(grace_worker, outbox_worker) -> dict:
+    """
+    Write buffered state to storage before exiting.
+
+    Args:
+        grace_worker: The grace window task, or None
+        outbox_worker: The outbox drain task, or None
+
+    Returns:
+        dict: What was flushed, by kind
+    """
+    global shutdown_deadline
+
+    if shutdown_deadline is None:
+        shutdown_deadline = time.monotonic() + config.SHUTDOWN_TIMEOUT
+    flushed = {"events": 0, "grace": 0, "outbox": 0, "snapshot": 0}
+    flushed["events"] = await event_pipeline.stop(timeout=remaining())
+
+    if grace_worker is not None:
+        grace_worker.cancel()
+        held = reminder_grace.pop_all()
+        try:
+            if reminder_outbox.is_open:
+                # Only appended to the outbox log, which is flushed below
+                persist_reminders(held)
+            else:
+                await asyncio.wait_for(asyncio.to_thread(persist_reminders, held), timeout=remaining())
+            flushed["grace"] = len(held)
+        except asyncio.TimeoutError:
+            logger.error(f"Timed out persisting {len(held)} reminders held in the grace window")
+        except Exception as e:
+            logger.error(f"Failed to persist {len(held)} reminders held in the grace window: {e}")
+
+    if outbox_worker is not None:
+        outbox_worker.cancel()
+        try:
+            flushed["outbox"] = await reminder_outbox.flush(timeout=remaining())
+        except Exception as e:
+            # Writes that were not drained stay in the log and are replayed at the next start
+            logger.error(f"Failed to flush the outbox ({len(reminder_outbox)} writes left for the next start): {e!r}")
+        reminder_outbox.close()
+
+    if config.SNAPSHOT_INTERVAL > 0:
+        flushed["snapshot"] = await save_snapshot()
+    return flushed
+
+
+async def main() -> None:
+    """
+    Start the bot, warming up the backend while connecting to the gateway.
+
+    SIGTERM and SIGINT shut the bot down gracefully (see shutdown()), SIGUSR1
+    starts a profile (see profiler.py).
+    """
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(signum, start_shutdown_task, signal.Signals(signum).name)
+        except NotImplementedError:
+            pass  # Windows, KeyboardInterrupt still stops the bot
+    if hasattr(signal, "SIGUSR1"):
+        # kill -USR1 <pid> profiles a live process, the summary goes to the log
+        loop.add_signal_handler(signal.SIGUSR1, start_profile_task, config.PROFILE_DEFAULT_SECONDS)
+
+    async with bot:
+        warm_up = asyncio.create_task(warm_up_backend())
+
+        outbox_worker = None
+        if config.OUTBOX_ENABLED:
+            replayed = reminder_outbox.open()
+            logger.info(f"Outbox opened at {config.OUTBOX_PATH} ({replayed} writes replayed)")
+            outbox_worker = asyncio.create_task(reminder_outbox.run())
+
+        if config.EVENT_QUEUE_SIZE > 0:
+            event_pipeline.start()
+
+        monitor_worker = None
+        if config.LOOP_MONITOR_INTERVAL > 0:
+            monitor_worker = asyncio.create_task(loop_monitor.run())
+
+        grace_worker = None
+        if config.REMINDER_GRACE_PERIOD > 0:
+            grace_worker = asyncio.create_task(reminder_grace.run(persist_reminders))
+
+        try:
+            await bot.start(token)
+        finally:
+            change_feed.stop()
+            if monitor_worker is not None:
+                monitor_worker.cancel()
+            start = time.perf_counter()
+            flushed = await flush_state(grace_worker, outbox_worker)
+            summary = ", ".join(f"{count} {kind}" for kind, count in flushed.items())
+            logger.info(f"Flushed {summary} in {time.perf_counter() - start:.2f} seconds")
+            await warm_up
+
+
 if __name__ == "__main__":
     try:
-        bot.run(token)
+        logger.info(f"Using the {use_event_loop(config.EVENT_LOOP)} event loop")
+        asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("Bot shutdown requested by user")
     except Exception as e:
         logger.error(f"Fatal error: {e}", exc_info=True)
+    finally:
+        log_listener.stop()
@@ -0,0 +1,98 @@
+import logging
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Set
+
+import discord
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class GuildChunkCache:
+    """
+    On-demand member chunking for low memory mode.
+
+    Guilds are not chunked at startup. Members are cached as they are seen, and a
+    guild is only chunked when a mention needs its full member list. At most
+    ``max_guilds`` guilds are kept fully chunked; when the limit is exceeded the
+    least recently used guild drops every member that was only cached by the chunk.
+    """
+
+    def __init__(self, max_guilds: int):
+        self.max_guilds = max_guilds
+        self._chunked: "OrderedDict[int, discord.Guild]" = OrderedDict()
+        self._seen: Dict[int, Set[int]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._chunked)
+
+    def remember_member(self, member: Any) -> None:
+        """
+        Cache a member that was seen in a gateway event.
+
+        Args:
+            member (Any): The author of a message or reaction, only guild members are cached
+        """
+        if not isinstance(member, discord.Member):
+            return
+        guild = member.guild
+        self._seen[guild.id].add(member.id)
+        if guild.get_member(member.id) is None:
+            # discord.py has no public API for adding a member to the cache
+            guild._add_member(member)
+
+    async def ensure_chunked(self, guild: discord.Guild) -> None:
+        """
+        Make sure the full member list of a guild is cached.
+
+        Args:
+            guild (discord.Guild): The guild whose members are needed
+        """
+        if guild.id in self._chunked:
+            self._chunked.move_to_end(guild.id)
+            return
+
+        if not guild.chunked:
+            await guild.chunk(cache=True)
+            logger.info(f"Chunked guild {guild.id} on demand ({len(guild.members)} members)")
+
+        self._chunked[guild.id] = guild
+        self.shrink(self.max_guilds)
+
+    def shrink(self, max_guilds: int) -> None:
+        """
+        Keep at most ``max_guilds`` chunked guilds from now on, evicting the least recently used.
+
+        Args:
+            max_guilds (int): The new limit
+        """
+        self.max_guilds = max_guilds
+        while len(self._chunked) > self.max_guilds:
+            _, evicted = self._chunked.popitem(last=False)
+            self._evict(evicted)
+
+    def _evict(self, guild: discord.Guild) -> None:
+        seen = self._seen.get(guild.id, set())
+        me = guild.me
+        evicted = 0
+        for member in list(guild.members):
+            if member.id in seen or (me is not None and member.id == me.id):
+                continue
+            # discord.py has no public API for removing a member from the cache
+            guild._remove_member(member)
+            evicted += 1
+        logger.info(f"Evicted {evicted} chunked members of guild {guild.id} from the cache")
+
+    def forget_guild(self, guild_id: int) -> None:
+        """
+        Stop tracking a guild the bot is no longer in.
+
+        Args:
+            guild_id (int): The ID of the guild
+        """
+        self._chunked.pop(guild_id, None)
+        self._seen.pop(guild_id, None)
+
+
+member_cache = GuildChunkCache(config.MAX_CHUNKED_GUILDS)
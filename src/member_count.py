@@ -0,0 +1,140 @@
+import logging
+from typing import Dict, Iterable, Tuple
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+
+class HumanMemberCounter:
+    """
+    Running per-guild counts of human (non-bot) members.
+
+    The counts are built once per guild and then kept current from member and
+    guild events, so reporting the total never walks the member cache.
+    """
+
+    def __init__(self):
+        # guild_id -> (humans, bots)
+        self._counts: Dict[int, Tuple[int, int]] = {}
+        self._total = 0
+
+    @property
+    def total(self) -> int:
+        """int: Total number of human members across all tracked guilds."""
+        return self._total
+
+    def guild_count(self, guild_id: int) -> int:
+        """
+        Return the number of human members tracked for a guild.
+
+        Args:
+            guild_id (int): The ID of the guild
+
+        Returns:
+            int: The number of human members, 0 if the guild is not tracked
+        """
+        return self._counts.get(guild_id, (0, 0))[0]
+
+    def _set(self, guild_id: int, humans: int, bots: int) -> None:
+        old_humans, _ = self._counts.get(guild_id, (0, 0))
+        self._counts[guild_id] = (humans, bots)
+        self._total += humans - old_humans
+
+    def _count_guild(self, guild: discord.Guild) -> Tuple[int, int]:
+        # Guilds that are not chunked (low memory mode) only have part of their
+        # members cached, so uncached bots are counted as humans until chunked
+        bots = sum(1 for member in guild.members if member.bot)
+        size = guild.member_count if guild.member_count is not None else len(guild.members)
+        return size - bots, bots
+
+    def add_guild(self, guild: discord.Guild) -> None:
+        """
+        Count the members of a guild and start tracking it.
+
+        Args:
+            guild (discord.Guild): The guild to track
+        """
+        humans, bots = self._count_guild(guild)
+        self._set(guild.id, humans, bots)
+
+    def remove_guild(self, guild: discord.Guild) -> None:
+        """
+        Stop tracking a guild and drop its members from the total.
+
+        Args:
+            guild (discord.Guild): The guild to stop tracking
+        """
+        humans, _ = self._counts.pop(guild.id, (0, 0))
+        self._total -= humans
+
+    def reset(self, guilds: Iterable[discord.Guild]) -> None:
+        """
+        Rebuild the counts from scratch for the given guilds.
+
+        Args:
+            guilds (Iterable[discord.Guild]): All guilds the bot is in
+        """
+        self._counts.clear()
+        self._total = 0
+        for guild in guilds:
+            self.add_guild(guild)
+
+    def member_join(self, member: discord.Member) -> None:
+        """
+        Account for a member joining a tracked guild.
+
+        Args:
+            member (discord.Member): The member who joined
+        """
+        humans, bots = self._counts.get(member.guild.id, (0, 0))
+        if member.bot:
+            self._set(member.guild.id, humans, bots + 1)
+        else:
+            self._set(member.guild.id, humans + 1, bots)
+
+    def member_remove(self, member: discord.Member) -> None:
+        """
+        Account for a member leaving a tracked guild.
+
+        Args:
+            member (discord.Member): The member who left
+        """
+        humans, bots = self._counts.get(member.guild.id, (0, 0))
+        if member.bot:
+            self._set(member.guild.id, humans, max(bots - 1, 0))
+        else:
+            self._set(member.guild.id, max(humans - 1, 0), bots)
+
+    def resync(self, guilds: Iterable[discord.Guild]) -> int:
+        """
+        Check the tracked counts against the guilds and recount any that drifted.
+
+        A guild is only recounted when its tracked size no longer matches
+        ``guild.member_count`` (or it is not tracked yet), so a resync of
+        guilds that are in step costs one comparison per guild. Guilds that are
+        no longer present are dropped.
+
+        Args:
+            guilds (Iterable[discord.Guild]): All guilds the bot is in
+
+        Returns:
+            int: The number of guilds that had to be recounted
+        """
+        recounted = 0
+        seen = set()
+        for guild in guilds:
+            seen.add(guild.id)
+            tracked = self._counts.get(guild.id)
+            if tracked is not None and sum(tracked) == guild.member_count:
+                continue
+            self.add_guild(guild)
+            recounted += 1
+
+        for guild_id in [guild_id for guild_id in self._counts if guild_id not in seen]:
+            humans, _ = self._counts.pop(guild_id)
+            self._total -= humans
+
+        if recounted:
+            logger.info(f"Recounted human members in {recounted} guild(s) during resync")
+        return recounted
@@ -0,0 +1,248 @@
+import itertools
+import logging
+import os
+import sys
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import discord
+
+from config import config
+from member_cache import member_cache
+from metrics import metrics
+from pending import pending_index
+from pending_store import pending_store
+from permission_cache import permission_cache
+
+logger = logging.getLogger(__name__)
+
+MIB = 1024 * 1024
+# Objects measured per cache; the rest are assumed to be the same size
+SAMPLE_SIZE = 64
+# Members checked for a presence; the share with one is assumed for the rest
+PRESENCE_SAMPLE_SIZE = 1000
+# Caches are trimmed toward this share of the budget, and restored to their configured limits once RSS is back under it
+LOW_WATER = 0.8
+# Trimmed caches keep at least this share of their configured limits
+TRIM_FLOOR = 0.25
+ATOMIC = (str, bytes, int, float, bool, type(None))
+
+# (entries, approximate bytes)
+CacheUsage = Tuple[int, int]
+
+
+def _attributes(obj: Any) -> List[Any]:
+    names = [name for cls in type(obj).__mro__ for name in getattr(cls, "__slots__", ())]
+    values = [getattr(obj, name, None) for name in names if name != "__weakref__"]
+    return values + list(getattr(obj, "__dict__", {}).values())
+
+
+def approx_size(obj: Any, depth: int = 3) -> int:
+    """
+    Return the approximate bytes an object holds on its own.
+
+    Follows the object's attributes and the contents of containers, but not
+    into other discord.py models (anything with a connection state), since
+    those are shared, e.g. the guild of a member, and counted in their own cache.
+
+    Args:
+        obj (Any): The object
+        depth (int): How many levels of references to follow
+
+    Returns:
+        int: Approximate bytes
+    """
+    size = sys.getsizeof(obj)
+    if depth == 0 or isinstance(obj, ATOMIC):
+        return size
+    if isinstance(obj, dict):
+        children = itertools.chain(obj.keys(), obj.values())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        children = obj
+    else:
+        children = _attributes(obj)
+    for child in children:
+        if isinstance(child, ATOMIC) or not hasattr(child, "_state"):
+            size += approx_size(child, depth - 1)
+    return size
+
+
+def estimate(items: Iterable[Any], count: int, measure=approx_size) -> int:
+    """
+    Estimate the bytes of ``count`` objects from the first few of them.
+
+    Args:
+        items (Iterable[Any]): The objects
+        count (int): How many objects there are
+        measure (Callable[[Any], int]): Returns the bytes of one object
+
+    Returns:
+        int: Approximate bytes
+    """
+    sample = [measure(item) for item in itertools.islice(items, SAMPLE_SIZE)]
+    return int(sum(sample) / len(sample) * count) if sample else 0
+
+
+def presence_size(member: discord.Member) -> int:
+    return approx_size(member.activities) + approx_size(member.client_status)
+
+
+def current_rss() -> Optional[int]:
+    """
+    Return the resident set size of the process.
+
+    Returns:
+        Optional[int]: Bytes, or None where /proc is not available
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def cache_usage(bot: discord.Client) -> Dict[str, CacheUsage]:
+    """
+    Return the entries and approximate bytes of each in-process cache.
+
+    Args:
+        bot (discord.Client): The bot, for the discord.py caches
+
+    Returns:
+        Dict[str, CacheUsage]: Cache name -> (entries, approximate bytes)
+    """
+    guilds = bot.guilds
+    members = sum(len(guild.members) for guild in guilds)
+    present, presences = [], 0
+    if config.PRESENCE_INTENT:
+        # Checking every member would hold up the event loop in large bots
+        sample = list(itertools.islice(bot.get_all_members(), PRESENCE_SAMPLE_SIZE))
+        present = [member for member in sample if member.activities or member.raw_status != "offline"]
+        presences = round(len(present) / len(sample) * members) if sample else 0
+    channels = [channel for guild in guilds for channel in itertools.chain(guild.channels, guild.threads, guild.roles)]
+    messages = bot.cached_messages
+    return {
+        "members": (members, estimate(bot.get_all_members(), members)),
+        "users": (len(bot.users), estimate(bot.users, len(bot.users))),
+        "presences": (presences, estimate(present, presences, presence_size)),
+        "guilds": (len(guilds), estimate(guilds, len(guilds)) + estimate(channels, len(channels))),
+        "messages": (len(messages), estimate(reversed(messages), len(messages))),
+        "reminder index": (max(len(pending_index), len(pending_store)), pending_index.memory_bytes() + pending_store.memory_bytes()),
+        "permissions": (len(permission_cache), permission_cache.memory_bytes()),
+    }
+
+
+class MemoryBudget:
+    """
+    Reports the memory of each cache and keeps the process within a budget.
+
+    check() publishes the cache sizes and the RSS as metrics. Above the budget
+    it logs the largest caches and, with ``evict``, trims the caches the bot
+    can rebuild toward LOW_WATER of the budget: the message cache by its
+    estimated excess, resolved permissions, and in low memory mode half of the
+    chunked guilds. No cache goes below TRIM_FLOOR of its configured limit.
+    Freed memory is often kept by the allocator, so the caches are only trimmed
+    again if RSS grows past where it was at the last trim, and their limits are
+    restored once RSS is back under LOW_WATER. Members and presences outside
+    low memory mode can only be reduced by configuration (LOW_MEMORY_MODE,
+    PRESENCE_INTENT), which the warning points to.
+    """
+
+    def __init__(self, budget_mb: int, evict: bool = False):
+        self.budget = budget_mb * MIB
+        self.evict = evict
+        # The configured (message cache, chunked guilds) limits while trimmed, else None
+        self._limits: Optional[Tuple[Optional[int], int]] = None
+        self._trimmed_at = 0
+
+    @property
+    def is_trimmed(self) -> bool:
+        return self._limits is not None
+
+    def check(self, bot: discord.Client) -> Dict[str, CacheUsage]:
+        """
+        Measure the caches, publish them and act if the process is over or back under budget.
+
+        Args:
+            bot (discord.Client): The bot
+
+        Returns:
+            Dict[str, CacheUsage]: Cache name -> (entries, approximate bytes)
+        """
+        usage = cache_usage(bot)
+        rss = current_rss()
+        for name, (entries, size) in usage.items():
+            key = name.replace(" ", "_")
+            metrics.set_gauge(f"memory.{key}.entries", entries)
+            metrics.set_gauge(f"memory.{key}.mb", round(size / MIB, 1))
+        if rss is not None:
+            metrics.set_gauge("memory.rss_mb", round(rss / MIB, 1))
+
+        largest = sorted(usage.items(), key=lambda item: item[1][1], reverse=True)
+        breakdown = ", ".join(f"{name} {size / MIB:.1f} MiB ({entries})" for name, (entries, size) in largest)
+        rss_text = f"{rss / MIB:.0f} MiB" if rss is not None else "unknown"
+        logger.info(f"Memory: RSS {rss_text}, caches: {breakdown}")
+
+        if not self.budget or rss is None:
+            return usage
+        if rss > self.budget:
+            metrics.increment("memory.over_budget")
+            logger.warning(
+                f"RSS of {rss / MIB:.0f} MiB is over the memory budget of {self.budget / MIB:.0f} MiB, "
+                f"largest cache: {largest[0][0]}. Consider LOW_MEMORY_MODE (members) or PRESENCE_INTENT = False (presences)"
+            )
+            if self.evict and rss > self._trimmed_at:
+                self.trim(bot, usage, rss)
+        elif self.is_trimmed and rss < self.budget * LOW_WATER:
+            self.restore(bot)
+        return usage
+
+    def trim(self, bot: discord.Client, usage: Dict[str, CacheUsage], rss: int) -> None:
+        """
+        Shrink the caches the bot can rebuild on demand, toward LOW_WATER of the budget.
+
+        Args:
+            bot (discord.Client): The bot
+            usage (Dict[str, CacheUsage]): The cache sizes from cache_usage()
+            rss (int): The resident set size in bytes
+        """
+        state = bot._connection
+        if self._limits is None:
+            self._limits = (state.max_messages, member_cache.max_guilds)
+        max_messages, max_guilds = self._limits
+        self._trimmed_at = rss
+        excess = rss - self.budget * LOW_WATER
+
+        messages, message_bytes = usage["messages"]
+        if max_messages and messages:
+            floor = max(1, int(max_messages * TRIM_FLOOR))
+            keep = max(floor, messages - int(excess / (message_bytes / messages or 1)))
+            if keep < messages:
+                # discord.py has no public API for resizing the message cache
+                state.max_messages = keep
+                state._messages = deque(state._messages, maxlen=keep)
+                metrics.increment("memory.trimmed.messages")
+        permission_cache.clear()
+        floor = max(1, int(max_guilds * TRIM_FLOOR))
+        if config.LOW_MEMORY_MODE and len(member_cache) > floor:
+            member_cache.shrink(max(floor, len(member_cache) // 2))
+            metrics.increment("memory.trimmed.members")
+        logger.info(f"Trimmed the caches to {state.max_messages} messages and {len(member_cache)} chunked guilds")
+
+    def restore(self, bot: discord.Client) -> None:
+        """
+        Return the trimmed caches to their configured limits.
+
+        Args:
+            bot (discord.Client): The bot
+        """
+        max_messages, max_guilds = self._limits
+        state = bot._connection
+        if max_messages and state._messages is not None:
+            state.max_messages = max_messages
+            state._messages = deque(state._messages, maxlen=max_messages)
+        member_cache.max_guilds = max_guilds
+        self._limits = None
+        self._trimmed_at = 0
+        metrics.increment("memory.restored")
+        logger.info(f"Memory is back under budget, restored the caches to {max_messages} messages and {max_guilds} chunked guilds")
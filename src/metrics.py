@@ -0,0 +1,58 @@
+import logging
+from collections import defaultdict
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+class Metrics:
+    """
+    In-process counters and gauges.
+
+    Counters only ever go up (e.g. gateway events received), gauges hold the
+    latest value of a measurement (e.g. a queue depth).
+    """
+
+    def __init__(self):
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.gauges: Dict[str, float] = {}
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """
+        Increment a counter.
+
+        Args:
+            name (str): The name of the counter
+            value (int): The amount to add
+        """
+        self.counters[name] += value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """
+        Set a gauge to its latest value.
+
+        Args:
+            name (str): The name of the gauge
+            value (float): The latest value
+        """
+        self.gauges[name] = value
+
+    def snapshot(self) -> Dict[str, float]:
+        """
+        Return the current value of every counter and gauge.
+
+        Returns:
+            Dict[str, float]: Metric names mapped to their values, sorted by name
+        """
+        values = {**self.counters, **self.gauges}
+        return dict(sorted(values.items()))
+
+    def log_summary(self) -> None:
+        """
+        Log the current value of every metric on a single line.
+        """
+        summary = ", ".join(f"{name}={value}" for name, value in self.snapshot().items())
+        logger.info(f"Metrics: {summary}")
+
+
+metrics = Metrics()
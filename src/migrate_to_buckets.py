@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Move existing reminders from the flat collection into due-time buckets.
+
+Run this once before switching REMINDER_LAYOUT to "bucketed" (and again after
+switching, to pick up reminders written in the meantime). It is safe to stop
+and re-run.
+
+Usage:
+    python src/migrate_to_buckets.py [batch_size]
+"""
+
+import logging
+import sys
+
+from db import FirestoreReminderCollection
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    reminder_db = FirestoreReminderCollection(layout="bucketed")
+    migrated = reminder_db.migrate_to_buckets(batch_size=batch_size)
+    logger.info(f"Migration finished: {migrated} reminders moved to buckets")
+
+
+if __name__ == "__main__":
+    main()
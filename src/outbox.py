@@ -0,0 +1,302 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Operations understood by FirestoreReminderCollection.apply_writes()
+OPERATIONS = ("save", "delete_replied", "delete_reacted")
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    Check whether a backend error may go away on its own, e.g. an outage or a rate limit.
+
+    Args:
+        error (Exception): The error raised by the backend
+
+    Returns:
+        bool: True if the write should be retried without counting an attempt
+    """
+    if isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    try:
+        from google.api_core import exceptions
+    except ImportError:
+        return False
+    return isinstance(error, (
+        exceptions.ServiceUnavailable,
+        exceptions.DeadlineExceeded,
+        exceptions.InternalServerError,
+        exceptions.TooManyRequests,
+        exceptions.Aborted,
+    ))
+
+
+class Outbox:
+    """
+    Durable local write-ahead log for reminder writes.
+
+    Writes are appended to an on-disk log and acknowledged at once. A background
+    worker (run) drains them to the backend in batches, in order, retrying with
+    backoff while the backend is unavailable. Drained batches are marked in the
+    log, and writes that were not drained before a restart are replayed by open().
+    Once ``compact_after`` drained writes have piled up in the log, it is
+    rewritten with only the pending ones, so it stays small under steady traffic.
+    The backend operations must be idempotent, since a batch that was applied but
+    not yet marked is applied again after a crash.
+
+    A write the backend keeps rejecting must not hold up the writes behind it.
+    Once a batch failed ``max_attempts`` times with errors that are not transient
+    (see is_transient), its writes are applied one at a time, and a single write
+    that fails ``max_attempts`` times is moved to the dead-letter file.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        backend: Any,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_retry_delay: float = 60,
+        fsync: bool = False,
+        max_attempts: int = 5,
+        dead_letter_path: Optional[str] = None,
+        compact_after: int = 1000,
+    ):
+        self.path = path
+        self.backend = backend
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retry_delay = max_retry_delay
+        self.fsync = fsync
+        self.max_attempts = max_attempts
+        self.dead_letter_path = dead_letter_path or f"{path}.dead"
+        self.compact_after = compact_after
+
+        self._pending: Deque[Dict[str, Any]] = deque()
+        self._file = None
+        self._next_seq = 1
+        # Drained writes still in the log
+        self._drained_in_log = 0
+        self._wakeup = asyncio.Event()
+        self._drain_lock = asyncio.Lock()
+        # Failed attempts of the next batch, and how many writes are still applied one at a time
+        self._attempts = 0
+        self._isolating = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    @property
+    def is_open(self) -> bool:
+        """bool: Whether the log is open and writes should go through the outbox."""
+        return self._file is not None
+
+    def open(self) -> int:
+        """
+        Open the log and load the writes that were not drained yet.
+
+        Returns:
+            int: The number of writes replayed from a previous run
+        """
+        records = []
+        acked = 0
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as log:
+                for line in log:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn last line from a crash mid-append, it was never acknowledged
+                        logger.warning(f"Skipping unreadable outbox record in {self.path}")
+                        continue
+                    if "ack" in record:
+                        acked = max(acked, record["ack"])
+                    else:
+                        records.append(record)
+        else:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        self._pending = deque(record for record in records if record["seq"] > acked)
+        self._next_seq = max([acked] + [record["seq"] for record in records]) + 1
+
+        if self._pending:
+            # Also drops a torn last line, which the next append would otherwise continue
+            self._compact()
+        else:
+            # Everything was drained, start from an empty log
+            self._file = open(self.path, "w", encoding="utf-8")
+            self._drained_in_log = 0
+        return len(self._pending)
+
+    def close(self) -> None:
+        """
+        Close the log. Writes that were not drained stay in it for the next open().
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def append(self, op: str, **args: Any) -> None:
+        """
+        Record a write in the log. It is drained to the backend in the background.
+
+        Args:
+            op (str): One of OPERATIONS
+            **args: The arguments of the operation
+        """
+        if op not in OPERATIONS:
+            raise ValueError(f"Unknown outbox operation: {op}")
+
+        record = {"seq": self._next_seq, "op": op, "args": args}
+        self._next_seq += 1
+        self._write(record)
+        self._pending.append(record)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def drain_once(self) -> int:
+        """
+        Apply the next batch of writes to the backend.
+
+        Returns:
+            int: The number of writes applied
+
+        Raises:
+            Exception: Any error from the backend, the batch stays pending
+        """
+        async with self._drain_lock:
+            batch = list(itertools.islice(self._pending, 1 if self._isolating else self.batch_size))
+            if not batch:
+                return 0
+
+            writes = [(record["op"], record["args"]) for record in batch]
+            await asyncio.to_thread(self.backend.apply_writes, writes)
+
+            self._ack(batch)
+            self._attempts = 0
+            self._isolating = max(0, self._isolating - len(batch))
+            return len(batch)
+
+    def _ack(self, batch: List[Dict[str, Any]]) -> None:
+        for _ in batch:
+            self._pending.popleft()
+        self._drained_in_log += len(batch)
+        if not self._pending:
+            # Nothing left to replay, so the log can start over
+            self._file.close()
+            self._file = open(self.path, "w", encoding="utf-8")
+            self._drained_in_log = 0
+        elif self._drained_in_log >= self.compact_after:
+            self._compact()
+        else:
+            self._write({"ack": batch[-1]["seq"]})
+
+    def _compact(self) -> None:
+        # The pending writes are written next to the log and renamed over it, so a crash keeps one of the two
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as log:
+            for record in self._pending:
+                log.write(json.dumps(record, separators=(",", ":")) + "\n")
+            log.flush()
+            os.fsync(log.fileno())
+        if self._file is not None:
+            self._file.close()
+        os.replace(temp_path, self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._drained_in_log = 0
+
+    async def _handle_failure(self, error: Exception) -> bool:
+        """
+        Count a failed drain, and isolate or set aside the write that keeps failing.
+
+        Args:
+            error (Exception): The error raised by the backend
+
+        Returns:
+            bool: True if the next attempt can follow at once, without backoff
+        """
+        if is_transient(error):
+            return False
+        self._attempts += 1
+        if self._attempts < self.max_attempts:
+            return False
+
+        async with self._drain_lock:
+            self._attempts = 0
+            if not self._isolating and self.batch_size > 1 and len(self._pending) > 1:
+                self._isolating = min(self.batch_size, len(self._pending))
+                logger.warning(f"Outbox batch failed {self.max_attempts} times, applying its {self._isolating} writes one at a time")
+                return True
+
+            record = self._pending[0]
+            os.makedirs(os.path.dirname(self.dead_letter_path) or ".", exist_ok=True)
+            with open(self.dead_letter_path, "a", encoding="utf-8") as dead_letters:
+                dead_letters.write(json.dumps({**record, "error": repr(error)}, separators=(",", ":")) + "\n")
+            self._ack([record])
+            self._isolating = max(0, self._isolating - 1)
+            logger.error(
+                f"Moved outbox write {record['seq']} ({record['op']}) to {self.dead_letter_path} after {self.max_attempts} failed attempts: {error!r}"
+            )
+            return True
+
+    async def flush(self, timeout: Optional[float] = None) -> int:
+        """
+        Drain every pending write to the backend.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait at most, no limit if None
+
+        Returns:
+            int: The number of writes applied
+
+        Raises:
+            Exception: Any error from the backend, or asyncio.TimeoutError
+        """
+        async def drain_all():
+            drained = 0
+            while self._pending:
+                drained += await self.drain_once()
+            return drained
+
+        return await asyncio.wait_for(drain_all(), timeout=timeout)
+
+    async def run(self) -> None:
+        """
+        Drain writes to the backend until cancelled.
+
+        Wakes up every flush_interval seconds, or as soon as a full batch is
+        pending. Backend errors are retried with exponential backoff, writes
+        that keep failing are moved to the dead-letter file.
+        """
+        retry_delay = 1.0
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            while self._pending:
+                try:
+                    await self.drain_once()
+                    retry_delay = 1.0
+                except Exception as e:
+                    if await self._handle_failure(e):
+                        continue
+                    logger.error(
+                        f"Failed to drain outbox ({len(self._pending)} pending writes), retrying in {retry_delay:.0f} seconds: {e}"
+                    )
+                    await asyncio.sleep(retry_delay)
+                    retry_delay = min(retry_delay * 2, self.max_retry_delay)
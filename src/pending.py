@@ -0,0 +1,193 @@
+import sys
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from config import config
+from records import ReminderRecord
+from snowflake import due_key
+
+
+class PendingReminderIndex:
+    """
+    In-memory index of pending reminders, by guild and user.
+
+    Kept in step with the write path (registrations, replies, reactions and sent
+    reminders) so that questions like "who am I still waiting on?" are answered
+    without a backend query. Lookups cost O(k log k) for a user with k reminders.
+    """
+
+    def __init__(self):
+        self.is_loaded = False
+        # (message_id, mentioned_user_id) -> reminder
+        self._records: Dict[Tuple[int, int], ReminderRecord] = {}
+        # (guild_id, mentioned_user_id) -> keys, reminders waiting on the user
+        self._incoming: Dict[Tuple[int, int], Set[Tuple[int, int]]] = defaultdict(set)
+        # (guild_id, author_id) -> keys, reminders the user is waiting for
+        self._outgoing: Dict[Tuple[int, int], Set[Tuple[int, int]]] = defaultdict(set)
+        # (channel_id, mentioned_user_id) -> message_ids, for replies in the channel
+        self._by_channel_user: Dict[Tuple[int, int], Set[int]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def memory_bytes(self) -> int:
+        """
+        Return the approximate memory held by the index.
+
+        Returns:
+            int: Approximate bytes, from the containers and one sampled reminder
+        """
+        indexes = (self._incoming, self._outgoing, self._by_channel_user)
+        size = sys.getsizeof(self._records) + sum(sys.getsizeof(index) for index in indexes)
+        sample = next(iter(self._records.values()), None)
+        if sample is None:
+            return size
+        values = sum(sys.getsizeof(getattr(sample, name)) for name in ReminderRecord.__slots__)
+        # The record, its key and one key or message ID in each index
+        size += len(self._records) * (sys.getsizeof(sample) + values + 3 * sys.getsizeof(sample.key))
+        for index in indexes:
+            size += len(index) * sys.getsizeof(next(iter(index.values()), set()))
+        return size
+
+    def add(self, reminder: ReminderRecord) -> None:
+        """
+        Add a pending reminder to the index.
+
+        Args:
+            reminder (ReminderRecord): The reminder, with its guild_id and due_at set
+        """
+        key = reminder.key
+        if key in self._records:
+            return
+        self._records[key] = reminder
+        self._incoming[(reminder.guild_id, reminder.mentioned_user_id)].add(key)
+        if reminder.author_id is not None:
+            self._outgoing[(reminder.guild_id, reminder.author_id)].add(key)
+        self._by_channel_user[(reminder.channel_id, reminder.mentioned_user_id)].add(reminder.message_id)
+
+    @staticmethod
+    def _discard(index: Dict[Any, Set[Any]], key: Any, value: Any) -> None:
+        values = index.get(key)
+        if values is None:
+            return
+        values.discard(value)
+        if not values:
+            del index[key]
+
+    def remove(self, message_id: int, mentioned_user_id: int) -> bool:
+        """
+        Remove a reminder, e.g. after a reaction or once it was sent.
+
+        Args:
+            message_id (int): The ID of the message with the mention
+            mentioned_user_id (int): The ID of the mentioned user
+
+        Returns:
+            bool: True if the reminder was in the index
+        """
+        key = (message_id, mentioned_user_id)
+        reminder = self._records.pop(key, None)
+        if reminder is None:
+            return False
+        self._discard(self._incoming, (reminder.guild_id, mentioned_user_id), key)
+        if reminder.author_id is not None:
+            self._discard(self._outgoing, (reminder.guild_id, reminder.author_id), key)
+        self._discard(self._by_channel_user, (reminder.channel_id, mentioned_user_id), message_id)
+        return True
+
+    def remove_replied(self, channel_id: int, user_id: int) -> int:
+        """
+        Remove the reminders of a user who sent a message in the channel.
+
+        Args:
+            channel_id (int): The ID of the channel of the message
+            user_id (int): The ID of the author
+
+        Returns:
+            int: The number of reminders removed
+        """
+        message_ids = list(self._by_channel_user.get((channel_id, user_id), ()))
+        for message_id in message_ids:
+            self.remove(message_id, user_id)
+        return len(message_ids)
+
+    def records(self) -> List[ReminderRecord]:
+        """
+        Return every pending reminder, e.g. to write a snapshot.
+
+        Returns:
+            List[ReminderRecord]: The reminders
+        """
+        return list(self._records.values())
+
+    def _sorted(self, keys: Optional[Set[Tuple[int, int]]]) -> List[ReminderRecord]:
+        if not keys:
+            return []
+        return sorted((self._records[key] for key in keys), key=lambda reminder: reminder.due_at)
+
+    def incoming(self, guild_id: int, user_id: int) -> List[ReminderRecord]:
+        """
+        Return the reminders waiting on a user in a guild, soonest due first.
+
+        Args:
+            guild_id (int): The ID of the guild
+            user_id (int): The ID of the mentioned user
+
+        Returns:
+            List[ReminderRecord]: The reminders
+        """
+        return self._sorted(self._incoming.get((guild_id, user_id)))
+
+    def outgoing(self, guild_id: int, user_id: int) -> List[ReminderRecord]:
+        """
+        Return the reminders for mentions a user sent in a guild, soonest due first.
+
+        Args:
+            guild_id (int): The ID of the guild
+            user_id (int): The ID of the author of the mentions
+
+        Returns:
+            List[ReminderRecord]: The reminders
+        """
+        return self._sorted(self._outgoing.get((guild_id, user_id)))
+
+    def forget_guild(self, guild_id: int) -> None:
+        """
+        Drop the reminders of a guild the bot is no longer in.
+
+        Args:
+            guild_id (int): The ID of the guild
+        """
+        for message_id, mentioned_user_id in [
+            key for key, reminder in self._records.items() if reminder.guild_id == guild_id
+        ]:
+            self.remove(message_id, mentioned_user_id)
+
+    def load(self, reminders: Iterable[Dict[str, Any]], guild_of: Callable[[int], Optional[int]]) -> int:
+        """
+        Fill the index from stored reminders, e.g. at startup.
+
+        Args:
+            reminders (Iterable[Dict[str, Any]]): Reminder documents from the backend
+            guild_of (Callable[[int], Optional[int]]): Resolves a channel ID to its guild ID,
+                for reminders saved before guild IDs were stored
+
+        Returns:
+            int: The number of reminders added
+        """
+        added = 0
+        for data in reminders:
+            reminder = ReminderRecord.from_dict(data)
+            if reminder.guild_id is None:
+                reminder.guild_id = guild_of(reminder.channel_id)
+                if reminder.guild_id is None:
+                    continue
+            if reminder.due_at is None:
+                reminder.due_at = due_key(reminder.message_id, config.REMINDER_THRESHOLD)
+            self.add(reminder)
+            added += 1
+        self.is_loaded = True
+        return added
+
+
+pending_index = PendingReminderIndex()
@@ -0,0 +1,244 @@
+import sys
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from config import config
+from records import ReminderRecord
+from snowflake import due_key
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, the sweep then queries the backend
+    np = None
+
+COLUMNS = ("message_id", "channel_id", "mentioned_user_id", "due_at")
+
+
+class ArrayPendingStore:
+    """
+    Column store of pending reminders, backed by NumPy int64 arrays.
+
+    Selecting the due reminders and grouping them by channel is done with
+    vectorized operations over the columns instead of a Python loop over
+    records: a mask for ``due_at <= now``, one sort by (channel, due time) and
+    the boundaries where the channel changes. Removed rows are masked out and
+    compacted away once they make up half of the store.
+
+    Nothing is stored until track() has been called, so the store can be
+    updated unconditionally from the write path. Changes made between track()
+    and the end of load() win over the stored reminders that load() reads.
+    """
+
+    def __init__(self, initial_capacity: int = 1024):
+        self.initial_capacity = initial_capacity
+        self.is_loaded = False
+        self._tracking = False
+        # Removals seen while the stored reminders are being read
+        self._removed: Set[Tuple[int, int]] = set()
+        self._replied: Set[Tuple[int, int]] = set()
+        self._size = 0
+        self._dead = 0
+        self._columns: Dict[str, Any] = {}
+        self._live = None
+        # (message_id, mentioned_user_id) -> row
+        self._rows: Dict[Tuple[int, int], int] = {}
+        # (channel_id, mentioned_user_id) -> message_ids, for replies in the channel
+        self._by_channel_user: Dict[Tuple[int, int], Set[int]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def memory_bytes(self) -> int:
+        """
+        Return the approximate memory held by the store.
+
+        Returns:
+            int: Approximate bytes of the columns and the lookup indexes
+        """
+        size = sum(column.nbytes for column in self._columns.values())
+        if self._live is not None:
+            size += self._live.nbytes
+        size += sys.getsizeof(self._rows) + sys.getsizeof(self._by_channel_user)
+        key = next(iter(self._rows), None)
+        if key is not None:
+            size += len(self._rows) * (sys.getsizeof(key) + sys.getsizeof(self._rows[key]))
+            size += len(self._by_channel_user) * sys.getsizeof(next(iter(self._by_channel_user.values()), set()))
+        return size
+
+    def _allocate(self, capacity: int) -> None:
+        if np is None:
+            raise RuntimeError("The in-memory reminder store needs numpy (pip install numpy)")
+        self._columns = {name: np.zeros(capacity, dtype=np.int64) for name in COLUMNS}
+        self._live = np.zeros(capacity, dtype=bool)
+
+    def _grow(self) -> None:
+        capacity = len(self._live) * 2
+        for name, column in self._columns.items():
+            grown = np.zeros(capacity, dtype=np.int64)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+        live = np.zeros(capacity, dtype=bool)
+        live[:self._size] = self._live[:self._size]
+        self._live = live
+
+    def track(self) -> None:
+        """
+        Start following the write path, before the stored reminders are read.
+        """
+        self._allocate(self.initial_capacity)
+        self._size = 0
+        self._dead = 0
+        self._rows.clear()
+        self._by_channel_user.clear()
+        self._removed.clear()
+        self._replied.clear()
+        self._tracking = True
+        self.is_loaded = False
+
+    def load(self, reminders: Iterable[Dict[str, Any]]) -> int:
+        """
+        Merge stored reminders into the store, after which sweeps can use it.
+
+        Args:
+            reminders (Iterable[Dict[str, Any]]): Reminder documents from the backend
+
+        Returns:
+            int: The number of reminders in the store
+        """
+        if not self._tracking:
+            self.track()
+        for data in reminders:
+            record = ReminderRecord.from_dict(data)
+            if record.key in self._removed or (record.channel_id, record.mentioned_user_id) in self._replied:
+                continue
+            if record.due_at is None:
+                record.due_at = due_key(record.message_id, config.REMINDER_THRESHOLD)
+            self.add(record)
+        self._removed.clear()
+        self._replied.clear()
+        self.is_loaded = True
+        return len(self)
+
+    def add(self, reminder: ReminderRecord) -> None:
+        """
+        Add a pending reminder.
+
+        Args:
+            reminder (ReminderRecord): The reminder, with its due_at set
+        """
+        if not self._tracking or reminder.key in self._rows:
+            return
+        if self._size == len(self._live):
+            self._grow()
+        row = self._size
+        for name, column in self._columns.items():
+            column[row] = getattr(reminder, name)
+        self._live[row] = True
+        self._size += 1
+        self._rows[reminder.key] = row
+        self._by_channel_user[(reminder.channel_id, reminder.mentioned_user_id)].add(reminder.message_id)
+
+    def remove(self, message_id: int, mentioned_user_id: int) -> bool:
+        """
+        Remove a reminder, e.g. after a reaction or once it was sent.
+
+        Args:
+            message_id (int): The ID of the message with the mention
+            mentioned_user_id (int): The ID of the mentioned user
+
+        Returns:
+            bool: True if the reminder was in the store
+        """
+        if self._tracking and not self.is_loaded:
+            self._removed.add((message_id, mentioned_user_id))
+        row = self._rows.pop((message_id, mentioned_user_id), None)
+        if row is None:
+            return False
+        self._live[row] = False
+        self._dead += 1
+
+        key = (int(self._columns["channel_id"][row]), mentioned_user_id)
+        message_ids = self._by_channel_user.get(key)
+        if message_ids is not None:
+            message_ids.discard(message_id)
+            if not message_ids:
+                del self._by_channel_user[key]
+
+        if self._dead > self._size // 2 and self._size >= self.initial_capacity:
+            self._compact()
+        return True
+
+    def remove_replied(self, channel_id: int, user_id: int) -> int:
+        """
+        Remove the reminders of a user who sent a message in the channel.
+
+        Args:
+            channel_id (int): The ID of the channel of the message
+            user_id (int): The ID of the author
+
+        Returns:
+            int: The number of reminders removed
+        """
+        if self._tracking and not self.is_loaded:
+            self._replied.add((channel_id, user_id))
+        message_ids = list(self._by_channel_user.get((channel_id, user_id), ()))
+        for message_id in message_ids:
+            self.remove(message_id, user_id)
+        return len(message_ids)
+
+    def _compact(self) -> None:
+        keep = np.flatnonzero(self._live[:self._size])
+        for name, column in self._columns.items():
+            column[:len(keep)] = column[keep]
+        self._live[:len(keep)] = True
+        self._live[len(keep):] = False
+        self._size = len(keep)
+        self._dead = 0
+        message_ids = self._columns["message_id"][:self._size].tolist()
+        user_ids = self._columns["mentioned_user_id"][:self._size].tolist()
+        self._rows = {key: row for row, key in enumerate(zip(message_ids, user_ids))}
+
+    def due_rows(self, now: int) -> Tuple[Any, Any]:
+        """
+        Select the due rows, sorted by channel and then due time.
+
+        Args:
+            now (int): The current time, in milliseconds since the Unix epoch
+
+        Returns:
+            Tuple[numpy.ndarray, numpy.ndarray]: The due row numbers, and the offsets
+            into them where each channel's segment starts
+        """
+        if not self.is_loaded or self._size == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        size = self._size
+        due = np.flatnonzero(self._live[:size] & (self._columns["due_at"][:size] <= now))
+        channel_ids = self._columns["channel_id"][due]
+        order = due[np.lexsort((self._columns["due_at"][due], channel_ids))]
+        sorted_channels = self._columns["channel_id"][order]
+        starts = np.flatnonzero(np.diff(sorted_channels)) + 1
+        if len(order):
+            starts = np.concatenate(([0], starts))
+        return order, starts
+
+    def due_groups(self, now: int) -> List[List[ReminderRecord]]:
+        """
+        Return the due reminders, one list per channel.
+
+        Args:
+            now (int): The current time, in milliseconds since the Unix epoch
+
+        Returns:
+            List[List[ReminderRecord]]: The due reminders grouped by channel, soonest due first
+        """
+        if not self.is_loaded:
+            return []
+        order, starts = self.due_rows(now)
+        columns = [self._columns[name][order].tolist() for name in COLUMNS]
+        records = [ReminderRecord(*values) for values in zip(*columns)]
+        bounds = starts.tolist() + [len(records)]
+        return [records[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+pending_store = ArrayPendingStore()
@@ -0,0 +1,146 @@
+import sys
+from collections import OrderedDict
+from typing import Dict
+
+import discord
+
+
+class ChannelPermissionCache:
+    """
+    Resolved channel permissions, by channel and member.
+
+    Resolving permissions walks the member's roles and the channel's overwrites,
+    which registration would otherwise do for every mention. Entries stay valid
+    until a role, an overwrite or a member's roles change, which main.py reports
+    through the invalidate_* methods. At most ``max_channels`` channels are kept,
+    least recently used are evicted.
+    """
+
+    def __init__(self, max_channels: int = 10_000):
+        self.max_channels = max_channels
+        # channel_id -> member_id -> permissions
+        self._channels: "OrderedDict[int, Dict[int, discord.Permissions]]" = OrderedDict()
+        # channel_id -> guild_id and parent channel_id, for invalidations
+        self._guild_of: Dict[int, int] = {}
+        self._parent_of: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+    def permissions_for(self, channel: discord.abc.GuildChannel, member: discord.Member) -> discord.Permissions:
+        """
+        Return the permissions of a member in a channel.
+
+        Args:
+            channel (discord.abc.GuildChannel): The channel or thread
+            member (discord.Member): The member
+
+        Returns:
+            discord.Permissions: The resolved permissions
+        """
+        members = self._channels.get(channel.id)
+        if members is None:
+            members = self._channels[channel.id] = {}
+            self._guild_of[channel.id] = channel.guild.id
+            parent_id = getattr(channel, "parent_id", None)
+            if parent_id is not None:
+                self._parent_of[channel.id] = parent_id
+            while len(self._channels) > self.max_channels:
+                self._forget(next(iter(self._channels)))
+        else:
+            self._channels.move_to_end(channel.id)
+
+        permissions = members.get(member.id)
+        if permissions is None:
+            permissions = members[member.id] = channel.permissions_for(member)
+        return permissions
+
+    def can_read(self, channel: discord.abc.GuildChannel, member: discord.Member) -> bool:
+        """
+        Check whether a member can read a channel.
+
+        Args:
+            channel (discord.abc.GuildChannel): The channel or thread
+            member (discord.Member): The member
+
+        Returns:
+            bool: True if the member can read the channel
+        """
+        return bool(self.permissions_for(channel, member).read_messages)
+
+    def can_send(self, channel: discord.abc.GuildChannel, member: discord.Member) -> bool:
+        """
+        Check whether a member, e.g. the bot, can send messages in a channel.
+
+        Args:
+            channel (discord.abc.GuildChannel): The channel or thread
+            member (discord.Member): The member
+
+        Returns:
+            bool: True if the member can send messages there
+        """
+        permissions = self.permissions_for(channel, member)
+        if isinstance(channel, discord.Thread):
+            return bool(permissions.send_messages_in_threads)
+        return bool(permissions.send_messages)
+
+    def _forget(self, channel_id: int) -> None:
+        self._channels.pop(channel_id, None)
+        self._guild_of.pop(channel_id, None)
+        self._parent_of.pop(channel_id, None)
+
+    def invalidate_channel(self, channel_id: int) -> None:
+        """
+        Drop a channel and its threads, e.g. after its overwrites changed.
+
+        Args:
+            channel_id (int): The ID of the channel
+        """
+        threads = [thread_id for thread_id, parent_id in self._parent_of.items() if parent_id == channel_id]
+        for key in [channel_id, *threads]:
+            self._forget(key)
+
+    def invalidate_guild(self, guild_id: int) -> None:
+        """
+        Drop every channel of a guild, e.g. after one of its roles changed.
+
+        Args:
+            guild_id (int): The ID of the guild
+        """
+        for channel_id in [channel_id for channel_id, owner in self._guild_of.items() if owner == guild_id]:
+            self._forget(channel_id)
+
+    def invalidate_member(self, member_id: int) -> None:
+        """
+        Drop a member's permissions in every channel, e.g. after their roles changed.
+
+        Args:
+            member_id (int): The ID of the member
+        """
+        for members in self._channels.values():
+            members.pop(member_id, None)
+
+    def memory_bytes(self) -> int:
+        """
+        Return the approximate memory held by the cache.
+
+        Returns:
+            int: Approximate bytes, from the containers and one sampled channel
+        """
+        size = sum(sys.getsizeof(index) for index in (self._channels, self._guild_of, self._parent_of))
+        members = next(iter(self._channels.values()), None)
+        if members:
+            entry = sys.getsizeof(next(iter(members.values()))) + sys.getsizeof(next(iter(members)))
+            size += len(self._channels) * (sys.getsizeof(members) + len(members) * entry)
+        return size
+
+    def clear(self) -> None:
+        """
+        Forget everything.
+        """
+        self._channels.clear()
+        self._guild_of.clear()
+        self._parent_of.clear()
+
+
+permission_cache = ChannelPermissionCache()
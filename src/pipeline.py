@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Tuple
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# (submitted_at, handler, args)
+Event = Tuple[float, Callable[..., Awaitable[Any]], Tuple[Any, ...]]
+
+
+class EventPipeline:
+    """
+    Bounded queue of gateway event handlers, ordered per key.
+
+    Events with the same key (e.g. a channel ID) are handled one at a time, in
+    the order they were submitted, so a mention is registered before a reply in
+    the same channel is observed. Events with different keys are handled
+    concurrently, at most ``max_concurrency`` at a time.
+
+    At most ``max_pending`` events are queued or in flight. When the queue is
+    full, submit() waits for room, so callers are held back instead of queueing
+    without bound. Sheddable events such as statistics writes are dropped
+    instead under the "drop" shed policy.
+    """
+
+    def __init__(self, max_pending: int = 1000, max_concurrency: int = 32, shed_policy: str = "drop"):
+        self.max_pending = max_pending
+        self.max_concurrency = max_concurrency
+        self.shed_policy = shed_policy
+        self._queues: Dict[Hashable, Deque[Event]] = {}
+        self._slots = asyncio.Semaphore(max_pending)
+        self._workers = asyncio.Semaphore(max_concurrency)
+        self._tasks = set()
+        self._pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._running = False
+
+    def __len__(self) -> int:
+        return self._pending
+
+    @property
+    def is_running(self) -> bool:
+        """bool: Whether events should be submitted instead of handled inline."""
+        return self._running
+
+    def start(self) -> None:
+        """
+        Start accepting events.
+        """
+        self._running = True
+
+    async def stop(self, timeout: float = 10) -> int:
+        """
+        Stop accepting events and wait for the queued ones to be handled.
+
+        Args:
+            timeout (float): Seconds to wait before the remaining events are cancelled
+
+        Returns:
+            int: The number of queued events that were handled
+        """
+        self._running = False
+        queued = self._pending
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Cancelling {self._pending} events still queued at shutdown")
+            queued -= self._pending
+            for task in list(self._tasks):
+                task.cancel()
+        return queued
+
+    async def submit(self, key: Hashable, handler: Callable[..., Awaitable[Any]], *args: Any, sheddable: bool = False) -> bool:
+        """
+        Queue an event handler behind the earlier events with the same key.
+
+        Args:
+            key (Hashable): The ordering key, e.g. the channel ID
+            handler (Callable[..., Awaitable[Any]]): The coroutine function to run
+            *args: Arguments for the handler
+            sheddable (bool): Whether the event may be dropped when the queue is full
+
+        Returns:
+            bool: False if the event was dropped
+        """
+        if self._slots.locked():
+            if sheddable and self.shed_policy == "drop":
+                metrics.increment("pipeline.shed")
+                return False
+            metrics.increment("pipeline.backpressure")
+        await self._slots.acquire()
+
+        self._pending += 1
+        self._idle.clear()
+        metrics.set_gauge("pipeline.depth", self._pending)
+
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+            task = asyncio.create_task(self._drain(key, queue))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        queue.append((time.monotonic(), handler, args))
+        return True
+
+    async def _drain(self, key: Hashable, queue: Deque[Event]) -> None:
+        try:
+            while queue:
+                submitted_at, handler, args = queue[0]
+                async with self._workers:
+                    metrics.set_gauge("pipeline.wait_ms", round((time.monotonic() - submitted_at) * 1000, 1))
+                    try:
+                        await handler(*args)
+                    except Exception as e:
+                        logger.error(f"Error handling event {getattr(handler, '__name__', handler)} for {key}: {e}", exc_info=True)
+                queue.popleft()
+                self._done()
+        finally:
+            # Events left behind by a cancellation still free their slots
+            while queue:
+                queue.popleft()
+                self._done()
+            del self._queues[key]
+
+    def _done(self) -> None:
+        self._pending -= 1
+        self._slots.release()
+        metrics.increment("pipeline.handled")
+        metrics.set_gauge("pipeline.depth", self._pending)
+        if self._pending == 0:
+            self._idle.set()
@@ -0,0 +1,255 @@
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import List, Optional, Tuple
+
+import discord
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Discord rejects messages longer than this
+MESSAGE_LIMIT = 2000
+
+
+class WallSampler:
+    """
+    Samples the stack of one thread at a fixed interval, from another thread.
+
+    Counts whole stacks, so the result shows where the thread spends wall time,
+    including time blocked in I/O that a CPU profile does not see.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        # "outer;...;inner" -> samples
+        self.stacks: Counter = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="wall-sampler", daemon=True)
+
+    def _sample(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def top_functions(self, limit: int = 10) -> List[Tuple[str, int]]:
+        """
+        Return the innermost functions that were sampled most often.
+
+        Args:
+            limit (int): How many functions to return
+
+        Returns:
+            List[Tuple[str, int]]: (function, samples), most sampled first
+        """
+        leaves: Counter = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return leaves.most_common(limit)
+
+    def write(self, path: str) -> None:
+        """
+        Write the samples as collapsed stacks, the input format of flame graph tools.
+
+        Args:
+            path (str): The output file
+        """
+        with open(path, "w", encoding="utf-8") as output:
+            for stack, count in self.stacks.most_common():
+                output.write(f"{stack} {count}\n")
+
+
+class ProfileRun:
+    """
+    One profiling session of the event loop thread: wall-clock samples, a CPU
+    profile and the allocations made while it ran.
+    """
+
+    def __init__(self, directory: str, sample_interval: float):
+        self.directory = directory
+        self.sample_interval = sample_interval
+        self.files: List[str] = []
+        self._cpu = cProfile.Profile(time.thread_time)
+        self._wall = WallSampler(threading.get_ident(), sample_interval)
+        self._started_tracemalloc = False
+        self._before: Optional[tracemalloc.Snapshot] = None
+        self._allocations: List[tracemalloc.StatisticDiff] = []
+
+    def start(self) -> None:
+        """
+        Start profiling. Must be called from the event loop thread.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            self._started_tracemalloc = True
+        self._before = tracemalloc.take_snapshot()
+        self._wall.start()
+        self._cpu.enable()
+
+    def stop(self) -> None:
+        """
+        Stop profiling. Must be called from the event loop thread.
+        """
+        self._cpu.disable()
+        self._wall.stop()
+
+    def finish(self) -> str:
+        """
+        Compare the allocations and write the results to the profile directory.
+
+        Blocks for a while when many allocations are traced, so it is run in a
+        thread after stop().
+
+        Returns:
+            str: The summary, see summary()
+        """
+        after = tracemalloc.take_snapshot()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        self._allocations = after.compare_to(self._before, "lineno")
+
+        os.makedirs(self.directory, exist_ok=True)
+        prefix = os.path.join(self.directory, time.strftime("%Y%m%d-%H%M%S"))
+        self._cpu.dump_stats(f"{prefix}-cpu.pstats")
+        self._wall.write(f"{prefix}-wall.txt")
+        after.dump(f"{prefix}-memory.tracemalloc")
+        self.files = [f"{prefix}-cpu.pstats", f"{prefix}-wall.txt", f"{prefix}-memory.tracemalloc"]
+        return self.summary()
+
+    def top_cpu(self, limit: int = 10) -> List[Tuple[str, float]]:
+        """
+        Return the functions with the most CPU time of their own.
+
+        Args:
+            limit (int): How many functions to return
+
+        Returns:
+            List[Tuple[str, float]]: (function, seconds), most expensive first
+        """
+        stats = pstats.Stats(self._cpu, stream=io.StringIO()).stats
+        ranked = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+        return [
+            (f"{name} ({os.path.basename(filename)}:{line})", total)
+            for (filename, line, name), (_, _, total, _, _) in ranked
+        ]
+
+    def summary(self, limit: int = 5) -> str:
+        """
+        Return the top functions and allocation sites as text.
+
+        Args:
+            limit (int): How many entries to list per section
+
+        Returns:
+            str: The summary
+        """
+        lines = ["CPU (own time):"]
+        lines += [f"  {seconds * 1000:8.1f} ms  {name}" for name, seconds in self.top_cpu(limit)]
+        samples = sum(self._wall.stacks.values()) or 1
+        lines.append("Wall clock (share of samples):")
+        lines += [f"  {count / samples:8.1%}  {name}" for name, count in self._wall.top_functions(limit)]
+        lines.append("Allocations (growth):")
+        for stat in self._allocations[:limit]:
+            frame = stat.traceback[0]
+            lines.append(f"  {stat.size_diff / 1024:8.1f} KiB  {os.path.basename(frame.filename)}:{frame.lineno}")
+        lines.append("Files: " + ", ".join(os.path.basename(path) for path in self.files))
+        return "\n".join(lines)
+
+
+# Only one profile runs at a time
+_profile_lock = asyncio.Lock()
+
+
+async def run_profile(seconds: float) -> str:
+    """
+    Profile the event loop thread for a while and write the results to PROFILE_DIR.
+
+    Args:
+        seconds (float): How long to profile
+
+    Returns:
+        str: The summary of the top functions and allocation sites
+
+    Raises:
+        RuntimeError: If a profile is already running
+    """
+    if _profile_lock.locked():
+        raise RuntimeError("A profile is already running")
+    async with _profile_lock:
+        run = ProfileRun(config.PROFILE_DIR, config.PROFILE_SAMPLE_INTERVAL)
+        run.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            run.stop()
+            summary = await asyncio.to_thread(run.finish)
+        logger.info(f"Profile of {seconds:.0f} seconds written to {config.PROFILE_DIR}:\n{summary}")
+        return summary
+
+
+def start_profile_task(seconds: float) -> None:
+    """
+    Start a profile in the background, e.g. from a signal handler. The summary is logged.
+
+    Args:
+        seconds (float): How long to profile
+    """
+    async def profile_in_background():
+        try:
+            await run_profile(seconds)
+        except Exception as e:
+            logger.error(f"Failed to profile: {e}", exc_info=True)
+
+    asyncio.get_running_loop().create_task(profile_in_background())
+
+
+async def profile(interaction: discord.Interaction, seconds: Optional[int] = None) -> None:
+    """
+    Profile the bot for a while and reply with the summary. Only the bot's owner may use it.
+
+    Args:
+        interaction (discord.Interaction): The /profile interaction
+        seconds (Optional[int]): How long to profile, PROFILE_DEFAULT_SECONDS if not given
+    """
+    if not await interaction.client.is_owner(interaction.user):
+        await interaction.response.send_message("Only the owner of the bot can profile it.", ephemeral=True)
+        return
+
+    seconds = min(max(seconds or config.PROFILE_DEFAULT_SECONDS, 1), config.PROFILE_MAX_SECONDS)
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    try:
+        summary = await run_profile(seconds)
+    except RuntimeError as e:
+        await interaction.followup.send(str(e), ephemeral=True)
+        return
+    except Exception as e:
+        # The interaction was deferred, so it needs a followup either way
+        logger.error(f"Failed to profile: {e}", exc_info=True)
+        await interaction.followup.send(f"Failed to profile: {e}", ephemeral=True)
+        return
+    content = f"```\n{summary}"[:MESSAGE_LIMIT - 4] + "\n```"
+    await interaction.followup.send(content, ephemeral=True)
+
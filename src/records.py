@@ -0,0 +1,76 @@
+from typing import Any, Dict, Optional, Tuple
+
+
+class ReminderRecord:
+    """
+    Compact in-process representation of a pending reminder.
+
+    A ``__slots__`` class has no per-instance ``__dict__``, so a record costs a
+    fixed 80 bytes plus its int values, against several hundred bytes for the
+    dict returned by Firestore. Records are created from and turned back into
+    dicts only at the storage boundary (from_dict / to_dict).
+    """
+
+    __slots__ = ("message_id", "channel_id", "mentioned_user_id", "due_at", "guild_id", "author_id")
+
+    def __init__(
+        self,
+        message_id: int,
+        channel_id: int,
+        mentioned_user_id: int,
+        due_at: Optional[int] = None,
+        guild_id: Optional[int] = None,
+        author_id: Optional[int] = None,
+    ):
+        self.message_id = message_id
+        self.channel_id = channel_id
+        self.mentioned_user_id = mentioned_user_id
+        self.due_at = due_at  # milliseconds since the Unix epoch, None for reminders saved before due keys existed
+        self.guild_id = guild_id
+        self.author_id = author_id
+
+    @property
+    def key(self) -> Tuple[int, int]:
+        """Tuple[int, int]: (message_id, mentioned_user_id), which identifies the reminder."""
+        return (self.message_id, self.mentioned_user_id)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ReminderRecord":
+        """
+        Create a record from a stored reminder document.
+
+        Args:
+            data (Dict[str, Any]): The reminder document
+
+        Returns:
+            ReminderRecord: The record
+        """
+        return cls(
+            data["message_id"],
+            data["channel_id"],
+            data["mentioned_user_id"],
+            data.get("due_at"),
+            data.get("guild_id"),
+            data.get("author_id"),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return the fields of the record that are set, as stored.
+
+        Returns:
+            Dict[str, Any]: The reminder fields
+        """
+        return {name: getattr(self, name) for name in self.__slots__ if getattr(self, name) is not None}
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ReminderRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"ReminderRecord({fields})"
@@ -1,15 +1,119 @@
 import logging
 from datetime import datetime, timedelta
 from collections import defaultdict
-from typing import Any
+from typing import Any, List
 import discord
 from discord.ext import commands
 
 from db import FirestoreReminderCollection
 from config import config
+from metrics import metrics
+from pending import pending_index
+from pending_store import pending_store
+from permission_cache import permission_cache
+from records import ReminderRecord
+from settings import guild_settings, pick
+from snowflake import now_ms
+from unreachable import CHANNEL, MESSAGE, PERMISSION, USER, unreachable
 
 logger = logging.getLogger(__name__)
 
+# Discord rejects messages longer than this
+MESSAGE_LIMIT = 2000
+
+
+def split_message(start: str, lines: List[str], end: str, limit: int = MESSAGE_LIMIT) -> List[str]:
+    """
+    Join lines into as few messages as fit the length limit.
+
+    Args:
+        start (str): Text at the start of the first message
+        lines (List[str]): The lines to join
+        end (str): Text at the end of the last message
+        limit (int): Maximum length of a message
+
+    Returns:
+        List[str]: The messages
+    """
+    messages = []
+    current = start
+    has_lines = False
+    for line in lines:
+        if has_lines and len(current) + len(line) + len(end) > limit:
+            messages.append(current)
+            current = ""
+        current += line
+        has_lines = True
+    messages.append(current + end)
+    return messages
+
+
+async def send_digests(bot: commands.Bot, reminders: List[ReminderRecord], handled: List[ReminderRecord]) -> List[ReminderRecord]:
+    """
+    Send each recipient a single message listing all of their due reminders.
+
+    In "dm" mode the digest is a DM, one per user (or per user and guild if
+    REMINDER_DIGEST_PER_GUILD). In "channel" mode it is posted to the digest
+    channel of the guild, one per user and guild. Reminders are only handled
+    once their digest is sent; if it cannot be, they are sent per channel.
+
+    Args:
+        bot (commands.Bot): The Discord bot instance
+        reminders (List[ReminderRecord]): Verified due reminders
+        handled (List[ReminderRecord]): Sent reminders are added to it, to be deleted from the backend
+
+    Returns:
+        List[ReminderRecord]: Reminders to be sent per channel: those of guilds without a digest channel, and
+            those whose digest could not be delivered
+    """
+    by_channel = config.REMINDER_DIGEST_MODE == "channel"
+    digests = defaultdict(list)
+    remaining = []
+
+    for reminder in reminders:
+        guild_id = bot.get_channel(reminder.channel_id).guild.id
+        destination_id = None
+        if by_channel:
+            destination_id = guild_settings.get(guild_id).digest_channel_id
+            if destination_id is None or bot.get_channel(destination_id) is None:
+                remaining.append(reminder)
+                continue
+        group_guild_id = guild_id if by_channel or config.REMINDER_DIGEST_PER_GUILD else None
+        digests[(reminder.mentioned_user_id, group_guild_id, destination_id)].append((guild_id, reminder))
+
+    for (user_id, _, destination_id), items in digests.items():
+        destination = bot.get_channel(destination_id) if by_channel else bot.get_user(user_id)
+        reminders_of_user = [item for _, item in items]
+        if destination is None:
+            logger.warning("Cannot send a digest to user %s, sending their %d reminders per channel", user_id, len(items))
+            remaining.extend(reminders_of_user)
+            continue
+        lines = []
+        for guild_id, item in items:
+            message_link = f"https://discord.com/channels/{guild_id}/{item.channel_id}/{item.message_id}"
+            lines.append(config.REMINDER_DIGEST_MAIN.format(message_link=message_link))
+
+        start = config.REMINDER_DIGEST_START.format(user_mention=f"<@{user_id}>")
+        try:
+            for content in split_message(start, lines, config.REMINDER_MESSAGE_END):
+                await destination.send(content)
+        except Exception as e:
+            # e.g. DMs closed: the reminders are still due, so they are sent in their channels instead
+            logger.error(f"Failed to send digest of {len(items)} reminders for user {user_id}, sending them per channel: {e}")
+            remaining.extend(reminders_of_user)
+            continue
+        metrics.increment("reminders.digests_sent")
+        logger.info("Digest of %d reminders sent for user %s", len(items), user_id)
+
+        for item in reminders_of_user:
+            handled.append(item)
+            pending_index.remove(item.message_id, item.mentioned_user_id)
+            pending_store.remove(item.message_id, item.mentioned_user_id)
+            logger.info("Deleted reminder: message_id=%s, mentioned_user_id=%s", item.message_id, item.mentioned_user_id)
+
+    return remaining
+
+
 async def send_reminders(bot: commands.Bot) -> None:
     """
     Send reminder messages to users who haven't responded (by sending a message or reacting) in the channel/thread within the reminder interval.
@@ -24,100 +128,129 @@ async def send_reminders(bot: commands.Bot) -> None:
         # All the ingredients for sending reminders
         threshold = config.REMINDER_THRESHOLD
         reminder_db = FirestoreReminderCollection()
-        reminders = reminder_db.get_expired_messages(threshold)
+        if pending_store.is_loaded:
+            # Selected from the in-memory store, already ordered by channel
+            # (reminders deleted before a restart were dropped when it was loaded, see read_pending_reminders)
+            reminders = [reminder for group in pending_store.due_groups(now_ms()) for reminder in group]
+        else:
+            # Documents become compact records at the storage boundary
+            reminders = [ReminderRecord.from_dict(data) for data in reminder_db.get_expired_messages(threshold)]
 
         # Return early if there are no reminders to send
         if not reminders:
             return
 
-        # Verify the channels, users, and messages in the reminders exist
-        # Use set() just in case
-        verified_reminders = []
-        unique_reminders = set()
+        # Handled reminders are deleted from the backend together, even if the sweep fails part way
+        handled: List[ReminderRecord] = []
+        try:
+            # Verify the channels, users, and messages in the reminders exist
+            # Use set() just in case
+            verified_reminders = []
+            unique_reminders = set()
 
-        invalid_channels = set()
-        invalid_mentioned_users = set()
-        invalid_messages = set()
-        invalid_permissions = set()
+            for reminder in reminders:
+                # Known to be unreachable from this or an earlier sweep, no REST call needed
+                instant_invalid = (
+                    unreachable.is_unreachable(CHANNEL, reminder.channel_id)
+                    or unreachable.is_unreachable(USER, reminder.mentioned_user_id)
+                    or unreachable.is_unreachable(MESSAGE, reminder.message_id)
+                    or unreachable.is_unreachable(PERMISSION, (reminder.channel_id, reminder.mentioned_user_id))
+                )
+                if instant_invalid:
+                    metrics.increment("unreachable.hits")
+                else:
+                    # Obtain the channel, user, and message
+                    channel = bot.get_channel(reminder.channel_id)
+                    user = bot.get_user(reminder.mentioned_user_id)
+                    message = None
+                    if channel and user:
+                        try:
+                            message = await channel.fetch_message(reminder.message_id)
+                        except discord.NotFound:
+                            pass
+                        except Exception as e:
+                            # Not known to be gone, e.g. rate limited or a Discord outage: kept for the next sweep
+                            logger.error(f"Error fetching message {reminder.message_id}, skipping the reminder: {e}")
+                            continue
 
-        for i in range(len(reminders)):
-            instant_invalid = False
-            if reminders[i]['channel_id'] in invalid_channels:
-                continue
-            if reminders[i]['mentioned_user_id'] in invalid_mentioned_users:
-                continue
-            if reminders[i]['message_id'] in invalid_messages:
-                continue
-            if (reminders[i]['channel_id'], reminders[i]['mentioned_user_id']) in invalid_permissions:
-                continue
+                    # Remember each of the components that is missing
+                    if not channel:
+                        unreachable.mark(CHANNEL, reminder.channel_id)
+                        instant_invalid = True
+                    if not user:
+                        unreachable.mark(USER, reminder.mentioned_user_id)
+                        instant_invalid = True
+                    if channel and user and not message:
+                        unreachable.mark(MESSAGE, reminder.message_id)
+                        instant_invalid = True
 
-            # Obtain the channel, user, and message
-            channel = bot.get_channel(reminders[i]['channel_id'])
-            user = bot.get_user(reminders[i]['mentioned_user_id'])
-            try:
-                message = await channel.fetch_message(reminders[i]['message_id'])
-            except discord.NotFound:
-                message = None
-            except Exception as e:
-                logger.error(f"Error fetching message {reminders[i]['message_id']}: {e}")
-                message = None
-
-            # Append to invalid lists if each of the component is missing
-            if not channel:
-                invalid_channels.add(reminders[i]['channel_id'])
-                instant_invalid = True
-            if not user:
-                invalid_mentioned_users.add(reminders[i]['mentioned_user_id'])
-                instant_invalid = True
-            if not message:
-                invalid_messages.add(reminders[i]['message_id'])
-                instant_invalid = True
-
-            if not instant_invalid:
-                guild = channel.guild
-                member = guild.get_member(reminders[i]['mentioned_user_id'])
-                if not channel.permissions_for(member).read_messages:
-                    invalid_permissions.add((reminders[i]['channel_id'], reminders[i]['mentioned_user_id']))
-                    instant_invalid = True
-
-            # If all components are valid, append to verified reminders
-            if not instant_invalid:
-                tuple_reminder = (reminders[i]['message_id'], reminders[i]['mentioned_user_id'])
-                if tuple_reminder not in unique_reminders:
-                    unique_reminders.add(tuple_reminder)
-                    verified_reminders.append(reminders[i])
-            else:
-                reminder_db.delete_message_by_message_and_user_id(reminders[i]['message_id'], reminders[i]['mentioned_user_id'])
-                logger.info(f"Invalid reminder is ignored and deleted from DB: user {reminders[i]['mentioned_user_id']} / {reminders[i]['channel_id']} / {reminders[i]['message_id']}")
-
-        # Group verified reminders by channel_id
-        grouped_reminders = defaultdict(list)
-        for verified_reminder in verified_reminders:
-            grouped_reminders[verified_reminder['channel_id']].append(verified_reminder)
-        grouped_verified_reminders = list(grouped_reminders.values())
-
-        # Send reminders
-        for group in grouped_verified_reminders:
-            message = config.REMINDER_MESSAGE_START
-            channel = bot.get_channel(group[0]['channel_id'])
-            guild_id = channel.guild.id
-
-            for item in group:
-                user_mention = f"<@{item['mentioned_user_id']}>"
-                message_link = f"https://discord.com/channels/{guild_id}/{channel.id}/{item['message_id']}"
-                message += config.REMINDER_MESSAGE_MAIN.format(
-                    user_mention=user_mention,
-                    message_link=message_link
-                )
-                reminder_db.delete_message_by_message_and_user_id(item['message_id'], item['mentioned_user_id'])
-                logger.info(f"Deleted reminder: message_id={item['message_id']}, mentioned_user_id={item['mentioned_user_id']}")
+                if not instant_invalid:
+                    guild = channel.guild
+                    member = guild.get_member(reminder.mentioned_user_id)
+                    if member is None:
+                        # Members are often not cached in low memory mode, only a member who left the guild is missing
+                        try:
+                            member = await guild.fetch_member(reminder.mentioned_user_id)
+                        except discord.NotFound:
+                            pass
+                        except Exception as e:
+                            logger.error(f"Error fetching member {reminder.mentioned_user_id}, skipping the reminder: {e}")
+                            continue
+                    if member is None or not permission_cache.can_read(channel, member):
+                        unreachable.mark(PERMISSION, (reminder.channel_id, reminder.mentioned_user_id))
+                        instant_invalid = True
+
+                # If all components are valid, append to verified reminders
+                if not instant_invalid:
+                    tuple_reminder = reminder.key
+                    if tuple_reminder not in unique_reminders:
+                        unique_reminders.add(tuple_reminder)
+                        verified_reminders.append(reminder)
+                else:
+                    handled.append(reminder)
+                    pending_index.remove(reminder.message_id, reminder.mentioned_user_id)
+                    pending_store.remove(reminder.message_id, reminder.mentioned_user_id)
+                    logger.info("Invalid reminder is ignored and deleted from DB: user %s / %s / %s", reminder.mentioned_user_id, reminder.channel_id, reminder.message_id)
+
+            # In digest mode, each recipient gets one message for all of their reminders
+            if config.REMINDER_DIGEST_MODE in ("dm", "channel"):
+                verified_reminders = await send_digests(bot, verified_reminders, handled)
+
+            # Group verified reminders by channel_id
+            grouped_reminders = defaultdict(list)
+            for verified_reminder in verified_reminders:
+                grouped_reminders[verified_reminder.channel_id].append(verified_reminder)
+            grouped_verified_reminders = list(grouped_reminders.values())
+
+            # Send reminders
+            for group in grouped_verified_reminders:
+                channel = bot.get_channel(group[0].channel_id)
+                guild_id = channel.guild.id
+                settings = guild_settings.get(guild_id)
+                message = pick(settings.reminder_message_start, config.REMINDER_MESSAGE_START)
+                message_main = pick(settings.reminder_message_main, config.REMINDER_MESSAGE_MAIN)
+
+                for item in group:
+                    user_mention = f"<@{item.mentioned_user_id}>"
+                    message_link = f"https://discord.com/channels/{guild_id}/{channel.id}/{item.message_id}"
+                    message += message_main.format(
+                        user_mention=user_mention,
+                        message_link=message_link
+                    )
+                    handled.append(item)
+                    pending_index.remove(item.message_id, item.mentioned_user_id)
+                    pending_store.remove(item.message_id, item.mentioned_user_id)
+                    logger.info("Deleted reminder: message_id=%s, mentioned_user_id=%s", item.message_id, item.mentioned_user_id)
             
-            message += config.REMINDER_MESSAGE_END
-            try:
-                await channel.send(message)
-                logger.info(f"{len(group)} reminders sent to {channel.name} ({channel.id})")
-            except Exception as e:
-                logger.error(f"Failed to send reminders to {channel.name} ({channel.id}): {e}")
+                message += pick(settings.reminder_message_end, config.REMINDER_MESSAGE_END)
+                try:
+                    await channel.send(message)
+                    logger.info("%d reminders sent to %s (%s)", len(group), channel.name, channel.id)
+                except Exception as e:
+                    logger.error(f"Failed to send reminders to {channel.name} ({channel.id}): {e}")
+        finally:
+            if handled:
+                reminder_db.delete_reminders(handled)
 
     except Exception as e:
         logger.error(f"Error in send_reminders(): {e}")
\ No newline at end of file
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from config import config
+from db import FirestoreGuildSettingsCollection
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class GuildSettings:
+    """
+    Per-guild overrides of the global config. None means the value from config is used.
+    """
+
+    reminder_threshold: Optional[int] = None
+    max_role_members: Optional[int] = None
+    reminder_message_start: Optional[str] = None
+    reminder_message_main: Optional[str] = None
+    reminder_message_end: Optional[str] = None
+    role_size_error: Optional[str] = None
+    digest_channel_id: Optional[int] = None  # Where digests are posted when REMINDER_DIGEST_MODE is "channel"
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "GuildSettings":
+        return cls(**{field.name: data.get(field.name) for field in fields(cls)})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: value for name, value in asdict(self).items() if value is not None}
+
+
+def pick(override: Any, default: Any) -> Any:
+    """
+    Return a guild override, or the global default if the guild has none.
+    """
+    return default if override is None else override
+
+
+DEFAULT_SETTINGS = GuildSettings()
+
+
+class GuildSettingsCache:
+    """
+    In-process cache of per-guild settings.
+
+    get() never reads the backend, so it is safe on the on_message hot path.
+    Settings of all guilds are loaded once (load), and a missing or expired
+    entry is refreshed in the background while the last known value (or the
+    defaults) is served.
+    """
+
+    def __init__(self, backend: Any, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.is_loaded = False
+        # guild_id -> (settings, expires_at)
+        self._entries: Dict[int, Tuple[GuildSettings, float]] = {}
+        self._refreshing: Set[int] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def get(self, guild_id: int) -> GuildSettings:
+        """
+        Return the settings of a guild from the cache.
+
+        Args:
+            guild_id (int): The ID of the guild
+
+        Returns:
+            GuildSettings: The overrides of the guild, empty if none are known yet
+        """
+        entry = self._entries.get(guild_id)
+        if entry is None or entry[1] <= time.monotonic():
+            self._schedule_refresh(guild_id)
+        if entry is None:
+            return DEFAULT_SETTINGS
+        return entry[0]
+
+    def _schedule_refresh(self, guild_id: int) -> None:
+        # Nothing is fetched before load(), e.g. in tests or before the bot is ready
+        if not self.is_loaded or guild_id in self._refreshing:
+            return
+        self._refreshing.add(guild_id)
+        task = asyncio.get_running_loop().create_task(self.refresh([guild_id]))
+        self._tasks.add(task)
+
+        def done(task):
+            self._tasks.discard(task)
+            self._refreshing.discard(guild_id)
+
+        task.add_done_callback(done)
+
+    async def refresh(self, guild_ids: List[int]) -> None:
+        """
+        Read the settings of guilds from the backend into the cache.
+
+        Args:
+            guild_ids (List[int]): The IDs of the guilds
+        """
+        try:
+            data = await asyncio.to_thread(self.backend.get_settings, guild_ids)
+        except Exception as e:
+            logger.error(f"Failed to load settings of {len(guild_ids)} guild(s): {e}")
+            return
+
+        expires_at = time.monotonic() + self.ttl
+        for guild_id in guild_ids:
+            self._entries[guild_id] = (GuildSettings.from_dict(data.get(guild_id, {})), expires_at)
+
+    async def load(self, guild_ids: Iterable[int], batch_size: int = 100) -> None:
+        """
+        Load the settings of every guild, a batch of guilds per backend read.
+
+        Args:
+            guild_ids (Iterable[int]): The IDs of all guilds the bot is in
+            batch_size (int): Guilds per backend read
+        """
+        guild_ids = list(guild_ids)
+        for start in range(0, len(guild_ids), batch_size):
+            await self.refresh(guild_ids[start:start + batch_size])
+        self.is_loaded = True
+        logger.info(f"Loaded settings of {len(guild_ids)} guild(s)")
+
+    def invalidate(self, guild_id: int) -> None:
+        """
+        Drop the cached settings of a guild, e.g. after they were changed elsewhere.
+
+        Args:
+            guild_id (int): The ID of the guild
+        """
+        self._entries.pop(guild_id, None)
+
+    async def update(self, guild_id: int, settings: GuildSettings) -> None:
+        """
+        Store new settings for a guild and cache them.
+
+        Args:
+            guild_id (int): The ID of the guild
+            settings (GuildSettings): The new overrides of the guild
+        """
+        await asyncio.to_thread(self.backend.set_settings, guild_id, settings.to_dict())
+        self._entries[guild_id] = (settings, time.monotonic() + self.ttl)
+
+
+guild_settings = GuildSettingsCache(FirestoreGuildSettingsCollection(), config.GUILD_SETTINGS_CACHE_TTL)
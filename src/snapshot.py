@@ -0,0 +1,91 @@
+import mmap
+import os
+import struct
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from records import ReminderRecord
+
+# File layout: a header, then fixed-width little-endian records. Record i starts
+# at HEADER.size + i * RECORD.size, so the file can be read in place through mmap
+MAGIC = b"SWSNAP01"
+HEADER = struct.Struct("<8sQq")  # magic, record count, high-water mark (ms)
+RECORD = struct.Struct("<qqqqqq")  # message, channel, mentioned user, due key, guild, author (0 if unknown)
+
+
+def write_snapshot(path: str, reminders: Iterable[ReminderRecord], high_water_mark: int) -> int:
+    """
+    Write pending reminders to a snapshot file.
+
+    The file is written next to the old one and then renamed over it, so a
+    crash never leaves a half-written snapshot behind.
+
+    Args:
+        path (str): The snapshot file
+        reminders (Iterable[ReminderRecord]): The pending reminders
+        high_water_mark (int): Changes up to this time (ms since the Unix epoch) are in the snapshot
+
+    Returns:
+        int: The number of reminders written
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    body = bytearray()
+    count = 0
+    for reminder in reminders:
+        body += RECORD.pack(
+            reminder.message_id,
+            reminder.channel_id,
+            reminder.mentioned_user_id,
+            reminder.due_at or 0,
+            reminder.guild_id or 0,
+            reminder.author_id or 0,
+        )
+        count += 1
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as snapshot:
+        snapshot.write(HEADER.pack(MAGIC, count, high_water_mark))
+        snapshot.write(body)
+        snapshot.flush()
+        os.fsync(snapshot.fileno())
+    os.replace(temp_path, path)
+    return count
+
+
+def read_snapshot(path: str) -> Optional[Tuple[int, List[Dict[str, Any]]]]:
+    """
+    Read a snapshot file through mmap.
+
+    Args:
+        path (str): The snapshot file
+
+    Returns:
+        Optional[Tuple[int, List[Dict[str, Any]]]]: The high-water mark and the
+        reminders as stored dicts, or None if there is no usable snapshot
+    """
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return None
+    if size < HEADER.size:
+        return None
+
+    with open(path, "rb") as snapshot, mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        magic, count, high_water_mark = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC or size != HEADER.size + count * RECORD.size:
+            return None
+
+        reminders = []
+        with memoryview(mapped)[HEADER.size:] as body:
+            for message_id, channel_id, mentioned_user_id, due_at, guild_id, author_id in RECORD.iter_unpack(body):
+                data = {
+                    "message_id": message_id,
+                    "channel_id": channel_id,
+                    "mentioned_user_id": mentioned_user_id,
+                    "due_at": due_at,
+                }
+                if guild_id:
+                    data["guild_id"] = guild_id
+                if author_id:
+                    data["author_id"] = author_id
+                reminders.append(data)
+    return high_water_mark, reminders
@@ -0,0 +1,44 @@
+import time
+
+# Discord snowflakes count milliseconds since the first second of 2015
+DISCORD_EPOCH_MS = 1420070400000
+
+
+def snowflake_time_ms(snowflake: int) -> int:
+    """
+    Return the creation time encoded in a Discord snowflake.
+
+    Args:
+        snowflake (int): A Discord ID, e.g. a message ID
+
+    Returns:
+        int: Milliseconds since the Unix epoch
+    """
+    return (snowflake >> 22) + DISCORD_EPOCH_MS
+
+
+def due_key(message_id: int, threshold: int) -> int:
+    """
+    Return when the reminder for a message is due.
+
+    The due key is a plain integer, so the scheduler, in-process indexes and
+    backend range queries can all order reminders by it.
+
+    Args:
+        message_id (int): The ID of the message with the mention
+        threshold (int): Seconds to wait for a response
+
+    Returns:
+        int: Milliseconds since the Unix epoch
+    """
+    return snowflake_time_ms(message_id) + threshold * 1000
+
+
+def now_ms() -> int:
+    """
+    Return the current time in the unit of due keys.
+
+    Returns:
+        int: Milliseconds since the Unix epoch
+    """
+    return time.time_ns() // 1_000_000
@@ -0,0 +1,110 @@
+from typing import List, Optional
+
+import discord
+
+from config import config
+from pending import pending_index
+from records import ReminderRecord
+
+
+def _format_line(template: str, user_id: Optional[int], reminder: ReminderRecord) -> str:
+    user_mention = f"<@{user_id}>" if user_id is not None else "Someone"
+    message_link = f"https://discord.com/channels/{reminder.guild_id}/{reminder.channel_id}/{reminder.message_id}"
+    return template.format(
+        user_mention=user_mention,
+        message_link=message_link,
+        due=f"<t:{reminder.due_at // 1000}:R>",
+    )
+
+
+def still_waiting_lines(guild_id: int, user_id: int) -> List[str]:
+    """
+    Return one line per pending reminder of a user in a guild, incoming first.
+
+    Args:
+        guild_id (int): The ID of the guild
+        user_id (int): The ID of the user
+
+    Returns:
+        List[str]: The formatted reminders
+    """
+    lines = [
+        _format_line(config.STILL_WAITING_INCOMING, reminder.author_id, reminder)
+        for reminder in pending_index.incoming(guild_id, user_id)
+    ]
+    lines.extend(
+        _format_line(config.STILL_WAITING_OUTGOING, reminder.mentioned_user_id, reminder)
+        for reminder in pending_index.outgoing(guild_id, user_id)
+    )
+    return lines
+
+
+class StillWaitingView(discord.ui.View):
+    """
+    Pages through the lines of /still-waiting with previous and next buttons.
+    """
+
+    def __init__(self, lines: List[str], page_size: int, timeout: float = 300):
+        super().__init__(timeout=timeout)
+        self.lines = lines
+        self.page_size = page_size
+        self.page = 0
+        self.update_buttons()
+
+    @property
+    def page_count(self) -> int:
+        return max(1, -(-len(self.lines) // self.page_size))
+
+    def render(self) -> str:
+        """
+        Return the message content of the current page.
+
+        Returns:
+            str: The page
+        """
+        if not self.lines:
+            return config.STILL_WAITING_EMPTY
+        start = self.page * self.page_size
+        content = config.STILL_WAITING_START + "".join(self.lines[start:start + self.page_size])
+        if self.page_count > 1:
+            content += f"Page {self.page + 1}/{self.page_count}"
+        return content
+
+    def update_buttons(self) -> None:
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.page_count - 1
+
+    async def show(self, interaction: discord.Interaction, page: int) -> None:
+        self.page = min(max(page, 0), self.page_count - 1)
+        self.update_buttons()
+        await interaction.response.edit_message(content=self.render(), view=self)
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        await self.show(interaction, self.page - 1)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        await self.show(interaction, self.page + 1)
+
+
+async def still_waiting(interaction: discord.Interaction) -> None:
+    """
+    Reply with the caller's pending reminders in the guild, only visible to them.
+
+    Args:
+        interaction (discord.Interaction): The /still-waiting interaction
+    """
+    if interaction.guild_id is None:
+        await interaction.response.send_message("This command only works in a server.", ephemeral=True)
+        return
+
+    lines = still_waiting_lines(interaction.guild_id, interaction.user.id)
+    view = StillWaitingView(lines, config.STILL_WAITING_PAGE_SIZE)
+    kwargs = {"view": view} if view.page_count > 1 else {}
+    await interaction.response.send_message(
+        view.render(),
+        ephemeral=True,
+        allowed_mentions=discord.AllowedMentions.none(),
+        **kwargs,
+    )
@@ -0,0 +1,123 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable
+
+from config import config
+
+# Kinds of things a reminder can fail to reach
+CHANNEL = "channel"  # key: channel_id
+USER = "user"  # key: user_id
+MESSAGE = "message"  # key: message_id
+PERMISSION = "permission"  # key: (channel_id, user_id), the user cannot read the channel
+
+
+class UnreachableCache:
+    """
+    Channels, users, messages and channel permissions that failed a check.
+
+    Consulted before any REST call for a reminder, across sweeps, so that a
+    deleted channel or a user who left is not looked up again for every one of
+    their reminders. Entries expire after ``ttl`` seconds, and the gateway
+    events that can make something reachable again invalidate them earlier
+    (see main.py). Each kind keeps at most ``max_entries`` entries, dropping the
+    oldest first.
+    """
+
+    def __init__(self, ttl: int, max_entries: int = 100_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[str, "OrderedDict[Hashable, float]"] = {
+            kind: OrderedDict() for kind in (CHANNEL, USER, MESSAGE, PERMISSION)
+        }
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def mark(self, kind: str, key: Hashable) -> None:
+        """
+        Remember that something is unreachable.
+
+        Args:
+            kind (str): CHANNEL, USER, MESSAGE or PERMISSION
+            key (Hashable): Its ID, or (channel_id, user_id) for PERMISSION
+        """
+        entries = self._entries[kind]
+        entries[key] = time.monotonic() + self.ttl
+        entries.move_to_end(key)
+        # Entries share one TTL, so the oldest ones expire first
+        now = time.monotonic()
+        while entries and (len(entries) > self.max_entries or next(iter(entries.values())) <= now):
+            entries.popitem(last=False)
+
+    def is_unreachable(self, kind: str, key: Hashable) -> bool:
+        """
+        Check whether something was found unreachable within the TTL.
+
+        Args:
+            kind (str): CHANNEL, USER, MESSAGE or PERMISSION
+            key (Hashable): Its ID, or (channel_id, user_id) for PERMISSION
+
+        Returns:
+            bool: True if it is known to be unreachable
+        """
+        entries = self._entries[kind]
+        expires_at = entries.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= time.monotonic():
+            del entries[key]
+            return False
+        return True
+
+    def invalidate(self, kind: str, key: Hashable) -> None:
+        """
+        Forget that something was unreachable.
+
+        Args:
+            kind (str): CHANNEL, USER, MESSAGE or PERMISSION
+            key (Hashable): Its ID, or (channel_id, user_id) for PERMISSION
+        """
+        self._entries[kind].pop(key, None)
+
+    def invalidate_channel(self, channel_id: int) -> None:
+        """
+        Forget a channel and the permissions in it, e.g. after its permissions changed.
+
+        Args:
+            channel_id (int): The ID of the channel
+        """
+        self.invalidate(CHANNEL, channel_id)
+        permissions = self._entries[PERMISSION]
+        for key in [key for key in permissions if key[0] == channel_id]:
+            del permissions[key]
+
+    def invalidate_user(self, user_id: int) -> None:
+        """
+        Forget a user and their permissions, e.g. after they joined a guild or got a role.
+
+        Args:
+            user_id (int): The ID of the user
+        """
+        self.invalidate(USER, user_id)
+        permissions = self._entries[PERMISSION]
+        for key in [key for key in permissions if key[1] == user_id]:
+            del permissions[key]
+
+    def invalidate_permissions(self) -> None:
+        """
+        Forget every permission entry, e.g. after a role changed.
+
+        Entries are not keyed by guild, and role changes are rare enough that
+        dropping them all costs a few extra checks at most.
+        """
+        self._entries[PERMISSION].clear()
+
+    def clear(self) -> None:
+        """
+        Forget everything.
+        """
+        for entries in self._entries.values():
+            entries.clear()
+
+
+unreachable = UnreachableCache(config.UNREACHABLE_CACHE_TTL)
@@ -13,6 +13,23 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from config import Config
 
+@pytest.fixture(autouse=True)
+def clear_reachability_caches():
+    """Start every test without cached permissions or anything known to be unreachable."""
+    from permission_cache import permission_cache
+    from unreachable import unreachable
+    permission_cache.clear()
+    unreachable.clear()
+    yield
+    permission_cache.clear()
+    unreachable.clear()
+
+@pytest.fixture
+def fake_firestore():
+    """In-process Firestore stand-in without latency or errors, see fake_firestore.py."""
+    from fake_firestore import FakeFirestore
+    return FakeFirestore(seed=0)
+
 @pytest.fixture
 def mock_config():
     """Mock configuration for testing."""
@@ -0,0 +1,81 @@
+"""
+Tests for the activity module (activity.py).
+"""
+
+import pytest
+from unittest.mock import Mock, patch
+import discord
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+class TestRecentActivity:
+    """Test cases for RecentActivity."""
+
+    @patch('activity.time')
+    def test_active_user_ids_within_window(self, mock_time):
+        """Test only members active within the window are returned."""
+        from activity import RecentActivity
+
+        activity = RecentActivity(window=60)
+
+        mock_time.monotonic.return_value = 1000
+        activity.record(1, 10)
+        mock_time.monotonic.return_value = 1050
+        activity.record(1, 11)
+
+        mock_time.monotonic.return_value = 1070
+        assert activity.active_user_ids(1) == [11]
+        assert activity.active_user_ids(2) == []
+
+    @patch('activity.time')
+    def test_record_moves_member_to_most_recent(self, mock_time):
+        """Test a member active again is kept when older entries expire."""
+        from activity import RecentActivity
+
+        activity = RecentActivity(window=60)
+
+        mock_time.monotonic.return_value = 1000
+        activity.record(1, 10)
+        activity.record(1, 11)
+        mock_time.monotonic.return_value = 1050
+        activity.record(1, 10)
+
+        mock_time.monotonic.return_value = 1070
+        assert activity.active_user_ids(1) == [10]
+
+    def test_max_per_guild(self):
+        """Test the least recently active member is dropped past the limit."""
+        from activity import RecentActivity
+
+        activity = RecentActivity(window=60, max_per_guild=2)
+        activity.record(1, 10)
+        activity.record(1, 11)
+        activity.record(1, 12)
+
+        assert activity.active_user_ids(1) == [11, 12]
+
+    def test_active_members_checks_read_permission(self):
+        """Test active members who cannot read the channel are excluded."""
+        from activity import RecentActivity
+
+        activity = RecentActivity(window=60)
+        activity.record(555555555, 10)
+        activity.record(555555555, 11)
+
+        members = {}
+        for member_id in (10, 11):
+            member = Mock(spec=discord.Member)
+            member.id = member_id
+            members[member_id] = member
+
+        channel = Mock(spec=discord.TextChannel)
+        channel.guild = Mock(spec=discord.Guild)
+        channel.guild.id = 555555555
+        channel.guild.get_member = Mock(side_effect=members.get)
+        channel.permissions_for = Mock(
+            side_effect=lambda member: Mock(read_messages=member.id == 10)
+        )
+
+        assert activity.active_members(channel) == [members[10]]
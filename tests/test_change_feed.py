@@ -0,0 +1,119 @@
+"""
+Tests for the backend change feed (change_feed.py).
+"""
+
+import asyncio
+import pytest
+import sys
+import os
+from unittest.mock import Mock, patch
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+def stored(message_id, channel_id, user_id, guild_id=1, due_at=100):
+    return {
+        "message_id": message_id,
+        "channel_id": channel_id,
+        "mentioned_user_id": user_id,
+        "guild_id": guild_id,
+        "due_at": due_at,
+    }
+
+
+def make_feed():
+    from change_feed import ReminderChangeFeed
+    from pending import PendingReminderIndex
+
+    backend = Mock()
+    index = PendingReminderIndex()
+    store = Mock()
+    return ReminderChangeFeed(backend, index, store), backend, index, store
+
+
+class TestParseDocId:
+    """Test cases for parse_doc_id."""
+
+    def test_flat_and_bucketed_ids(self):
+        """Test IDs and full document paths are parsed."""
+        from change_feed import parse_doc_id
+
+        assert parse_doc_id("12_34") == (12, 34)
+        assert parse_doc_id("discord_reminder_buckets/5/reminders/12_34") == (12, 34)
+        assert parse_doc_id("not-a-reminder") is None
+
+
+class TestReminderChangeFeed:
+    """Test cases for ReminderChangeFeed."""
+
+    @pytest.mark.asyncio
+    async def test_first_delivery_loads_the_index(self):
+        """Test the first delivery replaces the startup read."""
+        feed, backend, index, store = make_feed()
+
+        initial = feed.start(lambda channel_id: None, load_store=True)
+        callback = backend.watch.call_args[0][0]
+        callback([("ADDED", "1_2", stored(1, 10, 2)), ("ADDED", "3_4", stored(3, 10, 4))], 0)
+
+        assert await asyncio.wait_for(initial, 1) == 2
+        assert feed.is_running
+        assert [r.message_id for r in index.incoming(1, 2)] == [1]
+        store.load.assert_called_once_with([stored(1, 10, 2), stored(3, 10, 4)])
+
+    @pytest.mark.asyncio
+    async def test_later_deliveries_are_applied_incrementally(self):
+        """Test reminders added and deleted elsewhere reach the index and store."""
+        feed, backend, index, store = make_feed()
+        feed.start(lambda channel_id: 7)
+        feed.apply([("ADDED", "1_2", stored(1, 10, 2))], 0)
+        store.reset_mock()
+
+        with patch('change_feed.now_ms', return_value=1500):
+            feed.apply([
+                ("REMOVED", "1_2", {}),
+                ("ADDED", "5_2", stored(5, 10, 2, guild_id=None)),
+            ], 1000)
+
+        assert [r.message_id for r in index.incoming(7, 2)] == [5]
+        assert index.incoming(1, 2) == []
+        store.remove.assert_called_once_with(1, 2)
+        assert store.add.call_args[0][0].message_id == 5
+        store.load.assert_not_called()
+
+        from metrics import metrics
+        assert metrics.gauges["change_feed.lag_ms"] == 500
+        assert metrics.counters["change_feed.removed"] >= 1
+
+    @pytest.mark.asyncio
+    async def test_removed_legacy_reminder_uses_its_data(self):
+        """Test a deleted reminder with an auto ID is found by the IDs in its data."""
+        feed, backend, index, store = make_feed()
+        feed.start(lambda channel_id: 7)
+        feed.apply([("ADDED", "Xk3vQp9LmZ", stored(1, 10, 2))], 0)
+
+        feed.apply([("REMOVED", "Xk3vQp9LmZ", stored(1, 10, 2))], 0)
+
+        assert index.incoming(7, 2) == []
+        store.remove.assert_called_once_with(1, 2)
+
+    @pytest.mark.asyncio
+    async def test_modified_reminder_is_replaced(self):
+        """Test a modified reminder is updated in the index."""
+        feed, backend, index, store = make_feed()
+        feed.start(lambda channel_id: None)
+        feed.apply([("ADDED", "1_2", stored(1, 10, 2, due_at=100))], 0)
+
+        feed.apply([("MODIFIED", "1_2", stored(1, 10, 2, due_at=900))], 0)
+
+        assert [r.due_at for r in index.incoming(1, 2)] == [900]
+
+    @pytest.mark.asyncio
+    async def test_stop_unsubscribes(self):
+        """Test stopping the feed ends the backend subscription."""
+        feed, backend, index, store = make_feed()
+        feed.start(lambda channel_id: None)
+
+        feed.stop()
+        feed.stop()
+
+        backend.watch.return_value.unsubscribe.assert_called_once()
+        assert not feed.is_running
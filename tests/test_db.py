@@ -12,22 +12,47 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 from google.cloud.firestore_v1.base_query import FieldFilter
 
 
+class TestInitFirestore:
+    """Test cases for lazy Firestore client creation."""
+
+    @patch('firebase_admin.firestore.client')
+    @patch('firebase_admin.initialize_app')
+    @patch('firebase_admin.credentials.Certificate')
+    def test_init_firestore_creates_client_once(self, mock_certificate, mock_initialize_app, mock_client):
+        """Test init_firestore only initializes the SDK on the first call."""
+        import db
+
+        with patch('db._client', None):
+            first = db.init_firestore()
+            second = db.get_client()
+
+        assert first is second is mock_client.return_value
+        mock_certificate.assert_called_once_with("secrets/firestore-credentials.json")
+        mock_initialize_app.assert_called_once()
+        mock_client.assert_called_once()
+
+
 class TestFirestoreReminderCollection:
     """Test cases for FirestoreReminderCollection."""
 
-    @patch('db.db')
-    def test_init(self, mock_db):
+    @patch('db.get_client')
+    def test_init(self, mock_get_client):
         """Test FirestoreReminderCollection initialization."""
         from db import FirestoreReminderCollection
+        mock_db = mock_get_client.return_value
         
         collection = FirestoreReminderCollection()
+        mock_get_client.assert_not_called()
+
         assert collection.db == mock_db
+        assert collection.collection_reminders == mock_db.collection.return_value
         mock_db.collection.assert_called_once()
 
-    @patch('db.db')
-    def test_make_data(self, mock_db):
+    @patch('db.get_client')
+    def test_make_data(self, mock_get_client):
         """Test _make_data method creates correct data structure."""
         from db import FirestoreReminderCollection
+        mock_db = mock_get_client.return_value
         
         collection = FirestoreReminderCollection()
         data = collection._make_data(123, 456, 789)
@@ -36,11 +61,37 @@ class TestFirestoreReminderCollection:
         assert data['channel_id'] == 456
         assert data['mentioned_user_id'] == 789
         assert 'created_at' in data
+        assert data['due_at'] == data['created_at'] + 24 * 60 * 60 * 1000
+
+    @patch('db.get_client')
+    def test_make_data_custom_threshold(self, mock_get_client):
+        """Test _make_data derives the due key from the given threshold."""
+        from db import FirestoreReminderCollection
+        from snowflake import snowflake_time_ms
+
+        collection = FirestoreReminderCollection()
+        data = collection._make_data(1379235275745656994, 456, 789, threshold=60)
+
+        assert data['created_at'] == snowflake_time_ms(1379235275745656994)
+        assert data['due_at'] == data['created_at'] + 60 * 1000
+
+    @patch('db.get_client')
+    def test_make_data_stores_guild_and_author(self, mock_get_client):
+        """Test the guild and author are stored only when given."""
+        from db import FirestoreReminderCollection
+
+        collection = FirestoreReminderCollection()
 
-    @patch('db.db')
-    def test_save_message(self, mock_db):
+        assert 'author_id' not in collection._make_data(123, 456, 789)
+        data = collection._make_data(123, 456, 789, guild_id=5, author_id=111)
+        assert data['guild_id'] == 5
+        assert data['author_id'] == 111
+
+    @patch('db.get_client')
+    def test_save_message(self, mock_get_client):
         """Test save_message method."""
         from db import FirestoreReminderCollection
+        mock_db = mock_get_client.return_value
         
         mock_collection = Mock()
         mock_db.collection.return_value = mock_collection
@@ -48,16 +99,18 @@ class TestFirestoreReminderCollection:
         collection = FirestoreReminderCollection()
         collection.save_message(123, 456, 789)
         
-        mock_collection.add.assert_called_once()
-        call_args = mock_collection.add.call_args[0][0]
+        mock_collection.document.assert_called_once_with("123_789")
+        mock_collection.document.return_value.set.assert_called_once()
+        call_args = mock_collection.document.return_value.set.call_args[0][0]
         assert call_args['message_id'] == 123
         assert call_args['channel_id'] == 456
         assert call_args['mentioned_user_id'] == 789
 
-    @patch('db.db')
-    def test_delete_message_by_message_and_user_id_success(self, mock_db):
+    @patch('db.get_client')
+    def test_delete_message_by_message_and_user_id_success(self, mock_get_client):
         """Test delete_message_by_message_and_user_id returns True when message exists."""
         from db import FirestoreReminderCollection
+        mock_db = mock_get_client.return_value
         
         mock_collection = Mock()
         mock_query = Mock()
@@ -74,12 +127,15 @@ class TestFirestoreReminderCollection:
         collection = FirestoreReminderCollection()
         result = collection.delete_message_by_message_and_user_id(123, 789)
         
-        mock_doc_ref.delete.assert_called_once()
+        assert result is True
+        mock_db.batch.return_value.delete.assert_called_once_with(mock_doc_ref)
+        mock_db.batch.return_value.commit.assert_called_once()
 
-    @patch('db.db')
-    def test_delete_message_by_message_and_user_id_not_found(self, mock_db):
+    @patch('db.get_client')
+    def test_delete_message_by_message_and_user_id_not_found(self, mock_get_client):
         """Test delete_message_by_message_and_user_id returns False when message doesn't exist."""
         from db import FirestoreReminderCollection
+        mock_db = mock_get_client.return_value
         
         mock_collection = Mock()
         mock_query = Mock()
@@ -95,10 +151,11 @@ class TestFirestoreReminderCollection:
         
         assert result is False
 
-    @patch('db.db')
-    def test_get_expired_messages(self, mock_db):
+    @patch('db.get_client')
+    def test_get_expired_messages(self, mock_get_client):
         """Test get_expired_messages returns correct data."""
         from db import FirestoreReminderCollection
+        mock_db = mock_get_client.return_value
         
         mock_collection = Mock()
         mock_query = Mock()
@@ -116,23 +173,203 @@ class TestFirestoreReminderCollection:
         assert result[0]['message_id'] == 123
         assert result[0]['user_id'] == 789
 
+    @patch('db.get_client')
+    def test_apply_writes_batches_saves_before_deletes(self, mock_get_client):
+        """Test apply_writes commits batched saves before running a delete."""
+        from db import FirestoreReminderCollection
+        mock_db = mock_get_client.return_value
+
+        mock_collection = Mock()
+        mock_db.collection.return_value = mock_collection
+        first_batch, second_batch = Mock(), Mock()
+        mock_db.batch.side_effect = [first_batch, second_batch]
+
+        collection = FirestoreReminderCollection()
+        collection.delete_replied = Mock(return_value=1)
+
+        collection.apply_writes([
+            ("save", {"message_id": 1, "channel_id": 2, "mentioned_user_id": 3}),
+            ("save", {"message_id": 1, "channel_id": 2, "mentioned_user_id": 4}),
+            ("delete_replied", {"channel_id": 2, "user_id": 3}),
+        ])
+
+        assert first_batch.set.call_count == 2
+        first_batch.commit.assert_called_once()
+        collection.delete_replied.assert_called_once_with(2, 3)
+        second_batch.commit.assert_not_called()
+
+    @patch('db.get_client')
+    def test_apply_writes_unknown_operation(self, mock_get_client):
+        """Test apply_writes rejects unknown operations."""
+        from db import FirestoreReminderCollection
+
+        collection = FirestoreReminderCollection()
+
+        with pytest.raises(ValueError):
+            collection.apply_writes([("rename", {})])
+
+
+class TestBucketedLayout:
+    """Test cases for the bucketed reminder layout."""
+
+    @patch('db.now_ms')
+    @patch('db.get_client')
+    def test_save_message_writes_bucket_and_reminder(self, mock_get_client, mock_now_ms):
+        """Test a save files the reminder into its due-time bucket."""
+        from db import FirestoreReminderCollection
+        mock_db = mock_get_client.return_value
+        mock_now_ms.return_value = 0
+
+        collection = FirestoreReminderCollection(layout="bucketed")
+        data = collection._make_data(1379235275745656994, 456, 789)
+        bucket = collection.bucket_of(data['due_at'])
+
+        collection.save_message(1379235275745656994, 456, 789)
+        collection.save_message(1379235275745656995, 456, 789)
+
+        batch = mock_db.batch.return_value
+        # The bucket document is only written with the first reminder in it
+        assert batch.set.call_count == 3
+        mock_db.collection.return_value.document.assert_any_call(str(bucket))
+        assert batch.commit.call_count == 2
+
+    @patch('db.now_ms')
+    @patch('db.get_client')
+    def test_get_expired_reads_due_buckets_only(self, mock_get_client, mock_now_ms):
+        """Test the sweep reads due buckets and drops past buckets that are empty."""
+        from db import FirestoreReminderCollection
+        mock_db = mock_get_client.return_value
+
+        collection = FirestoreReminderCollection(layout="bucketed")
+        mock_now_ms.return_value = 10 * collection.bucket_ms + 5
+
+        past_doc, empty_doc, current_doc = Mock(), Mock(), Mock()
+        past_doc.to_dict.return_value = {'bucket': 9}
+        empty_doc.to_dict.return_value = {'bucket': 8}
+        current_doc.to_dict.return_value = {'bucket': 10}
+        mock_buckets = mock_db.collection.return_value
+        mock_buckets.where.return_value.stream.return_value = [past_doc, empty_doc, current_doc]
+
+        reminders = {
+            '9': [{'message_id': 1}],
+            '8': [],
+        }
+        def bucket_document(bucket_id):
+            bucket_ref = Mock()
+            subcollection = bucket_ref.collection.return_value
+            docs = []
+            for reminder in reminders.get(bucket_id, []):
+                doc = Mock()
+                doc.to_dict.return_value = reminder
+                docs.append(doc)
+            subcollection.stream.return_value = docs
+            subcollection.limit.return_value.stream.return_value = []
+            current = Mock()
+            current.to_dict.return_value = {'message_id': 2}
+            subcollection.where.return_value.stream.return_value = [current]
+            return bucket_ref
+        mock_buckets.document.side_effect = bucket_document
+
+        result = collection.get_expired_messages(3600)
+
+        assert result == [{'message_id': 1}, {'message_id': 2}]
+
+    @patch('db.now_ms', return_value=10 ** 13)
+    def test_sweep_drops_handled_bucket_but_keeps_late_reminder(self, mock_now_ms, fake_firestore):
+        """Test a past bucket is only dropped if nothing was written to it after the sweep read it."""
+        from db import FirestoreReminderCollection
+        from records import ReminderRecord
+
+        collection = FirestoreReminderCollection(client=fake_firestore, layout="bucketed")
+        collection.save_message(1379235275745656994, 456, 789)
+        collection.save_message(1379235275745656994, 456, 790)
+
+        handled = [ReminderRecord.from_dict(data) for data in collection.get_expired_messages(60)]
+        # A reminder written to the bucket between the sweep's read and its deletes
+        collection.save_message(1379235275745656995, 456, 789)
+        fake_firestore.reset_counts()
+        collection.delete_reminders(handled)
+
+        # Both deletes share one commit and the bucket document survives the failed precondition
+        assert fake_firestore.calls["commit"] == 1
+        assert [data['message_id'] for data in collection.get_expired_messages(60)] == [1379235275745656995]
+
+        collection.delete_reminders([ReminderRecord.from_dict(data) for data in collection.get_expired_messages(60)])
+
+        assert list(fake_firestore.collection(collection.collection_buckets.id).stream()) == []
+
+    @patch('db.now_ms', return_value=10 ** 13)
+    def test_migrate_past_due_reminders_within_the_write_limit(self, mock_now_ms, fake_firestore):
+        """Test reminders in due buckets, which each take 3 writes, are migrated in batches Firestore accepts."""
+        from db import FirestoreReminderCollection
+
+        flat = FirestoreReminderCollection(client=fake_firestore, layout="flat")
+        for offset in range(200):
+            flat.save_message(1379235275745656994 + offset, 2, 3)
+
+        collection = FirestoreReminderCollection(client=fake_firestore, layout="bucketed")
+        assert collection.migrate_to_buckets(threshold=60) == 200
+
+        assert list(flat.collection_reminders.stream()) == []
+        assert len(collection.get_expired_messages(60)) == 200
+
+    def test_migrate_keeps_guild_author_and_times(self, fake_firestore):
+        """Test migrated reminders keep the fields the index and /still-waiting rebuild from."""
+        from db import FirestoreReminderCollection
+
+        flat = FirestoreReminderCollection(client=fake_firestore, layout="flat")
+        flat.save_message(1379235275745656994, 2, 3, threshold=60, guild_id=4, author_id=5)
+        stored = flat.get_pending_reminders()[0]
+
+        collection = FirestoreReminderCollection(client=fake_firestore, layout="bucketed")
+        collection.migrate_to_buckets(threshold=3600)
+
+        assert collection.get_pending_reminders() == [stored]
+
+    @patch('db.get_client')
+    def test_migrate_to_buckets(self, mock_get_client):
+        """Test reminders are moved out of the flat collection in batches."""
+        from db import FirestoreReminderCollection
+        mock_db = mock_get_client.return_value
+
+        old_doc = Mock()
+        old_doc.to_dict.return_value = {
+            'message_id': 1379235275745656994,
+            'channel_id': 456,
+            'mentioned_user_id': 789,
+        }
+        mock_db.collection.return_value.limit.return_value.stream.side_effect = [[old_doc], []]
+
+        collection = FirestoreReminderCollection(layout="bucketed")
+        migrated = collection.migrate_to_buckets(threshold=60)
+
+        batch = mock_db.batch.return_value
+        assert migrated == 1
+        batch.delete.assert_called_once_with(old_doc.reference)
+        batch.commit.assert_called_once()
+
 
 class TestFirestoreStatsCollection:
     """Test cases for FirestoreStatsCollection."""
 
-    @patch('db.db')
-    def test_init(self, mock_db):
+    @patch('db.get_client')
+    def test_init(self, mock_get_client):
         """Test FirestoreStatsCollection initialization."""
         from db import FirestoreStatsCollection
+        mock_db = mock_get_client.return_value
         
         collection = FirestoreStatsCollection()
+        mock_get_client.assert_not_called()
+
         assert collection.db == mock_db
+        assert collection.collection_stats == mock_db.collection.return_value
         mock_db.collection.assert_called_once()
 
-    @patch('db.db')
-    def test_make_data(self, mock_db):
+    @patch('db.get_client')
+    def test_make_data(self, mock_get_client):
         """Test _make_data method creates correct data structure."""
         from db import FirestoreStatsCollection
+        mock_db = mock_get_client.return_value
         
         collection = FirestoreStatsCollection()
         data = collection._make_data("test_metric", 100)
@@ -142,10 +379,11 @@ class TestFirestoreStatsCollection:
         assert data['count'] == 100
         assert 'updated_at' in data
 
-    @patch('db.db')
-    def test_update_guild_count(self, mock_db):
+    @patch('db.get_client')
+    def test_update_guild_count(self, mock_get_client):
         """Test update_guild_count method."""
         from db import FirestoreStatsCollection
+        mock_db = mock_get_client.return_value
         
         mock_collection = Mock()
         mock_doc_ref = Mock()
@@ -159,10 +397,11 @@ class TestFirestoreStatsCollection:
         mock_collection.document.assert_called_with("discord_guilds")
         mock_doc_ref.set.assert_called_once()
 
-    @patch('db.db')
-    def test_update_user_count(self, mock_db):
+    @patch('db.get_client')
+    def test_update_user_count(self, mock_get_client):
         """Test update_user_count method."""
         from db import FirestoreStatsCollection
+        mock_db = mock_get_client.return_value
         
         mock_collection = Mock()
         mock_doc_ref = Mock()
@@ -176,10 +415,11 @@ class TestFirestoreStatsCollection:
         mock_collection.document.assert_called_with("discord_users")
         mock_doc_ref.set.assert_called_once()
 
-    @patch('db.db')
-    def test_increment_message_count(self, mock_db):
+    @patch('db.get_client')
+    def test_increment_message_count(self, mock_get_client):
         """Test increment_message_count method."""
         from db import FirestoreStatsCollection
+        mock_db = mock_get_client.return_value
         
         mock_collection = Mock()
         mock_doc_ref = Mock()
@@ -192,3 +432,97 @@ class TestFirestoreStatsCollection:
         
         mock_collection.document.assert_called_with("discord_messages")
         mock_doc_ref.set.assert_called_once()
+
+
+class TestFirestoreGuildSettingsCollection:
+    """Test cases for FirestoreGuildSettingsCollection."""
+
+    @patch('db.get_client')
+    def test_get_settings_reads_guilds_in_one_call(self, mock_get_client):
+        """Test settings of several guilds are fetched with a single read."""
+        from db import FirestoreGuildSettingsCollection
+        mock_db = mock_get_client.return_value
+
+        found = Mock(id="1", exists=True)
+        found.to_dict.return_value = {"reminder_threshold": 60}
+        missing = Mock(id="2", exists=False)
+        mock_db.get_all.return_value = [found, missing]
+
+        collection = FirestoreGuildSettingsCollection()
+        settings = collection.get_settings([1, 2])
+
+        assert settings == {1: {"reminder_threshold": 60}}
+        mock_db.get_all.assert_called_once()
+
+
+class TestSnapshotReconcile:
+    """Test cases for the reads used when catching up from a snapshot."""
+
+    @patch('db.now_ms', return_value=5000)
+    def test_deletes_leave_tombstones(self, mock_now_ms, fake_firestore):
+        """Test every delete path records what it deleted, in the same commit."""
+        from db import FirestoreReminderCollection
+        from records import ReminderRecord
+
+        collection = FirestoreReminderCollection(client=fake_firestore, layout="flat")
+        legacy = {'message_id': 1, 'channel_id': 2, 'mentioned_user_id': 3}
+        collection.collection_reminders.add(legacy)
+        collection.save_message(1379235275745656994, 2, 4)
+        collection.save_message(1379235275745656995, 5, 6)
+        fake_firestore.reset_counts()
+
+        collection.delete_message_by_message_and_user_id(1, 3)
+        collection.delete_replied(2, 4)
+        collection.delete_reminders([ReminderRecord(1379235275745656995, 5, 6)])
+
+        assert fake_firestore.calls["commit"] == 3
+        deleted = sorted(collection.get_reminders_deleted_since(5000), key=lambda data: data['mentioned_user_id'])
+        assert deleted == [
+            {'message_id': 1, 'mentioned_user_id': 3, 'deleted_at': 5000},
+            {'channel_id': 2, 'mentioned_user_id': 4, 'deleted_at': 5000},
+            {'message_id': 1379235275745656995, 'mentioned_user_id': 6, 'deleted_at': 5000},
+        ]
+        assert collection.get_reminders_deleted_since(5001) == []
+
+    def test_prune_tombstones(self, fake_firestore):
+        """Test only tombstones older than the cut-off are deleted."""
+        from db import FirestoreReminderCollection
+
+        collection = FirestoreReminderCollection(client=fake_firestore, layout="flat")
+        for deleted_at in (100, 200, 300):
+            collection.collection_tombstones.add({'message_id': deleted_at, 'mentioned_user_id': 1, 'deleted_at': deleted_at})
+
+        assert collection.prune_tombstones(250, batch_size=1) == 2
+        assert [data['deleted_at'] for data in collection.get_reminders_deleted_since(0)] == [300]
+
+
+class TestWatch:
+    """Test cases for following reminder changes."""
+
+    @patch('db.get_client')
+    def test_watch_passes_changes_and_read_time(self, mock_get_client):
+        """Test Firestore snapshots are turned into (change, doc_id, data) tuples."""
+        from datetime import datetime, timezone
+        from db import FirestoreReminderCollection
+        mock_db = mock_get_client.return_value
+        callback = Mock()
+
+        collection = FirestoreReminderCollection()
+        watch = collection.watch(callback)
+
+        on_snapshot = mock_db.collection.return_value.on_snapshot.call_args[0][0]
+        added = Mock()
+        added.type.name = "ADDED"
+        added.document.id = "1_2"
+        added.document.to_dict.return_value = {"message_id": 1}
+        removed = Mock()
+        removed.type.name = "REMOVED"
+        removed.document.id = "3_4"
+        removed.document.to_dict.return_value = None
+        on_snapshot([], [added, removed], datetime(2025, 1, 1, tzinfo=timezone.utc))
+
+        assert watch is mock_db.collection.return_value.on_snapshot.return_value
+        callback.assert_called_once_with(
+            [("ADDED", "1_2", {"message_id": 1}), ("REMOVED", "3_4", {})],
+            1735689600000,
+        )
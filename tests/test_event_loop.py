@@ -0,0 +1,49 @@
+"""
+Tests for the event loop selection (event_loop.py).
+"""
+
+import asyncio
+import os
+import pytest
+import sys
+from unittest.mock import Mock, patch
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+class TestEventLoop:
+    """Test cases for the event loop selection."""
+
+    def teardown_method(self):
+        asyncio.set_event_loop_policy(None)
+
+    def test_default_loop(self):
+        """Test "asyncio" keeps the default event loop."""
+        from event_loop import use_event_loop
+
+        assert use_event_loop("asyncio") == "asyncio"
+        assert type(asyncio.get_event_loop_policy()) is asyncio.DefaultEventLoopPolicy
+
+    @patch('event_loop.uvloop', None)
+    def test_falls_back_without_uvloop(self, caplog):
+        """Test uvloop falls back to the default loop with a warning when it is not installed."""
+        from event_loop import use_event_loop
+
+        assert use_event_loop("uvloop") == "asyncio"
+        assert type(asyncio.get_event_loop_policy()) is asyncio.DefaultEventLoopPolicy
+        assert "uvloop is not installed" in caplog.text
+
+    def test_uses_uvloop_when_installed(self):
+        """Test the uvloop policy is installed when uvloop is available."""
+        from event_loop import use_event_loop
+
+        policy = asyncio.DefaultEventLoopPolicy()
+        with patch('event_loop.uvloop', Mock(EventLoopPolicy=Mock(return_value=policy))):
+            assert use_event_loop("uvloop") == "uvloop"
+        assert asyncio.get_event_loop_policy() is policy
+
+    def test_unknown_loop(self):
+        """Test an unknown implementation is a configuration error."""
+        from event_loop import loop_policy
+
+        with pytest.raises(ValueError):
+            loop_policy("trio")
@@ -0,0 +1,119 @@
+"""
+Tests for the in-process Firestore stand-in (fake_firestore.py), and the
+backend operations that db.py spends against it.
+"""
+
+import pytest
+import sys
+import os
+import time
+from unittest.mock import patch
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from google.api_core import exceptions
+from google.cloud.firestore_v1 import Increment, SERVER_TIMESTAMP
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+
+class TestFakeFirestore:
+    """Test cases for FakeFirestore."""
+
+    def test_queries(self, fake_firestore):
+        """Test equality and range filters, limits and collection groups."""
+        collection = fake_firestore.collection("reminders")
+        for number in range(5):
+            collection.document(f"doc{number}").set({"due_at": number, "channel_id": number % 2})
+        fake_firestore.collection("buckets/1/reminders").add({"due_at": 10, "channel_id": 1})
+
+        due = collection.where(filter=FieldFilter("due_at", "<=", 2)).stream()
+        channel = collection.where("channel_id", "==", 1).where("due_at", ">", 1).limit(1).stream()
+
+        assert [doc.id for doc in due] == ["doc0", "doc1", "doc2"]
+        assert [doc.to_dict() for doc in channel] == [{"due_at": 3, "channel_id": 1}]
+        assert len(fake_firestore.collection_group("reminders").get()) == 6
+        assert fake_firestore.calls["query"] == 3
+
+    def test_batch_transforms_and_counts(self, fake_firestore):
+        """Test a batch applies its writes and transforms in one round trip."""
+        stats = fake_firestore.collection("statistics").document("messages")
+        batch = fake_firestore.batch()
+        batch.set(stats, {"count": Increment(1), "updated_at": SERVER_TIMESTAMP}, merge=True)
+        batch.set(stats, {"count": Increment(2)}, merge=True)
+        batch.delete(fake_firestore.document("statistics/missing"))
+        batch.commit()
+
+        data = stats.get().to_dict()
+        assert data["count"] == 3
+        assert data["updated_at"] is not None
+        assert fake_firestore.calls == {"commit": 1, "get": 1}
+        assert fake_firestore.documents == {"write": 2, "delete": 1, "read": 1}
+
+    def test_injected_failure_changes_nothing(self, fake_firestore):
+        """Test an injected error fails the call without applying any of its writes."""
+        fake_firestore.error_rates = {"commit": 1.0}
+        batch = fake_firestore.batch()
+        batch.set(fake_firestore.document("reminders/a"), {"due_at": 1})
+
+        with pytest.raises(exceptions.ServiceUnavailable):
+            batch.commit()
+
+        assert not fake_firestore.document("reminders/a").get().exists
+
+    def test_latency(self):
+        """Test every round trip waits for the configured latency."""
+        from fake_firestore import FakeFirestore
+
+        client = FakeFirestore(latency=0.02, jitter=0.01, seed=1)
+        start = time.perf_counter()
+        client.document("reminders/a").set({"due_at": 1})
+        client.document("reminders/a").get()
+
+        assert time.perf_counter() - start >= 0.04
+
+    def test_on_snapshot(self, fake_firestore):
+        """Test listeners get every matching document first, then only the changes."""
+        collection = fake_firestore.collection("reminders")
+        collection.document("a").set({"due_at": 1})
+        deliveries = []
+        watch = collection.on_snapshot(lambda docs, changes, read_time: deliveries.append([(change.type.name, change.document.id) for change in changes]))
+
+        collection.document("b").set({"due_at": 2})
+        collection.document("a").delete()
+        watch.unsubscribe()
+        collection.document("c").set({"due_at": 3})
+
+        assert deliveries == [[("ADDED", "a")], [("ADDED", "b")], [("REMOVED", "a")]]
+
+
+class TestReminderOperationBudget:
+    """Backend operations spent by FirestoreReminderCollection."""
+
+    @patch('db.now_ms', return_value=10 ** 13)
+    def test_outbox_saves_are_one_commit(self, mock_now_ms, fake_firestore):
+        """Test consecutive saves from the outbox are written in one batch."""
+        from db import FirestoreReminderCollection
+
+        reminders = FirestoreReminderCollection(client=fake_firestore, layout="flat")
+        writes = [("save", {"message_id": 1000 + n, "channel_id": 1, "mentioned_user_id": 2}) for n in range(50)]
+
+        reminders.apply_writes(writes)
+
+        assert fake_firestore.calls == {"commit": 1}
+        assert fake_firestore.documents["write"] == 50
+        assert len(reminders.get_expired_messages(60)) == 50
+
+    def test_reply_deletes_in_one_query_and_one_commit(self, fake_firestore):
+        """Test a reply costs one query, and one commit with a delete for each reminder it answers and a tombstone."""
+        from db import FirestoreReminderCollection
+
+        reminders = FirestoreReminderCollection(client=fake_firestore, layout="flat")
+        for message_id in (1000, 1001, 1002):
+            reminders.save_message(message_id, channel_id=1, mentioned_user_id=2)
+        reminders.save_message(1003, channel_id=1, mentioned_user_id=3)
+        fake_firestore.reset_counts()
+
+        reminders.delete_replied(1, 2)
+
+        assert fake_firestore.calls == {"query": 1, "commit": 1}
+        assert fake_firestore.documents["delete"] == 3 and fake_firestore.documents["write"] == 1
+        assert [doc.id for doc in fake_firestore.collection("discord_reminders").stream()] == ["1003_3"]
@@ -0,0 +1,67 @@
+"""
+Tests for the grace module (grace.py).
+"""
+
+import pytest
+from unittest.mock import patch
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+class TestReminderGraceWindow:
+    """Test cases for ReminderGraceWindow."""
+
+    def test_reply_cancels_held_reminders(self):
+        """Test a message in the channel cancels every held reminder of the author there."""
+        from grace import ReminderGraceWindow
+
+        grace = ReminderGraceWindow(window=30)
+        grace.add(1, 100, 222)
+        grace.add(2, 100, 222)
+        grace.add(3, 100, 333)
+        grace.add(4, 200, 222)
+
+        assert grace.cancel_replied(100, 222) == 2
+        assert len(grace) == 2
+        assert grace.cancel_replied(100, 222) == 0
+
+    def test_reaction_cancels_held_reminder(self):
+        """Test a reaction cancels only the reminder for that message."""
+        from grace import ReminderGraceWindow
+
+        grace = ReminderGraceWindow(window=30)
+        grace.add(1, 100, 222)
+        grace.add(2, 100, 222)
+
+        assert grace.cancel_reacted(1, 222) is True
+        assert grace.cancel_reacted(1, 222) is False
+        assert grace.pop_all() == [(2, 100, 222, {})]
+
+    @patch('grace.time')
+    def test_pop_expired_returns_survivors_in_order(self, mock_time):
+        """Test reminders are released once their grace period is over."""
+        from grace import ReminderGraceWindow
+
+        grace = ReminderGraceWindow(window=30)
+        mock_time.monotonic.return_value = 1000
+        grace.add(1, 100, 222)
+        mock_time.monotonic.return_value = 1010
+        grace.add(2, 100, 333, threshold=60)
+
+        mock_time.monotonic.return_value = 1029
+        assert grace.pop_expired() == []
+
+        mock_time.monotonic.return_value = 1030
+        assert grace.pop_expired() == [(1, 100, 222, {})]
+        assert grace.pop_all() == [(2, 100, 333, {"threshold": 60})]
+
+    def test_duplicate_add_is_ignored(self):
+        """Test the same mention is only held once."""
+        from grace import ReminderGraceWindow
+
+        grace = ReminderGraceWindow(window=30)
+        grace.add(1, 100, 222)
+        grace.add(1, 100, 222)
+
+        assert len(grace) == 1
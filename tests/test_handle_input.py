@@ -46,7 +46,9 @@ class TestRegisterDb:
         mock_db.save_message.assert_called_once_with(
             message_id=123456789,
             channel_id=987654321,
-            mentioned_user_id=222222222
+            mentioned_user_id=222222222,
+            author_id=111111111,
+            guild_id=message.guild.id
         )
 
     @patch('handle_input.reminder_db')
@@ -216,6 +218,183 @@ class TestRegisterDb:
         
         mock_logger.error.assert_called_once()
 
+    @patch('handle_input.member_cache')
+    @patch('handle_input.reminder_db')
+    @patch('handle_input.config')
+    @pytest.mark.asyncio
+    async def test_register_db_low_memory_mode_chunks_on_demand(self, mock_config, mock_db, mock_member_cache):
+        """Test register_db chunks the guild before resolving @everyone in low memory mode."""
+        from handle_input import register_db
+
+        mock_config.MAX_ROLE_MEMBERS = 20
+        mock_config.LOW_MEMORY_MODE = True
+        mock_member_cache.ensure_chunked = AsyncMock()
+
+        message = Mock(spec=discord.Message)
+        message.id = 123456789
+        message.guild = Mock(spec=discord.Guild)
+        message.channel = Mock(spec=discord.TextChannel)
+        message.channel.id = 987654321
+        message.channel.members = []
+        message.author = Mock(spec=discord.Member)
+        message.author.id = 111111111
+        message.author.bot = False
+        message.content = "Hello @everyone"
+        message.mention_everyone = True
+        message.role_mentions = []
+        message.mentions = []
+
+        await register_db(message)
+
+        mock_member_cache.ensure_chunked.assert_called_once_with(message.guild)
+
+    @patch('handle_input.member_cache')
+    @patch('handle_input.reminder_db')
+    @patch('handle_input.config')
+    @pytest.mark.asyncio
+    async def test_register_db_low_memory_mode_user_mention_no_chunk(self, mock_config, mock_db, mock_member_cache):
+        """Test register_db does not chunk the guild for plain user mentions."""
+        from handle_input import register_db
+
+        mock_config.MAX_ROLE_MEMBERS = 20
+        mock_config.LOW_MEMORY_MODE = True
+        mock_member_cache.ensure_chunked = AsyncMock()
+
+        message = Mock(spec=discord.Message)
+        message.id = 123456789
+        message.channel = Mock(spec=discord.TextChannel)
+        message.channel.id = 987654321
+        message.author = Mock(spec=discord.Member)
+        message.author.id = 111111111
+        message.author.bot = False
+        message.mention_everyone = False
+        message.role_mentions = []
+
+        mentioned_user = Mock(spec=discord.User)
+        mentioned_user.id = 222222222
+        mentioned_user.bot = False
+        mentioned_user.name = "mentioned_user"
+        message.mentions = [mentioned_user]
+
+        await register_db(message)
+
+        mock_member_cache.ensure_chunked.assert_not_called()
+        mock_db.save_message.assert_called_once()
+
+    @patch('handle_input.recent_activity')
+    @patch('handle_input.reminder_db')
+    @patch('handle_input.config')
+    @pytest.mark.asyncio
+    async def test_register_db_here_without_presences(self, mock_config, mock_db, mock_activity):
+        """Test register_db resolves @here from recent activity when presences are disabled."""
+        from handle_input import register_db
+
+        mock_config.MAX_ROLE_MEMBERS = 20
+        mock_config.LOW_MEMORY_MODE = False
+        mock_config.PRESENCE_INTENT = False
+
+        active_member = Mock(spec=discord.Member)
+        active_member.id = 222222222
+        active_member.bot = False
+        active_member.name = "active_member"
+        mock_activity.active_members.return_value = [active_member]
+
+        message = Mock(spec=discord.Message)
+        message.id = 123456789
+        message.channel = Mock(spec=discord.TextChannel)
+        message.channel.id = 987654321
+        message.author = Mock(spec=discord.Member)
+        message.author.id = 111111111
+        message.author.bot = False
+        message.content = "Hello @here"
+        message.mention_everyone = True
+        message.role_mentions = []
+        message.mentions = []
+
+        await register_db(message)
+
+        mock_activity.active_members.assert_called_once_with(message.channel)
+        mock_db.save_message.assert_called_once_with(
+            message_id=123456789,
+            channel_id=987654321,
+            mentioned_user_id=222222222,
+            author_id=111111111,
+            guild_id=message.guild.id
+        )
+
+    @patch('handle_input.reminder_outbox')
+    @patch('handle_input.reminder_db')
+    @patch('handle_input.config')
+    @pytest.mark.asyncio
+    async def test_register_db_through_outbox(self, mock_config, mock_db, mock_outbox):
+        """Test register_db records the write in the outbox when it is open."""
+        from handle_input import register_db
+
+        mock_config.MAX_ROLE_MEMBERS = 20
+        mock_outbox.is_open = True
+
+        message = Mock(spec=discord.Message)
+        message.id = 123456789
+        message.channel = Mock(spec=discord.TextChannel)
+        message.channel.id = 987654321
+        message.author = Mock(spec=discord.Member)
+        message.author.id = 111111111
+        message.author.bot = False
+        message.mention_everyone = False
+        message.role_mentions = []
+
+        mentioned_user = Mock(spec=discord.User)
+        mentioned_user.id = 222222222
+        mentioned_user.bot = False
+        mentioned_user.name = "mentioned_user"
+        message.mentions = [mentioned_user]
+
+        await register_db(message)
+
+        mock_outbox.append.assert_called_once_with(
+            "save",
+            message_id=123456789,
+            channel_id=987654321,
+            mentioned_user_id=222222222,
+            author_id=111111111,
+            guild_id=message.guild.id
+        )
+        mock_db.save_message.assert_not_called()
+
+    @patch('handle_input.reminder_grace')
+    @patch('handle_input.reminder_db')
+    @patch('handle_input.config')
+    @pytest.mark.asyncio
+    async def test_register_db_holds_reminder_in_grace_period(self, mock_config, mock_db, mock_grace):
+        """Test register_db holds new reminders in memory while the grace window runs."""
+        from handle_input import register_db
+
+        mock_config.MAX_ROLE_MEMBERS = 20
+        mock_grace.is_running = True
+
+        message = Mock(spec=discord.Message)
+        message.id = 123456789
+        message.channel = Mock(spec=discord.TextChannel)
+        message.channel.id = 987654321
+        message.author = Mock(spec=discord.Member)
+        message.author.id = 111111111
+        message.author.bot = False
+        message.mention_everyone = False
+        message.role_mentions = []
+
+        mentioned_user = Mock(spec=discord.User)
+        mentioned_user.id = 222222222
+        mentioned_user.bot = False
+        mentioned_user.name = "mentioned_user"
+        message.mentions = [mentioned_user]
+
+        await register_db(message)
+
+        mock_grace.add.assert_called_once_with(
+            123456789, 987654321, 222222222, author_id=111111111, guild_id=message.guild.id
+        )
+        mock_db.save_message.assert_not_called()
+
 
 class TestObserveMessage:
     """Test cases for observe_message function."""
@@ -225,7 +404,7 @@ class TestObserveMessage:
         """Test observe_message with valid message in tracked channel."""
         from handle_input import observe_message
         
-        mock_db.search_reminders.return_value = ['doc1']
+        mock_db.delete_replied.return_value = 1
         
         message = Mock(spec=discord.Message)
         message.channel.id = 987654321
@@ -233,15 +412,14 @@ class TestObserveMessage:
         
         observe_message(message)
         
-        mock_db.search_reminders.assert_called_once_with(987654321, 222222222)
-        mock_db.delete_messages_by_doc_ids.assert_called_once_with(['doc1'])
+        mock_db.delete_replied.assert_called_once_with(987654321, 222222222)
 
     @patch('handle_input.reminder_db')
     def test_observe_message_no_reminders(self, mock_db):
         """Test observe_message when no reminders are found."""
         from handle_input import observe_message
         
-        mock_db.search_reminders.return_value = []
+        mock_db.delete_replied.return_value = 0
         
         message = Mock(spec=discord.Message)
         message.channel.id = 987654321
@@ -249,8 +427,7 @@ class TestObserveMessage:
         
         observe_message(message)
         
-        mock_db.search_reminders.assert_called_once_with(987654321, 222222222)
-        mock_db.delete_messages_by_doc_ids.assert_not_called()
+        mock_db.delete_replied.assert_called_once_with(987654321, 222222222)
 
     @patch('handle_input.reminder_db')
     @patch('handle_input.logger')
@@ -258,7 +435,7 @@ class TestObserveMessage:
         """Test observe_message handles exceptions gracefully."""
         from handle_input import observe_message
         
-        mock_db.search_reminders.side_effect = Exception("Database error")
+        mock_db.delete_replied.side_effect = Exception("Database error")
         
         message = Mock(spec=discord.Message)
         message.channel.id = 987654321
@@ -268,6 +445,23 @@ class TestObserveMessage:
         
         mock_logger.error.assert_called_once()
 
+    @patch('handle_input.reminder_outbox')
+    @patch('handle_input.reminder_db')
+    def test_observe_message_through_outbox(self, mock_db, mock_outbox):
+        """Test observe_message queues the delete in the outbox when it is open."""
+        from handle_input import observe_message
+
+        mock_outbox.is_open = True
+
+        message = Mock(spec=discord.Message)
+        message.channel.id = 987654321
+        message.author.id = 222222222
+
+        observe_message(message)
+
+        mock_outbox.append.assert_called_once_with("delete_replied", channel_id=987654321, user_id=222222222)
+        mock_db.delete_replied.assert_not_called()
+
 
 class TestObserveReaction:
     """Test cases for observe_reaction function."""
@@ -317,3 +511,79 @@ class TestObserveReaction:
         observe_reaction(payload)
         
         mock_logger.error.assert_called_once()
+
+    @patch('handle_input.reminder_grace')
+    @patch('handle_input.reminder_db')
+    def test_observe_reaction_cancels_held_reminder(self, mock_db, mock_grace):
+        """Test a reaction to a reminder still in the grace period needs no delete."""
+        from handle_input import observe_reaction
+
+        mock_grace.is_running = True
+        mock_grace.cancel_reacted.return_value = True
+
+        payload = Mock()
+        payload.message_id = 123456789
+        payload.user_id = 222222222
+
+        observe_reaction(payload)
+
+        mock_grace.cancel_reacted.assert_called_once_with(123456789, 222222222)
+        mock_db.delete_message_by_message_and_user_id.assert_not_called()
+
+
+class TestUnreachableMentions:
+    """Test cases for mentions that could never be reminded."""
+
+    @patch('handle_input.reminder_db')
+    @patch('handle_input.config')
+    @pytest.mark.asyncio
+    async def test_register_db_skips_unreachable_users(self, mock_config, mock_db, mock_message):
+        """Test users who cannot read the channel are not registered."""
+        from handle_input import register_db
+        from unreachable import PERMISSION, unreachable
+
+        mock_config.MAX_ROLE_MEMBERS = 20
+        reachable = Mock(spec=discord.User, id=222222222, bot=False)
+        hidden = Mock(spec=discord.User, id=333333333, bot=False)
+        mock_message.mentions = [reachable, hidden]
+        unreachable.mark(PERMISSION, (mock_message.channel.id, hidden.id))
+
+        await register_db(mock_message)
+
+        mock_db.save_message.assert_called_once()
+        assert mock_db.save_message.call_args.kwargs['mentioned_user_id'] == 222222222
+
+    @patch('handle_input.reminder_db')
+    @patch('handle_input.config')
+    @pytest.mark.asyncio
+    async def test_register_db_skips_members_who_cannot_read(self, mock_config, mock_db, mock_message):
+        """Test a member without read access to the channel is not registered."""
+        from handle_input import register_db
+
+        mock_config.MAX_ROLE_MEMBERS = 20
+        reader = Mock(spec=discord.Member, id=222222222, bot=False)
+        outsider = Mock(spec=discord.Member, id=333333333, bot=False)
+        mock_message.mentions = [reader, outsider]
+        mock_message.channel.permissions_for.side_effect = lambda member: discord.Permissions(
+            read_messages=member is not outsider, send_messages=True
+        )
+
+        await register_db(mock_message)
+
+        mock_db.save_message.assert_called_once()
+        assert mock_db.save_message.call_args.kwargs['mentioned_user_id'] == 222222222
+
+    @patch('handle_input.reminder_db')
+    @patch('handle_input.config')
+    @pytest.mark.asyncio
+    async def test_register_db_skips_channels_the_bot_cannot_send_in(self, mock_config, mock_db, mock_message, mock_member):
+        """Test nothing is registered where the reminder could not be sent."""
+        from handle_input import register_db
+
+        mock_config.MAX_ROLE_MEMBERS = 20
+        mock_message.mentions = [mock_member]
+        mock_message.channel.permissions_for.return_value = discord.Permissions(read_messages=True)
+
+        await register_db(mock_message)
+
+        mock_db.save_message.assert_not_called()
@@ -62,7 +62,9 @@ class TestBotIntegration:
         mock_handle_db.save_message.assert_called_once_with(
             message_id=123456789,
             channel_id=987654321,
-            mentioned_user_id=222222222
+            mentioned_user_id=222222222,
+            author_id=111111111,
+            guild_id=message.guild.id
         )
         
         # Step 2: Simulate expired reminder
@@ -99,7 +101,7 @@ class TestBotIntegration:
         
         # Verify reminder was sent and deleted
         channel.send.assert_called_once()
-        mock_reminder_db.delete_message_by_message_and_user_id.assert_called_once_with(123456789, 222222222)
+        assert [reminder.key for reminder in mock_reminder_db.delete_reminders.call_args[0][0]] == [(123456789, 222222222)]
 
     @patch('handle_input.reminder_db')
     @pytest.mark.asyncio
@@ -107,7 +109,7 @@ class TestBotIntegration:
         """Test that sending a message in the channel removes the reminder."""
         from handle_input import observe_message
         
-        mock_db.search_reminders.return_value = ['doc1']
+        mock_db.delete_replied.return_value = 1
         
         # Create message in channel
         message = Mock(spec=discord.Message)
@@ -117,8 +119,7 @@ class TestBotIntegration:
         observe_message(message)
         
         # Verify reminder was removed
-        mock_db.search_reminders.assert_called_once_with(987654321, 222222222)
-        mock_db.delete_messages_by_doc_ids.assert_called_once_with(['doc1'])
+        mock_db.delete_replied.assert_called_once_with(987654321, 222222222)
 
     @patch('handle_input.reminder_db')
     def test_reaction_removes_reminder(self, mock_db):
@@ -256,7 +257,7 @@ class TestBotIntegration:
         channel.send.assert_called_once()
         
         # Should delete both reminders
-        assert mock_db.delete_message_by_message_and_user_id.call_count == 2
+        assert len(mock_db.delete_reminders.call_args[0][0]) == 2
 
 
 class TestErrorHandlingIntegration:
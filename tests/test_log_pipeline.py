@@ -0,0 +1,79 @@
+"""
+Tests for the queue-based logging pipeline (log_pipeline.py).
+"""
+
+import logging
+import pytest
+import sys
+import os
+from unittest.mock import patch
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+def make_record(lineno=10, level=logging.INFO, msg="Saved %s", args=("x",)):
+    return logging.LogRecord("handle_input", level, "handle_input.py", lineno, msg, args, None)
+
+
+class TestCallSiteRateLimit:
+    """Test cases for CallSiteRateLimit."""
+
+    def test_limit_applies_per_call_site(self):
+        """Test one busy line of code does not silence another."""
+        from log_pipeline import CallSiteRateLimit
+
+        limit = CallSiteRateLimit(rate=0, burst=2, sample_every=1000)
+        with patch('log_pipeline.time.monotonic', return_value=100):
+            passed = [limit.filter(make_record(lineno=10)) for _ in range(5)]
+            assert passed == [True, True, False, False, False]
+            assert limit.filter(make_record(lineno=20))
+            assert limit.filter(make_record(lineno=10, level=logging.WARNING))
+
+    def test_sampled_record_reports_suppressed(self):
+        """Test over the limit one record in sample_every passes with the suppressed count."""
+        from log_pipeline import CallSiteRateLimit
+
+        limit = CallSiteRateLimit(rate=0, burst=1, sample_every=3)
+        with patch('log_pipeline.time.monotonic', return_value=100):
+            records = [make_record() for _ in range(4)]
+            passed = [limit.filter(record) for record in records]
+
+        assert passed == [True, False, False, True]
+        assert records[3].getMessage() == "Saved x (2 similar messages suppressed)"
+
+    def test_tokens_refill_over_time(self):
+        """Test the call site may log again once tokens refilled."""
+        from log_pipeline import CallSiteRateLimit
+
+        limit = CallSiteRateLimit(rate=1, burst=1, sample_every=1000)
+        with patch('log_pipeline.time.monotonic', return_value=100):
+            assert limit.filter(make_record())
+            assert not limit.filter(make_record())
+        with patch('log_pipeline.time.monotonic', return_value=101):
+            record = make_record()
+            assert limit.filter(record)
+        assert record.getMessage() == "Saved x (1 similar messages suppressed)"
+
+
+class TestSetupLogging:
+    """Test cases for setup_logging."""
+
+    def test_records_are_written_by_the_listener(self):
+        """Test the root logger only enqueues, and the listener formats and writes."""
+        from log_pipeline import InProcessQueueHandler, setup_logging
+
+        root = logging.getLogger()
+        saved_handlers, saved_level = list(root.handlers), root.level
+        listener = setup_logging("INFO")
+        try:
+            assert [type(handler) for handler in root.handlers] == [InProcessQueueHandler]
+            with patch.object(listener.handlers[0], 'emit') as emit:
+                logging.getLogger("test_log_pipeline").info("Saved %s", "x")
+                listener.stop()
+            record = emit.call_args[0][0]
+            assert record.getMessage() == "Saved x"
+        finally:
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            for handler in saved_handlers:
+                root.addHandler(handler)
+            root.setLevel(saved_level)
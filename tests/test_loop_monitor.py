@@ -0,0 +1,59 @@
+"""
+Tests for the event loop lag monitor (loop_monitor.py).
+"""
+
+import asyncio
+import time
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+def block_the_loop(seconds):
+    time.sleep(seconds)
+
+
+class TestLoopLagMonitor:
+    """Test cases for LoopLagMonitor."""
+
+    def test_percentiles(self):
+        """Test lag percentiles are reported in milliseconds."""
+        from loop_monitor import LoopLagMonitor, percentile
+
+        assert percentile([], 0.5) == 0.0
+        assert percentile([3, 1, 2, 4], 0.5) == 2
+
+        monitor = LoopLagMonitor(slow_threshold=10)
+        for lag in range(1, 101):
+            monitor.record(lag / 1000)
+
+        assert monitor.percentiles() == {"p50": 50.0, "p95": 95.0, "p99": 99.0, "max": 100.0}
+
+    def test_only_the_slowest_stalls_are_kept(self):
+        """Test stalls above the threshold are kept, slowest first."""
+        from loop_monitor import LoopLagMonitor
+
+        monitor = LoopLagMonitor(slow_threshold=0.1, keep_slowest=2)
+        for lag in (0.05, 0.3, 0.2, 0.5):
+            monitor.record(lag)
+
+        assert [lag for lag, _, _ in monitor.slowest()] == [0.5, 0.3]
+
+    @pytest.mark.asyncio
+    async def test_blocking_code_is_captured(self):
+        """Test the watchdog captures the stack of code that blocks the loop."""
+        from loop_monitor import LoopLagMonitor
+
+        monitor = LoopLagMonitor(interval=0.01, slow_threshold=0.05)
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.05)
+        block_the_loop(0.3)
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        lag, _, stack = monitor.slowest()[0]
+        assert lag >= 0.2
+        assert "block_the_loop" in stack
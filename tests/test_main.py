@@ -2,6 +2,7 @@
 Tests for the main module (main.py).
 """
 
+import asyncio
 import pytest
 from unittest.mock import Mock, AsyncMock, patch
 import discord
@@ -77,6 +78,38 @@ class TestBotEvents:
         finally:
             main.bot = original_bot
 
+    @patch('main.register_db')
+    @patch('main.observe_message')
+    @patch('main.stats_db')
+    @pytest.mark.asyncio
+    async def test_on_message_through_pipeline(self, mock_stats_db, mock_observe_message, mock_register_db):
+        """Test on_message queues the message and the statistics write when the pipeline runs."""
+        import main
+        from pipeline import EventPipeline
+
+        message = Mock(spec=discord.Message)
+        message.author = Mock(spec=discord.User)
+        message.author.bot = False
+        message.channel = Mock(id=987654321)
+
+        bot = Mock(spec=commands.Bot)
+        bot.process_commands = AsyncMock()
+
+        original_bot, original_pipeline = main.bot, main.event_pipeline
+        main.bot = bot
+        main.event_pipeline = EventPipeline()
+        main.event_pipeline.start()
+
+        try:
+            await main.on_message(message)
+            await main.event_pipeline.stop()
+
+            mock_register_db.assert_called_once_with(message)
+            mock_observe_message.assert_called_once_with(message)
+            mock_stats_db.increment_message_count.assert_called_once()
+        finally:
+            main.bot, main.event_pipeline = original_bot, original_pipeline
+
     @patch('main.observe_reaction')
     @patch('main.logger')
     @pytest.mark.asyncio
@@ -361,3 +394,238 @@ class TestBotInitialization:
             importlib.reload(main)
             
             mock_stats_import.assert_called_once()
+
+
+class TestUserCountUpdate:
+    """Test cases for the user count update task."""
+
+    @patch('main.stats_db')
+    @patch('main.member_counter')
+    @pytest.mark.asyncio
+    async def test_user_count_update_task_reports_running_total(self, mock_counter, mock_stats_db):
+        """Test user_count_update_task reports the running count after a resync."""
+        import main
+
+        mock_counter.total = 42
+        bot = Mock(spec=commands.Bot)
+        bot.guilds = []
+        original_bot = main.bot
+        main.bot = bot
+
+        try:
+            await main.user_count_update_task()
+
+            mock_counter.resync.assert_called_once_with([])
+            mock_stats_db.update_user_count.assert_called_once_with(42)
+        finally:
+            main.bot = original_bot
+
+    @patch('main.permission_cache')
+    @patch('main.member_counter')
+    @pytest.mark.asyncio
+    async def test_on_member_join_and_remove(self, mock_counter, mock_permission_cache):
+        """Test member events are forwarded to the counter and drop cached permissions."""
+        import main
+
+        member = Mock(spec=discord.Member)
+        member.id = 2
+
+        await main.on_member_join(member)
+        await main.on_member_remove(member)
+
+        mock_counter.member_join.assert_called_once_with(member)
+        mock_counter.member_remove.assert_called_once_with(member)
+        assert mock_permission_cache.invalidate_member.call_count == 2
+        mock_permission_cache.invalidate_member.assert_called_with(2)
+
+    @pytest.mark.asyncio
+    async def test_role_events_forget_unreachable_permissions(self):
+        """Test role changes drop the permission entries that would filter mentions."""
+        import main
+        from unreachable import PERMISSION, unreachable
+
+        role = Mock(spec=discord.Role)
+        role.guild = Mock(id=1)
+
+        unreachable.mark(PERMISSION, (10, 2))
+        await main.on_guild_role_update(role, role)
+        assert not unreachable.is_unreachable(PERMISSION, (10, 2))
+
+        unreachable.mark(PERMISSION, (10, 2))
+        await main.on_guild_role_delete(role)
+        assert not unreachable.is_unreachable(PERMISSION, (10, 2))
+
+
+class TestShutdown:
+    """Test cases for the graceful shutdown."""
+
+    @patch('main.bot')
+    @patch('main.send_reminders_task')
+    @patch('main.user_count_update_task')
+    @patch('main.metrics_report_task')
+    @patch('main.snapshot_task')
+    @pytest.mark.asyncio
+    async def test_shutdown_stops_intake_and_closes_gateway(self, mock_snapshot_task, mock_metrics_task, mock_user_count_task, mock_sweep_task, mock_bot):
+        """Test a shutdown ignores new events, drains the pipeline and closes the bot once."""
+        import main
+        from pipeline import EventPipeline
+
+        mock_bot.close = AsyncMock()
+        original_pipeline = main.event_pipeline
+        main.event_pipeline = EventPipeline()
+        main.sweep_lock = asyncio.Lock()
+        try:
+            await main.shutdown("SIGTERM")
+            await main.shutdown("SIGTERM")
+
+            message = Mock(spec=discord.Message)
+            message.author = Mock(bot=False)
+            with patch('main.handle_message') as mock_handle_message:
+                await main.on_message(message)
+            mock_handle_message.assert_not_called()
+            mock_sweep_task.cancel.assert_called_once()
+            mock_bot.close.assert_awaited_once()
+        finally:
+            main.event_pipeline = original_pipeline
+            main.shutting_down = False
+            main.shutdown_deadline = None
+
+    @patch('main.save_snapshot', new_callable=AsyncMock, return_value=3)
+    @patch('main.reminder_outbox')
+    @patch('main.persist_reminders')
+    @patch('main.reminder_grace')
+    @patch('main.config')
+    @pytest.mark.asyncio
+    async def test_flush_state_reports_what_was_flushed(self, mock_config, mock_grace, mock_persist, mock_outbox, mock_save_snapshot):
+        """Test held reminders, outbox writes and the snapshot are flushed and counted."""
+        import main
+
+        mock_config.SHUTDOWN_TIMEOUT = 5
+        mock_config.SNAPSHOT_INTERVAL = 300
+        mock_grace.pop_all.return_value = [(1, 2, 3, {})]
+        mock_outbox.flush = AsyncMock(return_value=7)
+        grace_worker, outbox_worker = Mock(), Mock()
+        try:
+            flushed = await main.flush_state(grace_worker, outbox_worker)
+        finally:
+            main.shutdown_deadline = None
+
+        assert flushed == {"events": 0, "grace": 1, "outbox": 7, "snapshot": 3}
+        grace_worker.cancel.assert_called_once()
+        mock_persist.assert_called_once_with([(1, 2, 3, {})])
+        mock_outbox.close.assert_called_once()
+
+
+    @patch('main.reminder_outbox')
+    @patch('main.persist_reminders')
+    @patch('main.reminder_grace')
+    @patch('main.config')
+    @pytest.mark.asyncio
+    async def test_flush_state_persists_off_the_loop_within_the_deadline(self, mock_config, mock_grace, mock_persist, mock_outbox):
+        """Test held reminders are written in a thread without the outbox, and a slow write does not hold up the exit."""
+        import main
+        import threading
+
+        mock_config.SHUTDOWN_TIMEOUT = 0.05
+        mock_config.SNAPSHOT_INTERVAL = 0
+        mock_outbox.is_open = False
+        mock_grace.pop_all.return_value = [(1, 2, 3, {})]
+        release = threading.Event()
+        mock_persist.side_effect = lambda held: release.wait(5)
+        try:
+            flushed = await main.flush_state(Mock(), None)
+        finally:
+            release.set()
+            main.shutdown_deadline = None
+
+        mock_persist.assert_called_once_with([(1, 2, 3, {})])
+        assert flushed["grace"] == 0
+
+    @patch('main.shutdown', new_callable=AsyncMock)
+    @pytest.mark.asyncio
+    async def test_signal_shutdown_task_is_kept(self, mock_shutdown):
+        """Test the task started by a signal handler is referenced until it is done."""
+        import main
+
+        main.start_shutdown_task("SIGTERM")
+        assert len(main.shutdown_tasks) == 1
+        await asyncio.gather(*main.shutdown_tasks)
+        await asyncio.sleep(0)
+
+        mock_shutdown.assert_awaited_once_with("SIGTERM")
+        assert not main.shutdown_tasks
+
+class TestLoadPendingReminders:
+    """Test cases for reading the pending reminders at startup."""
+
+    @patch('main.now_ms', return_value=10 ** 13)
+    @patch('main.reminder_db')
+    @patch('main.read_snapshot')
+    @patch('main.config')
+    @pytest.mark.asyncio
+    async def test_snapshot_reminders_deleted_since_are_dropped(self, mock_config, mock_read_snapshot, mock_reminder_db, mock_now_ms):
+        """Test reminders deleted after the snapshot was written are not restored, without reading the others."""
+        import main
+        from snowflake import snowflake_time_ms
+
+        mock_config.SNAPSHOT_INTERVAL = 300
+        mock_config.SNAPSHOT_RECONCILE_MARGIN = 600
+        mock_config.TOMBSTONE_RETENTION = 3600
+        kept = {'message_id': 1379235275745656994, 'channel_id': 10, 'mentioned_user_id': 222, 'due_at': 100}
+        reacted = {'message_id': 1379235275745656995, 'channel_id': 10, 'mentioned_user_id': 333, 'due_at': 100}
+        replied = {'message_id': 1379235275745656996, 'channel_id': 20, 'mentioned_user_id': 222, 'due_at': 100}
+        created = {'message_id': 1379235275745656997, 'channel_id': 10, 'mentioned_user_id': 222, 'due_at': 200}
+        mock_read_snapshot.return_value = (10 ** 13 - 1000, [kept, reacted, replied])
+        mock_reminder_db.get_reminders_created_since.return_value = [created]
+        mock_reminder_db.get_reminders_deleted_since.return_value = [
+            {'message_id': reacted['message_id'], 'mentioned_user_id': 333, 'deleted_at': 10 ** 13 - 500},
+            {'channel_id': 20, 'mentioned_user_id': 222, 'deleted_at': snowflake_time_ms(replied['message_id']) + 1},
+        ]
+        mock_reminder_db.prune_tombstones.return_value = 0
+
+        reminders = await main.read_pending_reminders()
+
+        assert reminders == [kept, created]
+        mock_reminder_db.get_pending_reminders.assert_not_called()
+        mock_reminder_db.prune_tombstones.assert_called_once_with(10 ** 13 - 3600 * 1000)
+
+    @patch('main.now_ms', return_value=10 ** 13)
+    @patch('main.reminder_db')
+    @patch('main.read_snapshot')
+    @patch('main.config')
+    @pytest.mark.asyncio
+    async def test_snapshot_older_than_tombstones_is_not_used(self, mock_config, mock_read_snapshot, mock_reminder_db, mock_now_ms):
+        """Test a snapshot whose deletes may no longer be recorded is replaced by a full read."""
+        import main
+
+        mock_config.SNAPSHOT_INTERVAL = 300
+        mock_config.SNAPSHOT_RECONCILE_MARGIN = 600
+        mock_config.TOMBSTONE_RETENTION = 3600
+        mock_read_snapshot.return_value = (10 ** 13 - 3600 * 1000, [{'message_id': 1, 'channel_id': 10, 'mentioned_user_id': 222}])
+        mock_reminder_db.get_pending_reminders.return_value = []
+
+        assert await main.read_pending_reminders() == []
+        mock_reminder_db.get_reminders_created_since.assert_not_called()
+
+    @patch('main.read_pending_reminders', new_callable=AsyncMock, return_value=[])
+    @patch('main.change_feed')
+    @patch('main.reminder_outbox')
+    @patch('main.config')
+    @pytest.mark.asyncio
+    async def test_change_feed_timeout_falls_back_to_reading(self, mock_config, mock_outbox, mock_change_feed, mock_read):
+        """Test a change feed whose first delivery never comes is stopped and the reminders are read instead."""
+        import main
+
+        mock_config.CHANGE_FEED_ENABLED = True
+        mock_config.CHANGE_FEED_START_TIMEOUT = 0.01
+        mock_config.REMINDER_SWEEP_SOURCE = "firestore"
+        mock_config.STILL_WAITING_LOAD_ON_START = True
+        mock_outbox.is_open = False
+        mock_change_feed.start.return_value = asyncio.get_running_loop().create_future()
+
+        with patch('main.pending_index') as mock_index:
+            await main.load_pending_reminders()
+
+        mock_change_feed.stop.assert_called_once()
+        mock_read.assert_awaited_once()
+        mock_index.load.assert_called_once()
@@ -0,0 +1,98 @@
+"""
+Tests for the member cache module (member_cache.py).
+"""
+
+import pytest
+from unittest.mock import Mock, AsyncMock
+import discord
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+def make_guild(guild_id, member_ids=(), chunked=False):
+    guild = Mock(spec=discord.Guild)
+    guild.id = guild_id
+    guild.chunked = chunked
+    guild.me = None
+    members = {}
+    for member_id in member_ids:
+        member = Mock(spec=discord.Member)
+        member.id = member_id
+        member.guild = guild
+        members[member_id] = member
+    guild.members = list(members.values())
+    guild.get_member = Mock(side_effect=members.get)
+    guild.chunk = AsyncMock()
+    return guild
+
+
+class TestGuildChunkCache:
+    """Test cases for GuildChunkCache."""
+
+    @pytest.mark.asyncio
+    async def test_ensure_chunked_chunks_once(self):
+        """Test a guild is chunked on first use and not again while cached."""
+        from member_cache import GuildChunkCache
+
+        cache = GuildChunkCache(max_guilds=2)
+        guild = make_guild(1)
+
+        await cache.ensure_chunked(guild)
+        await cache.ensure_chunked(guild)
+
+        guild.chunk.assert_called_once_with(cache=True)
+        assert len(cache) == 1
+
+    @pytest.mark.asyncio
+    async def test_ensure_chunked_skips_already_chunked_guild(self):
+        """Test a guild that is already chunked is not requested again."""
+        from member_cache import GuildChunkCache
+
+        cache = GuildChunkCache(max_guilds=2)
+        guild = make_guild(1, chunked=True)
+
+        await cache.ensure_chunked(guild)
+
+        guild.chunk.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction_keeps_seen_members(self):
+        """Test the least recently used guild drops only members cached by the chunk."""
+        from member_cache import GuildChunkCache
+
+        cache = GuildChunkCache(max_guilds=1)
+        guild1 = make_guild(1, member_ids=[10, 11])
+        guild2 = make_guild(2)
+
+        # Member 10 was seen before the guild was chunked
+        cache.remember_member(guild1.members[0])
+
+        await cache.ensure_chunked(guild1)
+        await cache.ensure_chunked(guild2)
+
+        guild1._remove_member.assert_called_once_with(guild1.members[1])
+        assert len(cache) == 1
+
+    def test_remember_member_adds_uncached_member(self):
+        """Test a seen member that is not cached yet is added to the guild cache."""
+        from member_cache import GuildChunkCache
+
+        cache = GuildChunkCache(max_guilds=1)
+        guild = make_guild(1)
+        member = Mock(spec=discord.Member)
+        member.id = 10
+        member.guild = guild
+
+        cache.remember_member(member)
+
+        guild._add_member.assert_called_once_with(member)
+
+    def test_remember_member_ignores_users(self):
+        """Test users outside of guilds are ignored."""
+        from member_cache import GuildChunkCache
+
+        cache = GuildChunkCache(max_guilds=1)
+        cache.remember_member(Mock(spec=discord.User))
+
+        assert len(cache) == 0
@@ -0,0 +1,99 @@
+"""
+Tests for the member count module (member_count.py).
+"""
+
+import pytest
+from unittest.mock import Mock
+import discord
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+def make_member(guild, bot=False):
+    member = Mock(spec=discord.Member)
+    member.bot = bot
+    member.guild = guild
+    return member
+
+
+def make_guild(guild_id, humans, bots):
+    guild = Mock(spec=discord.Guild)
+    guild.id = guild_id
+    guild.members = [make_member(guild) for _ in range(humans)] + [make_member(guild, bot=True) for _ in range(bots)]
+    guild.member_count = humans + bots
+    return guild
+
+
+class TestHumanMemberCounter:
+    """Test cases for HumanMemberCounter."""
+
+    def test_reset_counts_humans_only(self):
+        """Test reset counts human members across guilds."""
+        from member_count import HumanMemberCounter
+
+        counter = HumanMemberCounter()
+        counter.reset([make_guild(1, 3, 1), make_guild(2, 5, 2)])
+
+        assert counter.total == 8
+        assert counter.guild_count(1) == 3
+        assert counter.guild_count(2) == 5
+
+    def test_member_join_and_remove(self):
+        """Test member events update the running total."""
+        from member_count import HumanMemberCounter
+
+        guild = make_guild(1, 2, 0)
+        counter = HumanMemberCounter()
+        counter.add_guild(guild)
+
+        counter.member_join(make_member(guild))
+        counter.member_join(make_member(guild, bot=True))
+        assert counter.total == 3
+
+        counter.member_remove(make_member(guild))
+        counter.member_remove(make_member(guild, bot=True))
+        assert counter.total == 2
+
+    def test_remove_guild(self):
+        """Test removing a guild drops its members from the total."""
+        from member_count import HumanMemberCounter
+
+        guild1 = make_guild(1, 3, 0)
+        guild2 = make_guild(2, 4, 0)
+        counter = HumanMemberCounter()
+        counter.reset([guild1, guild2])
+
+        counter.remove_guild(guild1)
+
+        assert counter.total == 4
+        assert counter.guild_count(1) == 0
+
+    def test_resync_skips_guilds_in_step(self):
+        """Test resync does not walk members of guilds whose size matches."""
+        from member_count import HumanMemberCounter
+
+        guild = make_guild(1, 3, 1)
+        counter = HumanMemberCounter()
+        counter.add_guild(guild)
+
+        # Members change without events, but member_count is unchanged
+        guild.members = []
+
+        assert counter.resync([guild]) == 0
+        assert counter.total == 3
+
+    def test_resync_recounts_drifted_and_drops_missing_guilds(self):
+        """Test resync recounts drifted guilds and drops guilds no longer present."""
+        from member_count import HumanMemberCounter
+
+        guild1 = make_guild(1, 3, 0)
+        guild2 = make_guild(2, 4, 0)
+        counter = HumanMemberCounter()
+        counter.reset([guild1, guild2])
+
+        drifted = make_guild(1, 6, 1)
+
+        assert counter.resync([drifted]) == 1
+        assert counter.total == 6
+        assert counter.guild_count(2) == 0
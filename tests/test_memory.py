@@ -0,0 +1,158 @@
+"""
+Tests for the memory report and budget (memory.py).
+"""
+
+import os
+import sys
+from collections import deque
+from unittest.mock import Mock, patch
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+def make_bot(messages):
+    bot = Mock()
+    bot.guilds = []
+    bot.users = []
+    bot.get_all_members = Mock(side_effect=lambda: iter([]))
+    bot._connection._messages = deque(messages, maxlen=1000)
+    bot._connection.max_messages = 1000
+    bot.cached_messages = bot._connection._messages
+    return bot
+
+
+class TestApproxSize:
+    """Test cases for the size estimates."""
+
+    def test_counts_contents_but_not_shared_models(self):
+        """Test an object's own data is counted, and other discord.py models are not."""
+        from memory import approx_size
+
+        class Model:
+            def __init__(self, content, guild):
+                self.content = content
+                self.guild = guild
+
+        guild = Mock(_state=object(), payload="x" * 100_000)
+        small = approx_size(Model("hi", guild))
+        large = approx_size(Model("x" * 10_000, guild))
+
+        assert large - small >= 10_000 - 2
+        assert small < 1000
+
+    def test_reminder_index_memory_grows_with_reminders(self):
+        """Test the reminder index reports memory in proportion to its reminders."""
+        from pending import PendingReminderIndex
+        from records import ReminderRecord
+
+        index = PendingReminderIndex()
+        empty = index.memory_bytes()
+        for message_id in range(1000):
+            index.add(ReminderRecord(message_id, 10, 20, due_at=0, guild_id=1, author_id=2))
+
+        assert index.memory_bytes() - empty > 1000 * 100
+
+
+    @patch('memory.config')
+    def test_presences_are_estimated_from_a_sample(self, mock_config):
+        """Test the presence count is extrapolated from a sample instead of checking every member."""
+        import memory
+
+        mock_config.PRESENCE_INTENT = True
+        online = Mock(activities=(), raw_status="online")
+        offline = Mock(activities=(), raw_status="offline")
+        members = [online, offline] * (memory.PRESENCE_SAMPLE_SIZE * 5)
+        bot = make_bot([])
+        bot.guilds = [Mock(members=members, channels=[], threads=[], roles=[])]
+        checked = []
+        bot.get_all_members = Mock(side_effect=lambda: (checked.append(member) or member for member in members))
+
+        usage = memory.cache_usage(bot)
+
+        assert usage["presences"][0] == len(members) // 2
+        assert len(checked) <= memory.PRESENCE_SAMPLE_SIZE + memory.SAMPLE_SIZE
+
+class TestMemoryBudget:
+    """Test cases for MemoryBudget."""
+
+    @patch('memory.config')
+    @patch('memory.current_rss', return_value=100 * 1024 * 1024)
+    def test_report_under_budget(self, mock_rss, mock_config):
+        """Test every cache is reported and nothing is trimmed under the budget."""
+        from memory import MemoryBudget
+
+        bot = make_bot(["message"] * 10)
+
+        usage = MemoryBudget(200, evict=True).check(bot)
+
+        assert set(usage) == {"members", "users", "presences", "guilds", "messages", "reminder index", "permissions"}
+        assert usage["messages"][0] == 10
+        assert len(bot._connection._messages) == 10
+
+    @patch('memory.permission_cache')
+    @patch('memory.config')
+    @patch('memory.current_rss')
+    def test_trim_toward_the_budget_and_restore(self, mock_rss, mock_config, mock_permission_cache, caplog):
+        """Test the message cache is cut by the excess once, and its limit is restored back under the budget."""
+        from memory import MemoryBudget
+
+        mock_config.LOW_MEMORY_MODE = False
+        mock_permission_cache.__len__ = Mock(return_value=0)
+        mock_permission_cache.memory_bytes.return_value = 0
+        # 1000 messages of about 100 KiB each
+        bot = make_bot(["x" * 100 * 1024] * 1000)
+        budget = MemoryBudget(200, evict=True)
+
+        # 50 MiB over 80% of the budget is about 500 messages
+        mock_rss.return_value = 210 * 1024 * 1024
+        budget.check(bot)
+        trimmed = bot._connection._messages.maxlen
+        assert 450 < trimmed < 550
+        mock_permission_cache.clear.assert_called_once()
+        assert "over the memory budget" in caplog.text
+
+        # RSS stays up after the trim, which is not a reason to trim again
+        budget.check(bot)
+        assert bot._connection._messages.maxlen == trimmed
+
+        mock_rss.return_value = 150 * 1024 * 1024
+        budget.check(bot)
+        assert bot._connection.max_messages == 1000
+        assert bot._connection._messages.maxlen == 1000
+        assert not budget.is_trimmed
+
+    @patch('memory.member_cache')
+    @patch('memory.permission_cache')
+    @patch('memory.config')
+    @patch('memory.current_rss', return_value=1024 * 1024 * 1024)
+    def test_trim_stops_at_the_floor(self, mock_rss, mock_config, mock_permission_cache, mock_member_cache):
+        """Test repeated trims never take a cache below a quarter of its configured limit."""
+        from memory import MemoryBudget
+
+        mock_config.LOW_MEMORY_MODE = True
+        mock_permission_cache.__len__ = Mock(return_value=0)
+        mock_permission_cache.memory_bytes.return_value = 0
+        mock_member_cache.max_guilds = 8
+        mock_member_cache.__len__ = Mock(side_effect=lambda: mock_member_cache.max_guilds)
+        mock_member_cache.shrink.side_effect = lambda max_guilds: setattr(mock_member_cache, "max_guilds", max_guilds)
+        bot = make_bot(["x" * 100 * 1024] * 1000)
+        budget = MemoryBudget(200, evict=True)
+
+        for rss_mb in (1000, 1100, 1200, 1300):
+            mock_rss.return_value = rss_mb * 1024 * 1024
+            budget.check(bot)
+
+        assert bot._connection._messages.maxlen == 250
+        assert mock_member_cache.max_guilds == 2
+
+    @patch('memory.config')
+    @patch('memory.current_rss', return_value=300 * 1024 * 1024)
+    def test_warn_only(self, mock_rss, mock_config, caplog):
+        """Test nothing is trimmed over the budget unless eviction is enabled."""
+        from memory import MemoryBudget
+
+        bot = make_bot(range(100))
+
+        MemoryBudget(200).check(bot)
+
+        assert len(bot._connection._messages) == 100
+        assert "over the memory budget" in caplog.text
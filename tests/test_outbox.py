@@ -0,0 +1,179 @@
+"""
+Tests for the outbox module (outbox.py).
+"""
+
+import pytest
+from unittest.mock import Mock
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+class TestOutbox:
+    """Test cases for Outbox."""
+
+    def test_append_requires_open_log(self, tmp_path):
+        """Test the outbox is only used once opened."""
+        from outbox import Outbox
+
+        outbox = Outbox(str(tmp_path / "outbox.log"), Mock())
+        assert outbox.is_open is False
+
+        assert outbox.open() == 0
+        assert outbox.is_open is True
+
+    def test_append_rejects_unknown_operation(self, tmp_path):
+        """Test unknown operations are rejected before they reach the log."""
+        from outbox import Outbox
+
+        outbox = Outbox(str(tmp_path / "outbox.log"), Mock())
+        outbox.open()
+
+        with pytest.raises(ValueError):
+            outbox.append("rename", message_id=1)
+        assert len(outbox) == 0
+
+    @pytest.mark.asyncio
+    async def test_flush_applies_writes_in_batches(self, tmp_path):
+        """Test pending writes are applied in order and in batches."""
+        from outbox import Outbox
+
+        backend = Mock()
+        outbox = Outbox(str(tmp_path / "outbox.log"), backend, batch_size=2)
+        outbox.open()
+
+        outbox.append("save", message_id=1, channel_id=2, mentioned_user_id=3)
+        outbox.append("delete_replied", channel_id=2, user_id=3)
+        outbox.append("delete_reacted", message_id=1, user_id=4)
+
+        assert await outbox.flush() == 3
+        assert backend.apply_writes.call_count == 2
+        assert backend.apply_writes.call_args_list[0][0][0] == [
+            ("save", {"message_id": 1, "channel_id": 2, "mentioned_user_id": 3}),
+            ("delete_replied", {"channel_id": 2, "user_id": 3}),
+        ]
+        assert len(outbox) == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_stays_pending(self, tmp_path):
+        """Test a batch that fails in the backend is kept for the next attempt."""
+        from outbox import Outbox
+
+        backend = Mock()
+        backend.apply_writes.side_effect = Exception("Backend unavailable")
+        outbox = Outbox(str(tmp_path / "outbox.log"), backend)
+        outbox.open()
+        outbox.append("save", message_id=1, channel_id=2, mentioned_user_id=3)
+
+        with pytest.raises(Exception):
+            await outbox.drain_once()
+
+        assert len(outbox) == 1
+
+    @pytest.mark.asyncio
+    async def test_open_replays_writes_not_drained(self, tmp_path):
+        """Test writes that were not drained before a restart are replayed."""
+        from outbox import Outbox
+
+        path = str(tmp_path / "outbox.log")
+        outbox = Outbox(path, Mock(), batch_size=1)
+        outbox.open()
+        outbox.append("save", message_id=1, channel_id=2, mentioned_user_id=3)
+        outbox.append("save", message_id=4, channel_id=2, mentioned_user_id=3)
+        await outbox.drain_once()
+        outbox.close()
+
+        # Simulate a crash in the middle of an append
+        with open(path, "a", encoding="utf-8") as log:
+            log.write('{"seq": 3, "op": "sa')
+
+        restarted = Outbox(path, Mock())
+        assert restarted.open() == 1
+
+        restarted.append("delete_reacted", message_id=4, user_id=3)
+        await restarted.flush()
+        writes = restarted.backend.apply_writes.call_args[0][0]
+        assert [args["message_id"] for _, args in writes] == [4, 4]
+
+    @pytest.mark.asyncio
+    async def test_log_is_truncated_when_drained(self, tmp_path):
+        """Test the log starts over once every write has been drained."""
+        from outbox import Outbox
+
+        path = tmp_path / "outbox.log"
+        outbox = Outbox(str(path), Mock())
+        outbox.open()
+        outbox.append("save", message_id=1, channel_id=2, mentioned_user_id=3)
+
+        await outbox.flush()
+
+        assert path.read_text() == ""
+
+    @pytest.mark.asyncio
+    async def test_log_is_compacted_under_steady_traffic(self, tmp_path):
+        """Test drained writes are dropped from the log even if it is never empty."""
+        from outbox import Outbox
+
+        path = tmp_path / "outbox.log"
+        outbox = Outbox(str(path), Mock(), batch_size=1, compact_after=10)
+        outbox.open()
+        outbox.append("delete_replied", channel_id=1, user_id=0)
+        for user_id in range(1, 100):
+            outbox.append("delete_replied", channel_id=1, user_id=user_id)
+            await outbox.drain_once()
+
+        assert len(outbox) == 1
+        assert len(path.read_text().splitlines()) <= 2 * 10 + 1
+        outbox.close()
+        restarted = Outbox(str(path), Mock())
+        assert restarted.open() == 1
+
+    @pytest.mark.asyncio
+    async def test_rejected_write_moves_to_dead_letter_file(self, tmp_path):
+        """Test a write the backend keeps rejecting is set aside and the writes behind it go through."""
+        import asyncio
+        import json
+        from outbox import Outbox
+
+        applied = []
+
+        def apply_writes(writes):
+            if any(args["message_id"] == 2 for _, args in writes):
+                raise ValueError("Invalid document")
+            applied.extend(args["message_id"] for _, args in writes)
+
+        backend = Mock()
+        backend.apply_writes.side_effect = apply_writes
+        path = tmp_path / "outbox.log"
+        outbox = Outbox(str(path), backend, flush_interval=0.01, max_attempts=1)
+        outbox.open()
+        for message_id in (1, 2, 3):
+            outbox.append("save", message_id=message_id, channel_id=2, mentioned_user_id=3)
+
+        worker = asyncio.create_task(outbox.run())
+        for _ in range(100):
+            if not len(outbox):
+                break
+            await asyncio.sleep(0.01)
+        worker.cancel()
+
+        assert applied == [1, 3]
+        dead = [json.loads(line) for line in open(f"{path}.dead")]
+        assert [record["args"]["message_id"] for record in dead] == [2]
+        assert "Invalid document" in dead[0]["error"]
+        assert path.read_text() == ""
+
+    @pytest.mark.asyncio
+    async def test_outage_is_not_counted_as_an_attempt(self, tmp_path):
+        """Test writes are kept while the backend is unavailable, however long it takes."""
+        from google.api_core import exceptions
+        from outbox import Outbox
+
+        outbox = Outbox(str(tmp_path / "outbox.log"), Mock(), max_attempts=1)
+        outbox.open()
+        outbox.append("save", message_id=1, channel_id=2, mentioned_user_id=3)
+
+        for _ in range(3):
+            assert await outbox._handle_failure(exceptions.ServiceUnavailable("Backend unavailable")) is False
+
+        assert len(outbox) == 1
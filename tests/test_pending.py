@@ -0,0 +1,83 @@
+"""
+Tests for the pending reminder index (pending.py).
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+def make_reminder(message_id, mentioned_user_id, author_id=111, channel_id=100, guild_id=1, due_at=None):
+    from records import ReminderRecord
+    return ReminderRecord(
+        message_id=message_id,
+        channel_id=channel_id,
+        guild_id=guild_id,
+        author_id=author_id,
+        mentioned_user_id=mentioned_user_id,
+        due_at=due_at if due_at is not None else message_id,
+    )
+
+
+class TestPendingReminderIndex:
+    """Test cases for PendingReminderIndex."""
+
+    def test_incoming_and_outgoing_are_scoped_by_guild(self):
+        """Test a user sees only the reminders of the guild, sorted by due time."""
+        from pending import PendingReminderIndex
+
+        index = PendingReminderIndex()
+        index.add(make_reminder(2, 222))
+        index.add(make_reminder(1, 222))
+        index.add(make_reminder(3, 222, guild_id=2))
+
+        assert [r.message_id for r in index.incoming(1, 222)] == [1, 2]
+        assert [r.message_id for r in index.outgoing(1, 111)] == [1, 2]
+        assert index.incoming(1, 111) == []
+
+    def test_reply_removes_reminders_in_channel(self):
+        """Test a message in the channel removes the author's reminders there only."""
+        from pending import PendingReminderIndex
+
+        index = PendingReminderIndex()
+        index.add(make_reminder(1, 222))
+        index.add(make_reminder(2, 222, channel_id=200))
+
+        assert index.remove_replied(100, 222) == 1
+        assert [r.message_id for r in index.incoming(1, 222)] == [2]
+        assert [r.message_id for r in index.outgoing(1, 111)] == [2]
+
+    def test_remove_and_forget_guild(self):
+        """Test reminders are dropped after a reaction and when the bot leaves a guild."""
+        from pending import PendingReminderIndex
+
+        index = PendingReminderIndex()
+        index.add(make_reminder(1, 222))
+        index.add(make_reminder(2, 333, guild_id=2))
+
+        assert index.remove(1, 222) is True
+        assert index.remove(1, 222) is False
+        index.forget_guild(2)
+
+        assert len(index) == 0
+        assert index.outgoing(2, 111) == []
+
+    def test_load_resolves_legacy_reminders(self):
+        """Test stored reminders without a guild or author are still indexed."""
+        from pending import PendingReminderIndex
+
+        index = PendingReminderIndex()
+        loaded = index.load(
+            [
+                {"message_id": 1, "channel_id": 100, "mentioned_user_id": 222, "due_at": 5, "guild_id": 1, "author_id": 111},
+                {"message_id": 2, "channel_id": 100, "mentioned_user_id": 222},
+                {"message_id": 3, "channel_id": 999, "mentioned_user_id": 222},
+            ],
+            guild_of=lambda channel_id: 1 if channel_id == 100 else None,
+        )
+
+        assert loaded == 2
+        incoming = index.incoming(1, 222)
+        assert [r.message_id for r in incoming] == [1, 2]
+        assert incoming[1].author_id is None
+        assert [r.message_id for r in index.outgoing(1, 111)] == [1]
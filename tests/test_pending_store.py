@@ -0,0 +1,76 @@
+"""
+Tests for the array-backed pending reminder store (pending_store.py).
+"""
+
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+pytest.importorskip("numpy")
+
+
+def stored(message_id, channel_id, user_id, due_at):
+    return {"message_id": message_id, "channel_id": channel_id, "mentioned_user_id": user_id, "due_at": due_at}
+
+
+class TestArrayPendingStore:
+    """Test cases for ArrayPendingStore."""
+
+    def test_untracked_store_ignores_writes(self):
+        """Test the write path is a no-op until the store is used."""
+        from pending_store import ArrayPendingStore
+        from records import ReminderRecord
+
+        store = ArrayPendingStore()
+        store.add(ReminderRecord(1, 10, 222, 100))
+
+        assert len(store) == 0
+        assert store.due_groups(1000) == []
+
+    def test_due_groups_are_sorted_by_channel(self):
+        """Test only due reminders are returned, one group per channel, soonest first."""
+        from pending_store import ArrayPendingStore
+
+        store = ArrayPendingStore(initial_capacity=2)
+        store.load([
+            stored(1, 20, 222, 300),
+            stored(2, 10, 222, 200),
+            stored(3, 20, 333, 100),
+            stored(4, 10, 333, 5000),
+        ])
+
+        groups = store.due_groups(1000)
+
+        assert [[r.message_id for r in group] for group in groups] == [[2], [3, 1]]
+        assert len(store) == 4
+
+    def test_removals_while_loading_win(self):
+        """Test reminders answered while the stored ones are read are not loaded back."""
+        from pending_store import ArrayPendingStore
+        from records import ReminderRecord
+
+        store = ArrayPendingStore()
+        store.track()
+        store.add(ReminderRecord(5, 10, 222, 100))
+        store.remove(1, 222)
+        store.remove_replied(20, 333)
+
+        store.load([stored(1, 10, 222, 100), stored(2, 20, 333, 100), stored(3, 20, 444, 100)])
+
+        assert sorted(r.message_id for group in store.due_groups(1000) for r in group) == [3, 5]
+
+    def test_removed_rows_are_compacted(self):
+        """Test removed reminders are dropped from the columns once half are dead."""
+        from pending_store import ArrayPendingStore
+
+        store = ArrayPendingStore(initial_capacity=4)
+        store.load([stored(i, 10, 222, i) for i in range(8)])
+
+        for message_id in range(5):
+            store.remove(message_id, 222)
+
+        assert store._size == 3
+        assert [r.message_id for r in store.due_groups(1000)[0]] == [5, 6, 7]
+        assert store.remove_replied(10, 222) == 3
+        assert store.due_groups(1000) == []
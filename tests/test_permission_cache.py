@@ -0,0 +1,89 @@
+"""
+Tests for the channel permission cache (permission_cache.py).
+"""
+
+import pytest
+import discord
+import sys
+import os
+from unittest.mock import Mock
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+def make_channel(channel_id, guild_id=1, spec=discord.TextChannel, parent_id=None):
+    channel = Mock(spec=spec)
+    channel.id = channel_id
+    channel.guild = Mock(spec=discord.Guild)
+    channel.guild.id = guild_id
+    if parent_id is not None:
+        channel.parent_id = parent_id
+    channel.permissions_for.return_value = discord.Permissions(read_messages=True, send_messages=True)
+    return channel
+
+
+def make_member(member_id):
+    member = Mock(spec=discord.Member)
+    member.id = member_id
+    return member
+
+
+class TestChannelPermissionCache:
+    """Test cases for ChannelPermissionCache."""
+
+    def test_permissions_are_resolved_once(self):
+        """Test repeated checks reuse the resolved permissions."""
+        from permission_cache import ChannelPermissionCache
+
+        cache = ChannelPermissionCache()
+        channel = make_channel(10)
+        member = make_member(2)
+
+        assert cache.can_read(channel, member)
+        assert cache.can_send(channel, member)
+        channel.permissions_for.assert_called_once_with(member)
+
+    def test_threads_need_send_messages_in_threads(self):
+        """Test sending in a thread is checked against the thread permission."""
+        from permission_cache import ChannelPermissionCache
+
+        cache = ChannelPermissionCache()
+        thread = make_channel(11, spec=discord.Thread, parent_id=10)
+
+        assert not cache.can_send(thread, make_member(2))
+
+    def test_invalidations(self):
+        """Test overwrite, role and member updates drop the affected entries."""
+        from permission_cache import ChannelPermissionCache
+
+        cache = ChannelPermissionCache()
+        channel = make_channel(10, guild_id=1)
+        thread = make_channel(11, guild_id=1, spec=discord.Thread, parent_id=10)
+        other = make_channel(20, guild_id=2)
+        member = make_member(2)
+        for target in (channel, thread, other):
+            cache.can_read(target, member)
+
+        cache.invalidate_channel(10)
+        for target in (channel, thread, other):
+            cache.can_read(target, member)
+        assert [target.permissions_for.call_count for target in (channel, thread, other)] == [2, 2, 1]
+
+        cache.invalidate_guild(2)
+        cache.invalidate_member(2)
+        cache.can_read(other, member)
+        cache.can_read(channel, member)
+        assert [target.permissions_for.call_count for target in (channel, other)] == [3, 2]
+
+    def test_least_recently_used_channel_is_evicted(self):
+        """Test at most max_channels channels are kept."""
+        from permission_cache import ChannelPermissionCache
+
+        cache = ChannelPermissionCache(max_channels=1)
+        first, second = make_channel(10), make_channel(20)
+        member = make_member(2)
+
+        cache.can_read(first, member)
+        cache.can_read(second, member)
+        cache.can_read(first, member)
+
+        assert first.permissions_for.call_count == 2
@@ -0,0 +1,108 @@
+"""
+Tests for the gateway event pipeline (pipeline.py).
+"""
+
+import asyncio
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+class TestEventPipeline:
+    """Test cases for EventPipeline."""
+
+    @pytest.mark.asyncio
+    async def test_events_with_the_same_key_are_ordered(self):
+        """Test a slow event holds back later events of its key, but not other keys."""
+        from pipeline import EventPipeline
+
+        pipeline = EventPipeline()
+        handled = []
+        release = asyncio.Event()
+
+        async def slow(name):
+            await release.wait()
+            handled.append(name)
+
+        async def fast(name):
+            handled.append(name)
+
+        await pipeline.submit(1, slow, "mention")
+        await pipeline.submit(1, fast, "reply")
+        await pipeline.submit(2, fast, "other channel")
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+        assert handled == ["other channel"]
+        assert len(pipeline) == 2
+        release.set()
+        await pipeline.stop()
+        assert handled == ["other channel", "mention", "reply"]
+        assert len(pipeline) == 0
+
+    @pytest.mark.asyncio
+    async def test_sheddable_events_are_dropped_when_full(self):
+        """Test the drop policy sheds sheddable events instead of waiting."""
+        from metrics import metrics
+        from pipeline import EventPipeline
+
+        pipeline = EventPipeline(max_pending=1)
+        release = asyncio.Event()
+
+        async def wait():
+            await release.wait()
+
+        shed_before = metrics.counters["pipeline.shed"]
+        assert await pipeline.submit(1, wait)
+        assert not await pipeline.submit("stats", wait, sheddable=True)
+        assert metrics.counters["pipeline.shed"] == shed_before + 1
+        assert metrics.gauges["pipeline.depth"] == 1
+
+        # Other events wait for room
+        waiting = asyncio.create_task(pipeline.submit(2, wait))
+        await asyncio.sleep(0)
+        assert not waiting.done()
+        release.set()
+        assert await asyncio.wait_for(waiting, 1)
+        await pipeline.stop()
+        assert "pipeline.wait_ms" in metrics.gauges
+
+    @pytest.mark.asyncio
+    async def test_handler_errors_do_not_stop_the_key(self):
+        """Test a failing handler is logged and the next event still runs."""
+        from pipeline import EventPipeline
+
+        pipeline = EventPipeline()
+        handled = []
+
+        async def fail():
+            raise ValueError("boom")
+
+        async def ok():
+            handled.append(True)
+
+        await pipeline.submit(1, fail)
+        await pipeline.submit(1, ok)
+        await pipeline.stop()
+
+        assert handled == [True]
+
+    @pytest.mark.asyncio
+    async def test_stop_cancels_after_timeout(self):
+        """Test events still running at the shutdown deadline are cancelled."""
+        from pipeline import EventPipeline
+
+        pipeline = EventPipeline()
+        pipeline.start()
+
+        async def forever():
+            await asyncio.Event().wait()
+
+        await pipeline.submit(1, forever)
+        await pipeline.submit(1, forever)
+        await pipeline.stop(timeout=0.01)
+        await asyncio.sleep(0)
+
+        assert not pipeline.is_running
+        assert len(pipeline) == 0
@@ -0,0 +1,111 @@
+"""
+Tests for the on-demand profiler (profiler.py).
+"""
+
+import asyncio
+import os
+import pytest
+import sys
+from unittest.mock import AsyncMock, Mock, patch
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+async def busy_handler(until):
+    loop = asyncio.get_running_loop()
+    while loop.time() < until:
+        sum(i * i for i in range(2000))
+        await asyncio.sleep(0)
+
+
+class TestRunProfile:
+    """Test cases for run_profile."""
+
+    @patch('profiler.config')
+    @pytest.mark.asyncio
+    async def test_profile_writes_files_and_summary(self, mock_config, tmp_path):
+        """Test a profile finds the busy code and writes CPU, wall-clock and memory files."""
+        from profiler import run_profile
+
+        mock_config.PROFILE_DIR = str(tmp_path)
+        mock_config.PROFILE_SAMPLE_INTERVAL = 0.005
+        busy = asyncio.create_task(busy_handler(asyncio.get_running_loop().time() + 0.3))
+
+        summary = await run_profile(0.3)
+        await busy
+
+        assert "busy_handler" in summary.split("Wall clock")[0] or "<genexpr>" in summary
+        assert "Allocations (growth):" in summary
+        suffixes = sorted(name.split("-", 2)[-1] for name in os.listdir(tmp_path))
+        assert suffixes == ["cpu.pstats", "memory.tracemalloc", "wall.txt"]
+
+    @patch('profiler.config')
+    @pytest.mark.asyncio
+    async def test_one_profile_at_a_time(self, mock_config, tmp_path):
+        """Test a second profile is refused while one runs."""
+        import profiler
+
+        mock_config.PROFILE_DIR = str(tmp_path)
+        mock_config.PROFILE_SAMPLE_INTERVAL = 0.01
+        profiler._profile_lock = asyncio.Lock()
+        first = asyncio.create_task(profiler.run_profile(0.1))
+        await asyncio.sleep(0)
+
+        with pytest.raises(RuntimeError):
+            await profiler.run_profile(0.1)
+        await first
+
+
+class TestProfileCommand:
+    """Test cases for the /profile command."""
+
+    @patch('profiler.run_profile')
+    @pytest.mark.asyncio
+    async def test_only_the_owner_can_profile(self, mock_run_profile):
+        """Test other users are turned away before anything is profiled."""
+        from profiler import profile
+
+        interaction = Mock()
+        interaction.client.is_owner = AsyncMock(return_value=False)
+        interaction.response.send_message = AsyncMock()
+
+        await profile(interaction, 10)
+
+        mock_run_profile.assert_not_called()
+        assert interaction.response.send_message.call_args.kwargs["ephemeral"] is True
+
+    @patch('profiler.config')
+    @patch('profiler.run_profile', new_callable=AsyncMock, return_value="CPU (own time):")
+    @pytest.mark.asyncio
+    async def test_owner_gets_the_summary(self, mock_run_profile, mock_config):
+        """Test the duration is clamped and the summary is posted back."""
+        from profiler import profile
+
+        mock_config.PROFILE_DEFAULT_SECONDS = 30
+        mock_config.PROFILE_MAX_SECONDS = 60
+        interaction = Mock()
+        interaction.client.is_owner = AsyncMock(return_value=True)
+        interaction.response.defer = AsyncMock()
+        interaction.followup.send = AsyncMock()
+
+        await profile(interaction, 600)
+
+        mock_run_profile.assert_awaited_once_with(60)
+        assert "CPU (own time):" in interaction.followup.send.call_args[0][0]
+
+    @patch('profiler.config')
+    @patch('profiler.run_profile', new_callable=AsyncMock, side_effect=PermissionError("profiles/ is read-only"))
+    @pytest.mark.asyncio
+    async def test_failed_profile_is_reported(self, mock_run_profile, mock_config):
+        """Test an error while profiling is sent as the followup of the deferred interaction."""
+        from profiler import profile
+
+        mock_config.PROFILE_DEFAULT_SECONDS = 30
+        mock_config.PROFILE_MAX_SECONDS = 60
+        interaction = Mock()
+        interaction.client.is_owner = AsyncMock(return_value=True)
+        interaction.response.defer = AsyncMock()
+        interaction.followup.send = AsyncMock()
+
+        await profile(interaction)
+
+        assert "read-only" in interaction.followup.send.call_args[0][0]
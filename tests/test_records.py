@@ -0,0 +1,34 @@
+"""
+Tests for the reminder record module (records.py).
+"""
+
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+class TestReminderRecord:
+    """Test cases for ReminderRecord."""
+
+    def test_round_trip_through_dict(self):
+        """Test a stored document converts to a record and back without unset fields."""
+        from records import ReminderRecord
+
+        data = {"message_id": 1, "channel_id": 2, "mentioned_user_id": 3, "due_at": 4, "created_at": 0}
+        record = ReminderRecord.from_dict(data)
+
+        assert record.key == (1, 3)
+        assert record.guild_id is None
+        assert record.to_dict() == {"message_id": 1, "channel_id": 2, "mentioned_user_id": 3, "due_at": 4}
+        assert record == ReminderRecord(1, 2, 3, 4)
+
+    def test_record_has_no_instance_dict(self):
+        """Test records stay compact and reject unknown attributes."""
+        from records import ReminderRecord
+
+        record = ReminderRecord(1, 2, 3)
+
+        assert not hasattr(record, "__dict__")
+        with pytest.raises(AttributeError):
+            record.content = "Hello"
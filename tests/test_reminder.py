@@ -11,6 +11,11 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 
+def deleted_keys(mock_db):
+    """Return the (message_id, mentioned_user_id) keys of the reminders deleted from the backend."""
+    return [reminder.key for call in mock_db.delete_reminders.call_args_list for reminder in call[0][0]]
+
+
 class TestSendReminders:
     """Test cases for send_reminders function."""
 
@@ -94,7 +99,7 @@ class TestSendReminders:
         bot.get_user.assert_called_with(222222222)
         channel.fetch_message.assert_called_with(123456789)
         channel.send.assert_called_once()
-        mock_db.delete_message_by_message_and_user_id.assert_called_once_with(123456789, 222222222)
+        assert deleted_keys(mock_db) == [(123456789, 222222222)]
 
     @patch('reminder.config')
     @patch('reminder.FirestoreReminderCollection')
@@ -122,7 +127,7 @@ class TestSendReminders:
         
         await send_reminders(bot)
         
-        mock_db.delete_message_by_message_and_user_id.assert_called_once_with(123456789, 222222222)
+        assert deleted_keys(mock_db) == [(123456789, 222222222)]
 
     @patch('reminder.config')
     @patch('reminder.FirestoreReminderCollection')
@@ -150,7 +155,7 @@ class TestSendReminders:
         
         await send_reminders(bot)
         
-        mock_db.delete_message_by_message_and_user_id.assert_called_once_with(123456789, 222222222)
+        assert deleted_keys(mock_db) == [(123456789, 222222222)]
 
     @patch('reminder.config')
     @patch('reminder.FirestoreReminderCollection')
@@ -184,7 +189,7 @@ class TestSendReminders:
         
         await send_reminders(bot)
         
-        mock_db.delete_message_by_message_and_user_id.assert_called_once_with(123456789, 222222222)
+        assert deleted_keys(mock_db) == [(123456789, 222222222)]
 
     @patch('reminder.config')
     @patch('reminder.FirestoreReminderCollection')
@@ -229,7 +234,7 @@ class TestSendReminders:
         
         await send_reminders(bot)
         
-        mock_db.delete_message_by_message_and_user_id.assert_called_once_with(123456789, 222222222)
+        assert deleted_keys(mock_db) == [(123456789, 222222222)]
 
     @patch('reminder.config')
     @patch('reminder.FirestoreReminderCollection')
@@ -302,7 +307,7 @@ class TestSendReminders:
         
         # Should send one message containing both reminders
         channel.send.assert_called_once()
-        assert mock_db.delete_message_by_message_and_user_id.call_count == 2
+        assert len(deleted_keys(mock_db)) == 2
 
     @patch('reminder.config')
     @patch('reminder.FirestoreReminderCollection')
@@ -356,7 +361,7 @@ class TestSendReminders:
         await send_reminders(bot)
         
         mock_logger.error.assert_called()
-        mock_db.delete_message_by_message_and_user_id.assert_called_once_with(123456789, 222222222)
+        assert deleted_keys(mock_db) == [(123456789, 222222222)]
 
     @patch('reminder.config')
     @patch('reminder.FirestoreReminderCollection')
@@ -433,4 +438,285 @@ class TestSendReminders:
         await send_reminders(bot)
         
         # Should only delete once due to deduplication
-        mock_db.delete_message_by_message_and_user_id.assert_called_once_with(123456789, 222222222)
+        assert deleted_keys(mock_db) == [(123456789, 222222222)]
+
+
+class TestMemorySweep:
+    """Test cases for sweeps that select due reminders from the in-memory store."""
+
+    @patch('reminder.config')
+    @patch('reminder.now_ms', return_value=10 ** 13)
+    @patch('reminder.FirestoreReminderCollection')
+    @pytest.mark.asyncio
+    async def test_memory_sweep_sends_and_deletes_legacy_auto_id_reminder(self, mock_db_class, mock_now_ms, mock_config, fake_firestore):
+        """Test a reminder saved with a random document ID is sent and deleted, not dropped as missing."""
+        pytest.importorskip("numpy")
+        from db import FirestoreReminderCollection
+        from pending_store import ArrayPendingStore
+        from reminder import send_reminders
+
+        mock_config.REMINDER_DIGEST_MODE = "off"
+        mock_config.REMINDER_MESSAGE_START = "Start\n"
+        mock_config.REMINDER_MESSAGE_MAIN = "- {user_mention} {message_link}\n"
+        mock_config.REMINDER_MESSAGE_END = "End"
+        reminder_db = FirestoreReminderCollection(client=fake_firestore, layout="flat")
+        mock_db_class.return_value = reminder_db
+        legacy = {'message_id': 1, 'channel_id': 10, 'mentioned_user_id': 222, 'due_at': 100}
+        reminder_db.collection_reminders.add(legacy)
+        store = ArrayPendingStore()
+        store.load([legacy])
+
+        channel = Mock(spec=discord.TextChannel)
+        channel.id = 10
+        channel.name = "channel-10"
+        channel.guild = Mock(spec=discord.Guild)
+        channel.guild.id = 5
+        channel.send = AsyncMock()
+        channel.fetch_message = AsyncMock(return_value=Mock(spec=discord.Message))
+        channel.permissions_for.return_value = Mock(read_messages=True)
+        bot = Mock(spec=discord.Client)
+        bot.get_channel.return_value = channel
+        bot.get_user.return_value = Mock(spec=discord.User)
+
+        with patch('reminder.pending_store', store):
+            await send_reminders(bot)
+
+        channel.send.assert_called_once()
+        assert list(fake_firestore.collection("discord_reminders").stream()) == []
+
+
+class TestDigests:
+    """Test cases for digest mode."""
+
+    def make_bot(self, channels):
+        bot = Mock(spec=discord.Client)
+        for channel in channels.values():
+            channel.fetch_message = AsyncMock(return_value=Mock(spec=discord.Message))
+            channel.permissions_for.return_value = Mock(read_messages=True)
+            channel.send = AsyncMock()
+        bot.get_channel.side_effect = channels.get
+        bot.get_user.return_value = Mock(spec=discord.User, send=AsyncMock())
+        return bot
+
+    def make_channel(self, channel_id, guild_id):
+        channel = Mock(spec=discord.TextChannel)
+        channel.id = channel_id
+        channel.name = f"channel-{channel_id}"
+        channel.guild = Mock(spec=discord.Guild)
+        channel.guild.id = guild_id
+        return channel
+
+    @patch('reminder.config')
+    @patch('reminder.FirestoreReminderCollection')
+    @pytest.mark.asyncio
+    async def test_dm_digest_sends_once_per_user(self, mock_db_class, mock_config):
+        """Test a user mentioned in several channels gets a single DM."""
+        from reminder import send_reminders
+
+        mock_config.REMINDER_DIGEST_MODE = "dm"
+        mock_config.REMINDER_DIGEST_PER_GUILD = False
+        mock_config.REMINDER_DIGEST_START = "{user_mention}\n"
+        mock_config.REMINDER_DIGEST_MAIN = "- {message_link}\n"
+        mock_config.REMINDER_MESSAGE_END = "End"
+        mock_db = mock_db_class.return_value
+        mock_db.get_expired_messages.return_value = [
+            {'message_id': 1, 'channel_id': 10, 'mentioned_user_id': 222},
+            {'message_id': 2, 'channel_id': 20, 'mentioned_user_id': 222},
+            {'message_id': 3, 'channel_id': 30, 'mentioned_user_id': 222},
+        ]
+        channels = {10: self.make_channel(10, 5), 20: self.make_channel(20, 5), 30: self.make_channel(30, 6)}
+        bot = self.make_bot(channels)
+
+        await send_reminders(bot)
+
+        user = bot.get_user.return_value
+        user.send.assert_called_once()
+        content = user.send.call_args[0][0]
+        assert "channels/5/10/1" in content and "channels/6/30/3" in content
+        for channel in channels.values():
+            channel.send.assert_not_called()
+        assert len(deleted_keys(mock_db)) == 3
+
+    @patch('reminder.config')
+    @patch('reminder.FirestoreReminderCollection')
+    @pytest.mark.asyncio
+    async def test_failed_dm_digest_falls_back_to_channels(self, mock_db_class, mock_config):
+        """Test reminders of a digest that cannot be delivered are sent per channel, not lost."""
+        from reminder import send_reminders
+
+        mock_config.REMINDER_DIGEST_MODE = "dm"
+        mock_config.REMINDER_DIGEST_PER_GUILD = False
+        mock_config.REMINDER_DIGEST_START = "{user_mention}\n"
+        mock_config.REMINDER_DIGEST_MAIN = "- {message_link}\n"
+        mock_config.REMINDER_MESSAGE_START = "Start\n"
+        mock_config.REMINDER_MESSAGE_MAIN = "- {user_mention} {message_link}\n"
+        mock_config.REMINDER_MESSAGE_END = "End"
+        mock_db = mock_db_class.return_value
+        mock_db.get_expired_messages.return_value = [
+            {'message_id': 1, 'channel_id': 10, 'mentioned_user_id': 222},
+            {'message_id': 2, 'channel_id': 20, 'mentioned_user_id': 222},
+        ]
+        channels = {10: self.make_channel(10, 5), 20: self.make_channel(20, 5)}
+        bot = self.make_bot(channels)
+        bot.get_user.return_value.send.side_effect = discord.Forbidden(Mock(status=403), "Cannot send messages to this user")
+
+        await send_reminders(bot)
+
+        channels[10].send.assert_called_once()
+        channels[20].send.assert_called_once()
+        assert sorted(deleted_keys(mock_db)) == [(1, 222), (2, 222)]
+
+    @patch('reminder.guild_settings')
+    @patch('reminder.config')
+    @patch('reminder.FirestoreReminderCollection')
+    @pytest.mark.asyncio
+    async def test_channel_digest_falls_back_without_digest_channel(self, mock_db_class, mock_config, mock_settings):
+        """Test guilds with a digest channel get one post per user, others get per-channel messages."""
+        from reminder import send_reminders
+        from settings import GuildSettings
+
+        mock_config.REMINDER_DIGEST_MODE = "channel"
+        mock_config.REMINDER_DIGEST_START = "{user_mention}\n"
+        mock_config.REMINDER_DIGEST_MAIN = "- {message_link}\n"
+        mock_config.REMINDER_MESSAGE_START = "Start\n"
+        mock_config.REMINDER_MESSAGE_MAIN = "- {user_mention} {message_link}\n"
+        mock_config.REMINDER_MESSAGE_END = "End"
+        mock_settings.get.side_effect = lambda guild_id: GuildSettings(digest_channel_id=99 if guild_id == 5 else None)
+        mock_db = mock_db_class.return_value
+        mock_db.get_expired_messages.return_value = [
+            {'message_id': 1, 'channel_id': 10, 'mentioned_user_id': 222},
+            {'message_id': 2, 'channel_id': 20, 'mentioned_user_id': 222},
+            {'message_id': 3, 'channel_id': 30, 'mentioned_user_id': 222},
+        ]
+        channels = {
+            10: self.make_channel(10, 5),
+            20: self.make_channel(20, 5),
+            30: self.make_channel(30, 6),
+            99: self.make_channel(99, 5),
+        }
+        bot = self.make_bot(channels)
+
+        await send_reminders(bot)
+
+        channels[99].send.assert_called_once()
+        assert "<@222>" in channels[99].send.call_args[0][0]
+        channels[10].send.assert_not_called()
+        channels[30].send.assert_called_once()
+
+    def test_split_message_respects_limit(self):
+        """Test long digests are split into messages under the length limit."""
+        from reminder import split_message
+
+        lines = [f"- line {i:03}\n" for i in range(100)]
+        messages = split_message("Start\n", lines, "End", limit=200)
+
+        assert len(messages) > 1
+        assert all(len(message) <= 200 for message in messages)
+        assert messages[0].startswith("Start\n") and messages[-1].endswith("End")
+        assert "".join(messages) == "Start\n" + "".join(lines) + "End"
+
+
+class TestUnreachable:
+    """Test cases for the negative cache shared by sweeps."""
+
+    @patch('reminder.config')
+    @patch('reminder.FirestoreReminderCollection')
+    @pytest.mark.asyncio
+    async def test_unreachable_channel_skips_lookups_in_later_sweeps(self, mock_db_class, mock_config):
+        """Test a missing channel is not fetched from, and not looked up again next sweep."""
+        from reminder import send_reminders
+
+        mock_config.REMINDER_DIGEST_MODE = "off"
+        mock_db = mock_db_class.return_value
+        mock_db.get_expired_messages.return_value = [
+            {'message_id': 1, 'channel_id': 10, 'mentioned_user_id': 2},
+        ]
+        bot = Mock(spec=discord.Client)
+        bot.get_channel.return_value = None
+        bot.get_user.return_value = Mock(spec=discord.User)
+
+        await send_reminders(bot)
+        mock_db.get_expired_messages.return_value = [
+            {'message_id': 3, 'channel_id': 10, 'mentioned_user_id': 4},
+        ]
+        await send_reminders(bot)
+
+        bot.get_channel.assert_called_once_with(10)
+        assert len(deleted_keys(mock_db)) == 2
+
+    def make_bot(self):
+        channel = Mock(spec=discord.TextChannel)
+        channel.id = 10
+        channel.name = "channel-10"
+        channel.guild = Mock(spec=discord.Guild)
+        channel.guild.id = 5
+        channel.guild.get_member.return_value = None
+        channel.send = AsyncMock()
+        channel.fetch_message = AsyncMock(return_value=Mock(spec=discord.Message))
+        channel.permissions_for.return_value = Mock(read_messages=True)
+        bot = Mock(spec=discord.Client)
+        bot.get_channel.return_value = channel
+        bot.get_user.return_value = Mock(spec=discord.User)
+        return bot, channel
+
+    @patch('reminder.config')
+    @patch('reminder.FirestoreReminderCollection')
+    @pytest.mark.asyncio
+    async def test_uncached_member_is_fetched(self, mock_db_class, mock_config):
+        """Test a member missing from the cache is fetched before the reminder is found invalid."""
+        from reminder import send_reminders
+        from unreachable import unreachable, PERMISSION
+
+        mock_config.REMINDER_DIGEST_MODE = "off"
+        mock_config.REMINDER_MESSAGE_START = "Start\n"
+        mock_config.REMINDER_MESSAGE_MAIN = "- {user_mention} {message_link}\n"
+        mock_config.REMINDER_MESSAGE_END = "End"
+        mock_db = mock_db_class.return_value
+        mock_db.get_expired_messages.return_value = [
+            {'message_id': 1, 'channel_id': 10, 'mentioned_user_id': 2},
+            {'message_id': 3, 'channel_id': 10, 'mentioned_user_id': 4},
+        ]
+        bot, channel = self.make_bot()
+
+        async def fetch_member(user_id):
+            # User 4 left the guild
+            if user_id == 4:
+                raise discord.NotFound(Mock(status=404), "Unknown Member")
+            return Mock(spec=discord.Member)
+        channel.guild.fetch_member = fetch_member
+
+        await send_reminders(bot)
+
+        channel.send.assert_called_once()
+        assert "<@2>" in channel.send.call_args[0][0]
+        assert not unreachable.is_unreachable(PERMISSION, (10, 2))
+        assert unreachable.is_unreachable(PERMISSION, (10, 4))
+        assert sorted(deleted_keys(mock_db)) == [(1, 2), (3, 4)]
+
+    @patch('reminder.config')
+    @patch('reminder.FirestoreReminderCollection')
+    @pytest.mark.asyncio
+    async def test_fetch_errors_keep_the_reminder(self, mock_db_class, mock_config):
+        """Test errors other than NotFound skip the reminder without marking or deleting it."""
+        from reminder import send_reminders
+        from unreachable import unreachable, MESSAGE, PERMISSION
+
+        mock_config.REMINDER_DIGEST_MODE = "off"
+        mock_db = mock_db_class.return_value
+        mock_db.get_expired_messages.return_value = [
+            {'message_id': 1, 'channel_id': 10, 'mentioned_user_id': 2},
+        ]
+        bot, channel = self.make_bot()
+        outage = discord.HTTPException(Mock(status=503), "Service Unavailable")
+        channel.fetch_message.side_effect = outage
+
+        await send_reminders(bot)
+
+        channel.fetch_message.side_effect = None
+        channel.guild.fetch_member = AsyncMock(side_effect=outage)
+        await send_reminders(bot)
+
+        assert not unreachable.is_unreachable(MESSAGE, 1)
+        assert not unreachable.is_unreachable(PERMISSION, (10, 2))
+        channel.send.assert_not_called()
+        mock_db.delete_reminders.assert_not_called()
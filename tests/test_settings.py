@@ -0,0 +1,112 @@
+"""
+Tests for the per-guild settings module (settings.py).
+"""
+
+import asyncio
+import pytest
+from unittest.mock import Mock, patch
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+class TestGuildSettings:
+    """Test cases for GuildSettings."""
+
+    def test_round_trip_drops_unset_fields(self):
+        """Test only overridden fields are stored."""
+        from settings import GuildSettings
+
+        settings = GuildSettings.from_dict({"max_role_members": 20, "unknown": True})
+
+        assert settings.max_role_members == 20
+        assert settings.reminder_threshold is None
+        assert settings.to_dict() == {"max_role_members": 20}
+
+    def test_pick_prefers_override(self):
+        """Test the guild override wins over the global default, unless unset."""
+        from settings import pick
+
+        assert pick(20, 50) == 20
+        assert pick(None, 50) == 50
+        assert pick(0, 50) == 0
+
+
+class TestGuildSettingsCache:
+    """Test cases for GuildSettingsCache."""
+
+    def test_get_before_load_returns_defaults(self):
+        """Test get() serves defaults without touching the backend before load()."""
+        from settings import DEFAULT_SETTINGS, GuildSettingsCache
+
+        backend = Mock()
+        cache = GuildSettingsCache(backend, ttl=600)
+
+        assert cache.get(1) is DEFAULT_SETTINGS
+        backend.get_settings.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_load_reads_guilds_in_batches(self):
+        """Test load() caches every guild with one backend read per batch."""
+        from settings import GuildSettingsCache
+
+        backend = Mock()
+        backend.get_settings.side_effect = lambda guild_ids: {
+            guild_id: {"reminder_threshold": 60} for guild_id in guild_ids if guild_id == 2
+        }
+        cache = GuildSettingsCache(backend, ttl=600)
+
+        await cache.load([1, 2, 3], batch_size=2)
+
+        assert backend.get_settings.call_count == 2
+        assert cache.is_loaded is True
+        assert cache.get(2).reminder_threshold == 60
+        assert cache.get(1).reminder_threshold is None
+
+    @pytest.mark.asyncio
+    async def test_expired_entry_is_served_while_refreshing(self):
+        """Test an expired entry is still returned while it is refreshed in the background."""
+        from settings import GuildSettingsCache
+
+        backend = Mock()
+        backend.get_settings.return_value = {1: {"max_role_members": 10}}
+        cache = GuildSettingsCache(backend, ttl=600)
+
+        with patch('settings.time') as mock_time:
+            mock_time.monotonic.return_value = 1000
+            await cache.load([1])
+
+            backend.get_settings.return_value = {1: {"max_role_members": 20}}
+            mock_time.monotonic.return_value = 1600
+            assert cache.get(1).max_role_members == 10
+            await asyncio.gather(*cache._tasks)
+
+        assert cache.get(1).max_role_members == 20
+
+    @pytest.mark.asyncio
+    async def test_backend_error_keeps_last_value(self):
+        """Test a failed refresh keeps serving what was cached before."""
+        from settings import GuildSettingsCache
+
+        backend = Mock()
+        backend.get_settings.return_value = {1: {"max_role_members": 10}}
+        cache = GuildSettingsCache(backend, ttl=600)
+        await cache.load([1])
+
+        backend.get_settings.side_effect = Exception("Backend unavailable")
+        await cache.refresh([1])
+
+        assert cache.get(1).max_role_members == 10
+
+    @pytest.mark.asyncio
+    async def test_update_writes_and_caches(self):
+        """Test update() stores only overrides and serves them at once."""
+        from settings import GuildSettings, GuildSettingsCache
+
+        backend = Mock()
+        cache = GuildSettingsCache(backend, ttl=600)
+
+        await cache.update(1, GuildSettings(reminder_threshold=120))
+
+        backend.set_settings.assert_called_once_with(1, {"reminder_threshold": 120})
+        assert cache.get(1).reminder_threshold == 120
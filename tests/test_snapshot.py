@@ -0,0 +1,56 @@
+"""
+Tests for the snapshot module (snapshot.py).
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+class TestSnapshot:
+    """Test cases for write_snapshot and read_snapshot."""
+
+    def test_round_trip(self, tmp_path):
+        """Test reminders and the high-water mark survive a write and a read."""
+        from records import ReminderRecord
+        from snapshot import read_snapshot, write_snapshot
+
+        path = str(tmp_path / "data" / "pending.snapshot")
+        reminders = [
+            ReminderRecord(1379235275745656994, 2, 3, due_at=4, guild_id=5, author_id=6),
+            ReminderRecord(7, 8, 9, due_at=10, guild_id=11),
+        ]
+
+        assert write_snapshot(path, reminders, high_water_mark=12345) == 2
+        high_water_mark, loaded = read_snapshot(path)
+
+        assert high_water_mark == 12345
+        assert [ReminderRecord.from_dict(data) for data in loaded] == reminders
+        assert "author_id" not in loaded[1]
+
+    def test_missing_or_damaged_snapshot_is_ignored(self, tmp_path):
+        """Test a missing, empty or truncated file means a full read instead."""
+        from records import ReminderRecord
+        from snapshot import read_snapshot, write_snapshot
+
+        path = tmp_path / "pending.snapshot"
+        assert read_snapshot(str(path)) is None
+
+        path.write_bytes(b"")
+        assert read_snapshot(str(path)) is None
+
+        write_snapshot(str(path), [ReminderRecord(1, 2, 3, due_at=4, guild_id=5)], high_water_mark=0)
+        path.write_bytes(path.read_bytes()[:-1])
+        assert read_snapshot(str(path)) is None
+
+    def test_write_replaces_previous_snapshot(self, tmp_path):
+        """Test a new snapshot replaces the old one without leaving a temporary file."""
+        from records import ReminderRecord
+        from snapshot import read_snapshot, write_snapshot
+
+        path = str(tmp_path / "pending.snapshot")
+        write_snapshot(path, [ReminderRecord(1, 2, 3, due_at=4, guild_id=5)], high_water_mark=1)
+        write_snapshot(path, [], high_water_mark=2)
+
+        assert read_snapshot(path) == (2, [])
+        assert os.listdir(tmp_path) == ["pending.snapshot"]
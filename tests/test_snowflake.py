@@ -0,0 +1,39 @@
+"""
+Tests for the snowflake module (snowflake.py).
+"""
+
+import pytest
+from datetime import timezone
+import discord
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+class TestSnowflake:
+    """Test cases for snowflake-derived times."""
+
+    def test_snowflake_time_ms_matches_discord(self):
+        """Test the creation time matches discord.utils.snowflake_time."""
+        from snowflake import snowflake_time_ms
+
+        message_id = 1379235275745656994
+        expected = discord.utils.snowflake_time(message_id).replace(tzinfo=timezone.utc)
+
+        assert snowflake_time_ms(message_id) == int(expected.timestamp() * 1000)
+
+    def test_due_key_adds_threshold(self):
+        """Test the due key is the creation time plus the threshold."""
+        from snowflake import due_key, snowflake_time_ms
+
+        message_id = 1379235275745656994
+
+        assert due_key(message_id, 3600) == snowflake_time_ms(message_id) + 3600 * 1000
+
+    def test_due_keys_sort_like_message_ids(self):
+        """Test due keys with the same threshold keep the order of the message IDs."""
+        from snowflake import due_key
+
+        message_ids = [1379235275745656994, 1379235275745656995, 1400000000000000000]
+
+        assert sorted(message_ids, key=lambda message_id: due_key(message_id, 60)) == message_ids
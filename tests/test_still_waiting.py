@@ -0,0 +1,67 @@
+"""
+Tests for the /still-waiting command (still_waiting.py).
+"""
+
+import pytest
+from unittest.mock import Mock, AsyncMock, patch
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+class TestStillWaiting:
+    """Test cases for the /still-waiting command."""
+
+    @patch('still_waiting.pending_index')
+    def test_lines_list_incoming_before_outgoing(self, mock_index):
+        """Test both directions are listed, with links to the messages."""
+        from records import ReminderRecord
+        from still_waiting import still_waiting_lines
+
+        mock_index.incoming.return_value = [ReminderRecord(1, 100, 222, due_at=60000, guild_id=5, author_id=111)]
+        mock_index.outgoing.return_value = [ReminderRecord(2, 100, 333, due_at=120000, guild_id=5, author_id=222)]
+
+        lines = still_waiting_lines(5, 222)
+
+        assert len(lines) == 2
+        assert "<@111>" in lines[0] and "https://discord.com/channels/5/100/1" in lines[0]
+        assert "<@333>" in lines[1] and "<t:120:R>" in lines[1]
+
+    @pytest.mark.asyncio
+    async def test_view_pages_through_lines(self):
+        """Test long lists are split into pages with working buttons."""
+        from still_waiting import StillWaitingView
+
+        view = StillWaitingView([f"- line {i}\n" for i in range(25)], page_size=10)
+        assert view.page_count == 3
+        assert "line 0" in view.render() and "line 10" not in view.render()
+        assert view.previous_page.disabled is True
+
+        interaction = Mock()
+        interaction.response.edit_message = AsyncMock()
+        await view.show(interaction, 2)
+
+        assert "line 20" in view.render()
+        assert "Page 3/3" in view.render()
+        assert view.next_page.disabled is True
+        interaction.response.edit_message.assert_called_once()
+
+    @patch('still_waiting.pending_index')
+    @pytest.mark.asyncio
+    async def test_command_replies_ephemerally(self, mock_index):
+        """Test the reply is only visible to the caller and has no buttons for one page."""
+        from still_waiting import still_waiting
+
+        mock_index.incoming.return_value = []
+        mock_index.outgoing.return_value = []
+        interaction = Mock()
+        interaction.guild_id = 5
+        interaction.user.id = 222
+        interaction.response.send_message = AsyncMock()
+
+        await still_waiting(interaction)
+
+        args, kwargs = interaction.response.send_message.call_args
+        assert kwargs["ephemeral"] is True
+        assert "view" not in kwargs
+        mock_index.incoming.assert_called_once_with(5, 222)
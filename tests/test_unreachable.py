@@ -0,0 +1,71 @@
+"""
+Tests for the negative cache of unreachable channels, users and messages (unreachable.py).
+"""
+
+import pytest
+import sys
+import os
+from unittest.mock import patch
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+class TestUnreachableCache:
+    """Test cases for UnreachableCache."""
+
+    def test_mark_and_expire(self):
+        """Test entries are trusted until their TTL runs out."""
+        from unreachable import CHANNEL, UnreachableCache
+
+        cache = UnreachableCache(ttl=60)
+        with patch('unreachable.time.monotonic', return_value=1000):
+            cache.mark(CHANNEL, 10)
+            assert cache.is_unreachable(CHANNEL, 10)
+            assert not cache.is_unreachable(CHANNEL, 11)
+        with patch('unreachable.time.monotonic', return_value=1060):
+            assert not cache.is_unreachable(CHANNEL, 10)
+        assert len(cache) == 0
+
+    def test_invalidate_channel_and_user(self):
+        """Test gateway invalidations drop the related permission entries."""
+        from unreachable import CHANNEL, PERMISSION, USER, UnreachableCache
+
+        cache = UnreachableCache(ttl=60)
+        cache.mark(CHANNEL, 10)
+        cache.mark(USER, 2)
+        cache.mark(PERMISSION, (10, 2))
+        cache.mark(PERMISSION, (20, 2))
+        cache.mark(PERMISSION, (20, 3))
+
+        cache.invalidate_channel(10)
+        assert not cache.is_unreachable(CHANNEL, 10)
+        assert not cache.is_unreachable(PERMISSION, (10, 2))
+        assert cache.is_unreachable(PERMISSION, (20, 2))
+
+        cache.invalidate_user(2)
+        assert not cache.is_unreachable(USER, 2)
+        assert not cache.is_unreachable(PERMISSION, (20, 2))
+        assert cache.is_unreachable(PERMISSION, (20, 3))
+
+    def test_invalidate_permissions(self):
+        """Test a role change drops every permission entry but nothing else."""
+        from unreachable import CHANNEL, PERMISSION, UnreachableCache
+
+        cache = UnreachableCache(ttl=60)
+        cache.mark(CHANNEL, 10)
+        cache.mark(PERMISSION, (10, 2))
+        cache.mark(PERMISSION, (20, 3))
+
+        cache.invalidate_permissions()
+        assert not cache.is_unreachable(PERMISSION, (10, 2))
+        assert not cache.is_unreachable(PERMISSION, (20, 3))
+        assert cache.is_unreachable(CHANNEL, 10)
+
+    def test_oldest_entries_are_evicted(self):
+        """Test each kind keeps at most max_entries entries."""
+        from unreachable import MESSAGE, UnreachableCache
+
+        cache = UnreachableCache(ttl=60, max_entries=2)
+        for message_id in (1, 2, 3):
+            cache.mark(MESSAGE, message_id)
+
+        assert [cache.is_unreachable(MESSAGE, message_id) for message_id in (1, 2, 3)] == [False, True, True]